@@ -0,0 +1,94 @@
+"""
+Local stand-in for the Art Institute ``/api/v1/artworks`` endpoint.
+
+Answers ``?ids=1,2,3`` lookups like the real API, for ids up to
+--max-id, after a configurable delay and with a configurable share of
+500 responses. Run on its own with
+
+    python -m bench.fake_artic --port 8765 --latency-ms 150 --failure-rate 0.05
+
+or start it in-process with start_server().
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeArticHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        if url.path.rstrip('/') != '/api/v1/artworks':
+            return self.send_json(404, {'error': 'Not found'})
+
+        with server.stats_lock:
+            server.requests += 1
+
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay:
+            time.sleep(delay)
+        if random.random() < server.failure_rate:
+            with server.stats_lock:
+                server.failures += 1
+            return self.send_json(500, {'error': 'Simulated failure'})
+
+        query = parse_qs(url.query)
+        ids = [int(i) for i in query.get('ids', [''])[0].split(',') if i.strip().isdigit()]
+        data = [{'id': i, 'title': f'Artwork {i}'} for i in ids if 0 < i <= server.max_id]
+        self.send_json(200, {'data': data})
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(port=0, latency_ms=0, jitter_ms=0, failure_rate=0.0, max_id=1_000_000):
+    """
+    Start the fake API in a background thread and return the server;
+    its base URL (for ARTIC_API['BASE_URL']) is server.base_url.
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeArticHandler)
+    server.daemon_threads = True
+    server.latency = latency_ms / 1000
+    server.jitter = jitter_ms / 1000
+    server.failure_rate = failure_rate
+    server.max_id = max_id
+    server.requests = server.failures = 0
+    server.stats_lock = threading.Lock()
+    server.base_url = f'http://127.0.0.1:{server.server_address[1]}/api/v1'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--max-id', type=int, default=1_000_000, help="Highest artwork id that exists.")
+    args = parser.parse_args()
+
+    server = start_server(args.port, args.latency_ms, args.jitter_ms, args.failure_rate, args.max_id)
+    print(f"Fake Art Institute API on {server.base_url}, Ctrl+C to stop")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""
+Load test of the travel planner API.
+
+Runs every endpoint of main/travels/urls.py in-process (Django test
+client) against a throwaway SQLite database, with the Art Institute API
+replaced by the local fake from bench.fake_artic. Each worker thread
+repeats a scenario: create a project with N places, read it back in all
+the ways the API offers, add/update/remove a place, bulk update, search,
+delete it. Reports throughput, p50/p95/p99 latency and SQL queries per
+request for every endpoint as JSON, so runs can be compared across
+commits:
+
+    python -m bench.run --concurrency 8 --iterations 50 --places 5 \
+        --latency-ms 100 --output before.json
+"""
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(values)))
+    return values[rank - 1]
+
+
+class Recorder:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)  # endpoint -> [(seconds, queries, status)]
+
+    def add(self, endpoint, seconds, queries, status):
+        with self.lock:
+            self.samples[endpoint].append((seconds, queries, status))
+
+    def report(self, wall_time):
+        endpoints = {}
+        total = 0
+        for endpoint, samples in sorted(self.samples.items()):
+            latencies = sorted(seconds * 1000 for seconds, _, _ in samples)
+            queries = [q for _, q, _ in samples]
+            total += len(samples)
+            endpoints[endpoint] = {
+                'requests': len(samples),
+                'errors': sum(1 for _, _, status in samples if status >= 500),
+                'client_errors': sum(1 for _, _, status in samples if 400 <= status < 500),
+                'throughput_rps': round(len(samples) / wall_time, 2),
+                'latency_ms': {
+                    'mean': round(sum(latencies) / len(latencies), 3),
+                    'p50': round(percentile(latencies, 50), 3),
+                    'p95': round(percentile(latencies, 95), 3),
+                    'p99': round(percentile(latencies, 99), 3),
+                    'max': round(latencies[-1], 3),
+                },
+                'queries_per_request': {
+                    'mean': round(sum(queries) / len(queries), 2),
+                    'max': max(queries),
+                },
+            }
+        return {
+            'wall_time_s': round(wall_time, 3),
+            'requests': total,
+            'throughput_rps': round(total / wall_time, 2),
+            'endpoints': endpoints,
+        }
+
+
+class Worker:
+    """One simulated client running the scenario in its own thread."""
+
+    def __init__(self, recorder, args):
+        from django.test import Client
+
+        self.client = Client(raise_request_exception=False)
+        self.recorder = recorder
+        self.args = args
+
+    def call(self, endpoint, method, url, data=None):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        kwargs = {'content_type': 'application/json'} if data is not None else {}
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = getattr(self.client, method)(url, data, **kwargs) if data is not None \
+                else getattr(self.client, method)(url)
+            elapsed = time.perf_counter() - start
+        self.recorder.add(endpoint, elapsed, len(queries), response.status_code)
+        return response
+
+    def place_ids(self, count):
+        return random.sample(range(1, self.args.id_space + 1), count)
+
+    def run_iteration(self):
+        ids = self.place_ids(self.args.places + 1)
+        response = self.call('project-create', 'post', '/api/projects/', {
+            'name': 'Benchmark trip',
+            'description': 'Load test',
+            'place_ids': ids[:-1],
+        })
+        if response.status_code != 201:
+            return
+        project = response.json()
+        project_url = f"/api/projects/{project['id']}/"
+        places_url = f'{project_url}places/'
+
+        self.call('project-list', 'get', '/api/projects/')
+        self.call('project-detail', 'get', project_url)
+        self.call('project-update', 'patch', project_url, {'description': 'Updated'})
+        self.call('places-list', 'get', places_url)
+
+        response = self.call('place-create', 'post', places_url, {'external_id': ids[-1], 'notes': 'Added'})
+        if response.status_code == 201:
+            place_url = f"{places_url}{response.json()['id']}/"
+            self.call('place-detail', 'get', place_url)
+            self.call('place-update', 'patch', place_url, {'notes': 'Must see'})
+            self.call('place-delete', 'delete', place_url)
+
+        self.call('places-bulk-update', 'patch', '/api/places/bulk/', [
+            {'assignment_id': place['id'], 'notes': 'Bulk'} for place in project['places']
+        ])
+        self.call('place-search', 'get', '/api/search/?q=artwork')
+        self.call('artwork-cache-stats', 'get', '/api/artworks/cache/')
+        self.call('project-delete', 'delete', project_url)
+
+    def run(self, iterations):
+        from django.db import connections
+
+        try:
+            for _ in range(iterations):
+                self.run_iteration()
+        finally:
+            connections.close_all()
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def setup_django(database_path):
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main.settings')
+
+    import django
+    from django.conf import settings
+
+    django.setup()
+    # Before any connection is opened: a file database shared by the
+    # worker threads, waiting for locks instead of failing. IMMEDIATE
+    # transactions avoid SQLite's read-to-write lock upgrade deadlocks.
+    # NAME points there too, so nothing opens (and creates) the
+    # project's own db.sqlite3.
+    database = settings.DATABASES['default']
+    database['NAME'] = database_path
+    database.setdefault('TEST', {})['NAME'] = database_path
+    database.setdefault('OPTIONS', {}).update(timeout=30, transaction_mode='IMMEDIATE')
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--concurrency', type=int, default=4, help="Worker threads.")
+    parser.add_argument('--iterations', type=int, default=20, help="Scenario runs per worker.")
+    parser.add_argument('--places', type=int, default=5, help="Places per created project (1-9).")
+    parser.add_argument('--id-space', type=int, default=10000,
+                        help="Artwork ids are drawn from 1..N; smaller means more artwork cache hits.")
+    parser.add_argument('--latency-ms', type=float, default=50, help="Fake upstream latency.")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="Random extra upstream latency.")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Share of upstream 500s.")
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+
+    from bench.fake_artic import start_server
+
+    upstream = start_server(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, failure_rate=args.failure_rate
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, 'bench.sqlite3'))
+
+        from django.test.utils import override_settings
+
+        with override_settings(ARTIC_API={'BASE_URL': upstream.base_url, 'BACKOFF': 0.01}):
+            recorder = Recorder()
+            workers = [Worker(recorder, args) for _ in range(args.concurrency)]
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                for future in [pool.submit(worker.run, args.iterations) for worker in workers]:
+                    future.result()
+            wall_time = time.perf_counter() - start
+
+    upstream.shutdown()
+    report = {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'parameters': vars(args),
+        'upstream': {'requests': upstream.requests, 'failures': upstream.failures},
+        **recorder.report(wall_time),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Cold start and memory of a worker, per settings module.
+
+Starts a fresh interpreter for every run and times, inside it, Django's
+setup (settings, apps, models), building the WSGI handler (middleware),
+the first API request (URLconf, views, serializers, first query) and the
+first /api/schema/ request, and reports the peak RSS after each and the
+number of loaded modules. The schema is written to a file first, as at
+deploy time, and used by the profiles that set OPENAPI_SCHEMA_FILE.
+Medians over --runs are printed as JSON:
+
+    python -m bench.startup --runs 5 main.settings main.settings_api
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def peak_rss_mb():
+    # KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(database_path):
+    """Run in the child: time the start of a worker, return the figures."""
+    timings = {}
+    start = time.perf_counter()
+
+    import django
+    from django.conf import settings
+
+    django.setup()
+    settings.DATABASES['default']['NAME'] = database_path
+    timings['setup_ms'] = (time.perf_counter() - start) * 1000
+
+    from django.core.wsgi import get_wsgi_application
+    from django.test import Client
+
+    get_wsgi_application()
+    timings['handler_ms'] = (time.perf_counter() - start) * 1000
+
+    client = Client(SERVER_NAME='localhost')
+    response = client.get('/api/projects/')
+    assert response.status_code == 200, response.status_code
+    timings['first_request_ms'] = (time.perf_counter() - start) * 1000
+    timings['rss_mb'] = peak_rss_mb()
+    timings['modules'] = len(sys.modules)
+
+    request_start = time.perf_counter()
+    response = client.get('/api/schema/')
+    assert response.status_code == 200, response.status_code
+    timings['schema_request_ms'] = (time.perf_counter() - request_start) * 1000
+    timings['rss_after_schema_mb'] = peak_rss_mb()
+    return timings
+
+
+def run_child(settings_module, database_path, schema_path, *args):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module, OPENAPI_SCHEMA_FILE=schema_path)
+    start = time.perf_counter()
+    output = subprocess.check_output(
+        [sys.executable, '-m', 'bench.startup', *args, '--child', database_path], cwd=BASE_DIR, env=env, text=True
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    return dict(json.loads(output), process_ms=wall_ms) if output.strip() else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('settings', nargs='*', default=['main.settings', 'main.settings_api'])
+    parser.add_argument('--runs', type=int, default=5, help="Fresh processes per settings module.")
+    parser.add_argument('--child', metavar='DATABASE', help=argparse.SUPPRESS)
+    parser.add_argument('--prepare', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, str(BASE_DIR))
+        if args.prepare:
+            import django
+            from django.conf import settings
+            from django.core.management import call_command
+
+            django.setup()
+            settings.DATABASES['default']['NAME'] = args.child
+            call_command('migrate', verbosity=0)
+            call_command('spectacular', file=os.environ['OPENAPI_SCHEMA_FILE'])
+            return
+        print(json.dumps(measure(args.child)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, 'startup.sqlite3')
+        schema_path = os.path.join(tmp, 'openapi.yaml')
+        run_child('main.settings', database_path, schema_path, '--prepare')
+
+        report = {}
+        for settings_module in args.settings:
+            runs = [run_child(settings_module, database_path, schema_path) for _ in range(args.runs)]
+            report[settings_module] = {
+                key: round(statistics.median(run[key] for run in runs), 1) for key in runs[0]
+            }
+    print(json.dumps({'runs': args.runs, 'medians': report}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
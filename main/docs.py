@@ -0,0 +1,89 @@
+"""
+OpenAPI schema and API docs views.
+
+The schema is meant to be generated once at build or deploy time,
+
+    python manage.py spectacular --file openapi.yaml
+
+and served from that file (the OPENAPI_SCHEMA_FILE setting): reading it
+costs nothing next to introspecting every view on the first request.
+Without the file it is generated per request, as in development.
+
+drf_spectacular's views (and through them its generator, the schema
+renderers and the docs templates) are only imported when one of these
+endpoints is first called, so workers that never serve them do not
+load them.
+"""
+import hashlib
+import logging
+import os
+from importlib import import_module
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_safe
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {
+    '.json': 'application/vnd.oai.openapi+json',
+    '.yaml': 'application/vnd.oai.openapi',
+    '.yml': 'application/vnd.oai.openapi',
+}
+
+# path -> (mtime, content, etag)
+_schema_files = {}
+
+
+def lazy_view(name, **initkwargs):
+    """A view that imports drf_spectacular.views.<name> on its first call."""
+    view = None
+
+    def wrapper(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            view = getattr(import_module('drf_spectacular.views'), name).as_view(**initkwargs)
+        return view(request, *args, **kwargs)
+    return csrf_exempt(wrapper)
+
+
+def read_schema_file(path):
+    """Return (content, etag) of the schema file, read again only once it changes."""
+    mtime = os.stat(path).st_mtime_ns
+    cached = _schema_files.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'rb') as f:
+            content = f.read()
+        cached = _schema_files[path] = (mtime, content, f'"{hashlib.sha256(content).hexdigest()[:32]}"')
+    return cached[1], cached[2]
+
+
+generated_schema_view = lazy_view('SpectacularAPIView')
+
+
+@require_safe
+def schema_view(request):
+    path = getattr(settings, 'OPENAPI_SCHEMA_FILE', None)
+    if not path:
+        return generated_schema_view(request)
+    path = os.fspath(path)
+    try:
+        content, etag = read_schema_file(path)
+    except FileNotFoundError:
+        logger.warning("OpenAPI schema file %s not found, generating the schema", path)
+        return generated_schema_view(request)
+
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        content_type = CONTENT_TYPES.get(os.path.splitext(path)[1], 'application/vnd.oai.openapi')
+        response = HttpResponse(content, content_type=content_type)
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+swagger_view = lazy_view('SpectacularSwaggerView', url_name='schema')
+redoc_view = lazy_view('SpectacularRedocView', url_name='schema')
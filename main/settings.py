@@ -43,6 +43,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'main.travels.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,8 +55,13 @@ MIDDLEWARE = [
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_PAGINATION_CLASS': 'main.travels.pagination.KeysetPagination',
+    'PAGE_SIZE': 20,
 }
 
+# Upper bound for the ?page_size= a client may ask for
+API_MAX_PAGE_SIZE = 100
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Travel Planner API',
     'DESCRIPTION': 'API for managing travel projects and places',
@@ -63,6 +69,102 @@ SPECTACULAR_SETTINGS = {
     'SERVE_INCLUDE_SCHEMA': False,
 }
 
+# Schema file served at /api/schema/, written at build time with
+# ``manage.py spectacular --file``; None generates it per request
+# (see main/docs.py).
+OPENAPI_SCHEMA_FILE = None
+
+# Whether /api/docs/ (Swagger UI) and /api/redoc/ are routed.
+API_DOCS_UI = True
+
+# HTTP client for the Art Institute API, see main/travels/artic.py for
+# all options.
+ARTIC_API = {
+    'BASE_URL': 'https://api.artic.edu/api/v1',
+    'TIMEOUT': (3.05, 5),
+    'POOL_MAXSIZE': 10,
+    'RETRIES': 2,
+    'BACKOFF': 0.2,
+    'CIRCUIT_FAILURE_THRESHOLD': 5,
+    'CIRCUIT_RESET_TIMEOUT': 30,
+}
+
+# Cache for Art Institute artwork lookups done by ProjectPlace.clean().
+# Use 'main.travels.artwork_cache.DjangoArtworkCache' to share entries
+# between workers through CACHES[CACHE_ALIAS].
+ARTWORK_CACHE = {
+    'BACKEND': 'main.travels.artwork_cache.LocMemArtworkCache',
+    'MAX_ENTRIES': 1024,
+    'TTL': 60 * 60 * 24,
+    'NEGATIVE_TTL': 60 * 5,
+}
+
+# Whether artworks missing from the local catalog (see the
+# import_artworks command) are looked up on the Art Institute API.
+ARTWORK_NETWORK_FALLBACK = True
+
+# Build project and place responses straight from database rows instead
+# of through the DRF serializers (same JSON), see
+# main/travels/representations.py. Sparse ?fields= responses always are.
+FAST_READ_PATH = False
+
+# Accept places that are not in the artwork cache or catalog as pending
+# instead of asking the Art Institute API during the request; the
+# validate_places command validates them in the background.
+ASYNC_PLACE_VALIDATION = False
+
+# Directory for the file locks that make concurrent lookups of the same
+# artwork in different worker processes wait for each other instead of
+# all calling the Art Institute API (see main/travels/singleflight.py).
+# None coalesces lookups within each process only.
+SINGLE_FLIGHT_LOCK_DIR = None
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Cache of rendered project and place payloads, see
+# main/travels/response_cache.py. Entries are keyed by project version,
+# so no write can make them serve stale data.
+RESPONSE_CACHE = {
+    'ENABLED': True,
+    'ALIAS': 'default',
+    'TIMEOUT': 60 * 5,
+}
+
+# Server-Sent Events change feed of projects, see
+# main/travels/change_feed.py for all options.
+CHANGE_FEED = {
+    'POLL_INTERVAL': 1.0,
+    'HEARTBEAT': 15,
+    'MAX_STREAM_DURATION': 300,
+    'RETENTION': 60 * 60 * 24 * 7,
+}
+
+# Visiting order of a project's places, see main/travels/itinerary.py.
+ITINERARY = {
+    'EXACT_MAX_PLACES': 10,
+    'CACHE_SIZE': 256,
+}
+
+# Idempotency-Key support of the create endpoints, see
+# main/travels/idempotency.py.
+IDEMPOTENCY = {
+    'TTL': 60 * 60 * 24,
+    'LOCK_TIMEOUT': 60,
+    'WAIT_TIMEOUT': 10,
+}
+
+# Server-Timing headers, /metrics histograms and the slow request log,
+# see main/travels/metrics.py.
+REQUEST_METRICS = {
+    'ENABLED': True,
+    'SERVER_TIMING': True,
+    'SLOW_REQUEST_THRESHOLD': 1.0,
+}
+
 ROOT_URLCONF = 'main.urls'
 
 TEMPLATES = [
@@ -90,6 +192,12 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Transactions take the write lock when they begin, so the
+            # rows read at their start (select_for_update() is a no-op on
+            # SQLite) cannot change before they write
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
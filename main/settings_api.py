@@ -0,0 +1,42 @@
+"""
+Settings for API-only workers.
+
+Same as main.settings, minus what a JSON API with no logins does not
+use: the admin, auth, sessions, messages and static files apps, their
+middleware and templates, the browsable API and the docs UIs. The
+schema is served from the file written at build time:
+
+    python manage.py spectacular --file openapi.yaml
+    DJANGO_SETTINGS_MODULE=main.settings_api gunicorn main.wsgi
+
+Workers start faster and use less memory, see bench/startup.py.
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, REST_FRAMEWORK
+
+INSTALLED_APPS = [
+    'main.travels.apps.TravelsConfig',
+]
+
+MIDDLEWARE = [
+    'main.travels.metrics.MetricsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    # DRF's default: drf_spectacular is not installed here
+    'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+    'DEFAULT_AUTHENTICATION_CLASSES': [],
+    'UNAUTHENTICATED_USER': None,
+}
+
+TEMPLATES = []
+
+OPENAPI_SCHEMA_FILE = os.environ.get('OPENAPI_SCHEMA_FILE', BASE_DIR / 'openapi.yaml')
+
+API_DOCS_UI = False
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class TravelsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main.travels'
+
+    def ready(self):
+        from .metrics import install_query_wrapper
+
+        # Count queries of every connection for the request metrics
+        connection_created.connect(install_query_wrapper)
@@ -0,0 +1,298 @@
+"""
+HTTP client for the Art Institute of Chicago API.
+
+All lookups share one requests.Session so connections are kept alive
+and reused from a bounded pool. Failed requests are retried a bounded
+number of times with jittered exponential backoff, and a circuit
+breaker makes calls fail fast while the upstream keeps failing instead
+of tying up workers for the full timeout.
+
+AsyncArticClient does the same for async views, on httpx, with a
+semaphore bounding the requests in flight per event loop.
+
+Configured with the ``ARTIC_API`` setting, see DEFAULTS.
+"""
+import asyncio
+import random
+import threading
+import time
+import weakref
+
+import httpx
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from requests.adapters import HTTPAdapter
+
+from .metrics import timer
+
+DEFAULTS = {
+    'BASE_URL': 'https://api.artic.edu/api/v1',
+    # Only these fields are downloaded for an artwork
+    'FIELDS': ['id', 'title', 'gallery_id', 'gallery_title', 'latitude', 'longitude'],
+    # (connect, read) timeouts in seconds
+    'TIMEOUT': (3.05, 5),
+    'POOL_CONNECTIONS': 1,
+    'POOL_MAXSIZE': 10,
+    # Retries after the first attempt, for connection errors, timeouts,
+    # 429 and 5xx responses
+    'RETRIES': 2,
+    'BACKOFF': 0.2,
+    'BACKOFF_MAX': 2.0,
+    # Consecutive failed attempts that open the circuit, and how long it
+    # stays open before a trial request is let through
+    'CIRCUIT_FAILURE_THRESHOLD': 5,
+    'CIRCUIT_RESET_TIMEOUT': 30,
+    'USER_AGENT': 'travel-planner',
+    # Max concurrent requests of the async client, per event loop
+    'ASYNC_MAX_CONCURRENCY': 50,
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ArtworkAPIError(Exception):
+    """The Art Institute API could not answer the lookup."""
+
+
+class ArtworkAPIUnavailable(ArtworkAPIError):
+    """The upstream is failing or the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Closed: requests go through, consecutive failures are counted.
+    Open: requests are refused until reset_timeout has passed.
+    Half-open: one trial request is let through; success closes the
+    circuit, failure opens it again.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class ArticClient:
+
+    def __init__(self, base_url, fields, timeout, pool_connections, pool_maxsize,
+                 retries, backoff, backoff_max, circuit_failure_threshold,
+                 circuit_reset_timeout, user_agent, **options):
+        self.base_url = base_url.rstrip('/')
+        self.fields = ','.join(fields)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.breaker = CircuitBreaker(circuit_failure_threshold, circuit_reset_timeout)
+
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = user_agent
+        # Retries are done here, not by urllib3, so the breaker sees them
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=0,
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get_artworks(self, external_ids):
+        """
+        Return the artwork dicts the API knows for external_ids (unknown
+        ids are simply absent). Raises ArtworkAPIError on failure.
+        """
+        return self._get(f'{self.base_url}/artworks', artworks_params(external_ids, self.fields)).get('data', [])
+
+    def _get(self, url, params):
+        for attempt in range(self.retries + 1):
+            if not self.breaker.allow():
+                raise ArtworkAPIUnavailable('Art Institute API circuit is open')
+
+            try:
+                with timer('artic'):
+                    r = self.session.get(url, params=params, timeout=self.timeout)
+                # A body that is not JSON is a failed attempt too
+                data = r.json() if r.ok else None
+            except (requests.RequestException, ValueError) as e:
+                error = e
+            else:
+                if r.status_code not in RETRY_STATUSES:
+                    # Anything else is an answer, even a 4xx for bad input
+                    self.breaker.record_success()
+                    if not r.ok:
+                        raise ArtworkAPIError(f'Art Institute API returned {r.status_code}')
+                    return data
+                error = ArtworkAPIError(f'Art Institute API returned {r.status_code}')
+
+            self.breaker.record_failure()
+            if attempt < self.retries:
+                time.sleep(backoff_delay(attempt, self.backoff, self.backoff_max))
+
+        raise ArtworkAPIUnavailable(str(error)) from error
+
+
+class AsyncArticClient:
+    """
+    ArticClient for async code: the same requests, retries and circuit
+    breaker (shared with the sync client), without a thread per request.
+    Bound to the event loop it is first used on, see get_async_client().
+    """
+
+    def __init__(self, breaker, base_url, fields, timeout, retries, backoff, backoff_max,
+                 user_agent, async_max_concurrency, **options):
+        self.base_url = base_url.rstrip('/')
+        self.fields = ','.join(fields)
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.breaker = breaker
+        # Requests over the limit wait here rather than for a pooled
+        # connection, which would time out
+        self.semaphore = asyncio.Semaphore(async_max_concurrency)
+
+        connect, read = timeout if isinstance(timeout, (list, tuple)) else (timeout, timeout)
+        self.client = httpx.AsyncClient(
+            headers={'User-Agent': user_agent},
+            timeout=httpx.Timeout(read, connect=connect),
+            limits=httpx.Limits(max_connections=async_max_concurrency),
+        )
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def get_artworks(self, external_ids):
+        """Async ArticClient.get_artworks()."""
+        data = await self._get(f'{self.base_url}/artworks', artworks_params(external_ids, self.fields))
+        return data.get('data', [])
+
+    async def _get(self, url, params):
+        for attempt in range(self.retries + 1):
+            if not self.breaker.allow():
+                raise ArtworkAPIUnavailable('Art Institute API circuit is open')
+
+            try:
+                async with self.semaphore:
+                    with timer('artic'):
+                        r = await self.client.get(url, params=params)
+                data = r.json() if r.is_success else None
+            except (httpx.HTTPError, ValueError) as e:
+                error = e
+            else:
+                if r.status_code not in RETRY_STATUSES:
+                    self.breaker.record_success()
+                    if not r.is_success:
+                        raise ArtworkAPIError(f'Art Institute API returned {r.status_code}')
+                    return data
+                error = ArtworkAPIError(f'Art Institute API returned {r.status_code}')
+
+            self.breaker.record_failure()
+            if attempt < self.retries:
+                await asyncio.sleep(backoff_delay(attempt, self.backoff, self.backoff_max))
+
+        raise ArtworkAPIUnavailable(str(error)) from error
+
+
+def artworks_params(external_ids, fields):
+    return {
+        'ids': ','.join(str(external_id) for external_id in external_ids),
+        'fields': fields,
+        'limit': len(external_ids),
+    }
+
+
+def backoff_delay(attempt, backoff, backoff_max):
+    # Full jitter so retrying workers do not stampede together
+    return random.uniform(0, min(backoff_max, backoff * 2 ** attempt))
+
+
+def get_options():
+    return {key.lower(): value for key, value in {**DEFAULTS, **getattr(settings, 'ARTIC_API', {})}.items()}
+
+
+_client = None
+_client_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_client():
+    """Return the process-wide client configured in settings."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ArticClient(**get_options())
+    return _client
+
+
+async def get_async_client():
+    """
+    Return the async client of the running event loop, closed when the
+    loop shuts down. Under ASGI that is one client per worker process;
+    async_to_sync() makes a loop, and so a client, per call.
+    """
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(loop)
+    if entry is None:
+        client = AsyncArticClient(get_client().breaker, **get_options())
+        closer = _close_on_shutdown(client)
+        entry = _async_clients[loop] = (client, closer)
+        await closer.asend(None)
+    return entry[0]
+
+
+async def _close_on_shutdown(client):
+    # Left suspended at the yield: the loop finalizes the async generators
+    # still open when it shuts down (asyncio.run() and so async_to_sync()
+    # do), or when they are dropped, which closes the client
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+
+def _reset_client(*, setting, **kwargs):
+    global _client
+    if setting == 'ARTIC_API':
+        _client = None
+        _async_clients.clear()
+
+
+setting_changed.connect(_reset_client)
@@ -0,0 +1,221 @@
+"""
+Cache for artwork metadata fetched from the Art Institute API.
+
+Entries are keyed by ``external_id``. A cached value is either the
+artwork data (a small dict) or ``None`` for an id the API reported as
+not found; the latter is kept for the shorter negative TTL so a typo
+does not hit the network on every retry, but a new artwork shows up
+reasonably soon.
+
+The backend is chosen with the ``ARTWORK_CACHE`` setting:
+
+    ARTWORK_CACHE = {
+        'BACKEND': 'main.travels.artwork_cache.LocMemArtworkCache',
+        'MAX_ENTRIES': 1024,
+        'TTL': 86400,
+        'NEGATIVE_TTL': 300,
+    }
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.utils.module_loading import import_string
+
+# Returned by get() when nothing usable is cached for the id
+MISSING = object()
+
+DEFAULTS = {
+    'BACKEND': 'main.travels.artwork_cache.LocMemArtworkCache',
+    'MAX_ENTRIES': 1024,
+    'TTL': 60 * 60 * 24,
+    'NEGATIVE_TTL': 60 * 5,
+    # Only used by DjangoArtworkCache
+    'CACHE_ALIAS': 'default',
+    'KEY_PREFIX': 'travels:artwork',
+}
+
+
+class BaseArtworkCache:
+    """
+    Common interface and hit/miss/eviction counters for artwork caches.
+    Subclasses implement _get_many, _set_many, clear and size.
+    """
+
+    def __init__(self, ttl, negative_ttl, **options):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, external_id):
+        return self.get_many([external_id]).get(external_id, MISSING)
+
+    def get_many(self, external_ids):
+        """
+        Return {external_id: artwork or None} for the cached ids only.
+        """
+        external_ids = list(external_ids)
+        found = self._get_many(external_ids)
+        with self._stats_lock:
+            self.hits += len(found)
+            self.misses += len(external_ids) - len(found)
+        return found
+
+    def set(self, external_id, artwork):
+        self.set_many({external_id: artwork})
+
+    def set_many(self, artworks):
+        """Store {external_id: artwork or None}."""
+        positive = {k: v for k, v in artworks.items() if v is not None}
+        negative = {k: v for k, v in artworks.items() if v is None}
+        if positive:
+            self._set_many(positive, self.ttl)
+        if negative:
+            self._set_many(negative, self.negative_ttl)
+
+    def stats(self):
+        with self._stats_lock:
+            hits, misses, evictions = self.hits, self.misses, self.evictions
+        lookups = hits + misses
+        return {
+            'backend': type(self).__name__,
+            'hits': hits,
+            'misses': misses,
+            'evictions': evictions,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'size': self.size(),
+        }
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.hits = self.misses = self.evictions = 0
+
+    def _get_many(self, external_ids):
+        raise NotImplementedError
+
+    def _set_many(self, artworks, ttl):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def size(self):
+        raise NotImplementedError
+
+
+class LocMemArtworkCache(BaseArtworkCache):
+    """
+    In-process LRU cache. Each worker process keeps its own copy.
+    """
+
+    def __init__(self, ttl, negative_ttl, max_entries, **options):
+        super().__init__(ttl, negative_ttl)
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # external_id -> (expires_at, artwork)
+        self._lock = threading.Lock()
+
+    def _get_many(self, external_ids):
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for external_id in external_ids:
+                entry = self._data.get(external_id)
+                if entry is None:
+                    continue
+                expires_at, artwork = entry
+                if expires_at <= now:
+                    del self._data[external_id]
+                    continue
+                self._data.move_to_end(external_id)
+                found[external_id] = artwork
+        return found
+
+    def _set_many(self, artworks, ttl):
+        expires_at = time.monotonic() + ttl
+        evicted = 0
+        with self._lock:
+            for external_id, artwork in artworks.items():
+                self._data[external_id] = (expires_at, artwork)
+                self._data.move_to_end(external_id)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                evicted += 1
+        if evicted:
+            with self._stats_lock:
+                self.evictions += evicted
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def size(self):
+        return len(self._data)
+
+
+class DjangoArtworkCache(BaseArtworkCache):
+    """
+    Cache backed by one of the CACHES aliases, so entries are shared
+    between workers (with a shared backend such as Redis or Memcached).
+    Eviction is left to the backend and is not counted here.
+    """
+
+    def __init__(self, ttl, negative_ttl, cache_alias, key_prefix, **options):
+        super().__init__(ttl, negative_ttl)
+        self.cache_alias = cache_alias
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def _key(self, external_id):
+        return f'{self.key_prefix}:{external_id}'
+
+    def _get_many(self, external_ids):
+        keys = {self._key(external_id): external_id for external_id in external_ids}
+        # Not-found ids are stored as None, so absent keys are the misses
+        return {keys[key]: value for key, value in self.cache.get_many(list(keys)).items()}
+
+    def _set_many(self, artworks, ttl):
+        self.cache.set_many(
+            {self._key(external_id): artwork for external_id, artwork in artworks.items()},
+            timeout=ttl,
+        )
+
+    def clear(self):
+        # Clears the whole alias; use a dedicated alias if that matters
+        self.cache.clear()
+
+    def size(self):
+        return None
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_artwork_cache():
+    """Return the process-wide artwork cache configured in settings."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                options = {**DEFAULTS, **getattr(settings, 'ARTWORK_CACHE', {})}
+                backend = import_string(options.pop('BACKEND'))
+                _cache = backend(**{key.lower(): value for key, value in options.items()})
+    return _cache
+
+
+def _reset_artwork_cache(*, setting, **kwargs):
+    global _cache
+    if setting in ('ARTWORK_CACHE', 'CACHES'):
+        _cache = None
+
+
+setting_changed.connect(_reset_artwork_cache)
@@ -0,0 +1,136 @@
+"""
+Async variants of the project and place create endpoints.
+
+Under ASGI these run on the event loop: the Art Institute lookups of a
+new project go through AsyncArticClient, so one worker keeps many slow
+lookups in flight at once instead of tying up a thread for each. A
+single new place is resolved like the sync endpoint does it, sharing
+its lookup and insert with concurrent requests for the same id.
+Database work uses the async ORM where Django has it, and sync_to_async
+for the transactional parts. Requests, responses and rules are the same
+as for POST /api/projects/ and POST /api/projects/{id}/places/.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+
+from . import changes
+from .artic import ArtworkAPIError
+from .models import MAX_PLACES, TravelProject, ProjectChange, ProjectPlace, ProjectPlaceAssignment
+from .stats import StatsDelta
+from .serializers import ArtworkServiceUnavailable, ProjectPlaceAssignmentSerializer, TravelProjectSerializer
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    # Rendered like the DRF views render it
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def parse_body(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+@csrf_exempt
+@require_POST
+async def create_project(request):
+    data = parse_body(request)
+    if data is None:
+        return json_response({"error": "Expected a JSON object"}, status.HTTP_400_BAD_REQUEST)
+
+    # Ensure at least one place is provided when creating a project
+    if not data.get('place_ids'):
+        return json_response({"error": "A project must have at least one place"}, status.HTTP_400_BAD_REQUEST)
+    try:
+        external_ids = TravelProjectSerializer().fields['place_ids'].run_validation(data['place_ids'])
+    except ValidationError as e:
+        return json_response({'place_ids': e.detail}, status.HTTP_400_BAD_REQUEST)
+    if len(external_ids) > MAX_PLACES:
+        return json_response({"error": "A project cannot have more than 10 places"}, status.HTTP_400_BAD_REQUEST)
+    try:
+        lookup = await ProjectPlace.objects.alookup(external_ids)
+    except ArtworkAPIError:
+        return json_response({'detail': ArtworkServiceUnavailable.default_detail}, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    payload, status_code = await sync_to_async(save_project)(data, lookup)
+    return json_response(payload, status_code)
+
+
+def save_project(data, lookup):
+    """Validate and create the project, with its places already looked up."""
+    serializer = TravelProjectSerializer(data=data, context={'place_lookup': lookup})
+    try:
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+    except ValidationError as e:
+        return e.detail, status.HTTP_400_BAD_REQUEST
+    return serializer.data, status.HTTP_201_CREATED
+
+
+@csrf_exempt
+@require_POST
+async def create_place(request, project_pk):
+    data = parse_body(request)
+    if data is None:
+        return json_response({"error": "Expected a JSON object"}, status.HTTP_400_BAD_REQUEST)
+
+    external_id = data.get("external_id")
+    notes = data.get("notes", "")
+    if not external_id:
+        return json_response({"error": "external_id is required"}, status.HTTP_400_BAD_REQUEST)
+
+    try:
+        project = await TravelProject.objects.aget(pk=project_pk)
+    except TravelProject.DoesNotExist:
+        return json_response({"error": "Project not found"}, status.HTTP_404_NOT_FOUND)
+
+    # Enforce max 10 places per project
+    if project.place_count >= MAX_PLACES:
+        return json_response({"error": "A project cannot have more than 10 places"}, status.HTTP_400_BAD_REQUEST)
+
+    try:
+        # Concurrent requests for the same id share one lookup and insert
+        place = await sync_to_async(ProjectPlace.objects.resolve)(external_id)
+    except DjangoValidationError as e:
+        return json_response(e.message_dict, status.HTTP_400_BAD_REQUEST)
+    except ArtworkAPIError:
+        return json_response(
+            {"error": "Art Institute API is unavailable, try again later"},
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+
+    # Prevent duplicate place in the same project
+    if await ProjectPlaceAssignment.objects.filter(project=project, place=place).aexists():
+        return json_response({"error": "This place is already added to the project"}, status.HTTP_400_BAD_REQUEST)
+
+    assignment = await sync_to_async(add_assignment)(project, place, notes)
+    if assignment is None:
+        return json_response({"error": "A project cannot have more than 10 places"}, status.HTTP_400_BAD_REQUEST)
+    return json_response(ProjectPlaceAssignmentSerializer(assignment).data, status.HTTP_201_CREATED)
+
+
+def add_assignment(project, place, notes):
+    """Assign the place, or return None if the project is full by now."""
+    with transaction.atomic():
+        if not project.adjust_counters(places=1):
+            return None
+        assignment = ProjectPlaceAssignment.objects.create(project=project, place=place, notes=notes)
+        changes.record(
+            changes.place_changes(ProjectChange.PLACE_ADDED, [assignment])
+            + changes.completion_changes(project, project.was_completed)
+        )
+        StatsDelta().add_assignments([assignment]).update_project(
+            project, project.start_date, project.was_completed
+        ).save()
+        return assignment
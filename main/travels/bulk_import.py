@@ -0,0 +1,187 @@
+"""
+Bulk import of projects from NDJSON.
+
+Every line is a project as sent to POST /api/projects/:
+``{"name": ..., "description": ..., "start_date": ..., "place_ids": [...]}``.
+Lines are read as a stream and handled a chunk at a time:
+
+1. each line is parsed and its shape checked (one place at least, at
+   most MAX_PLACES)
+2. the place ids of the whole chunk are resolved together, with one
+   query and one Art Institute request per batch of unknown ids
+3. in one transaction, the new places, the projects and their
+   assignments are inserted with bulk_create(), with the counters
+   already set, and the progress is saved
+
+Lines that fail a rule are reported with their line number and skipped;
+the others are imported. Progress is stored in ProjectImport with every
+chunk, so an interrupted import (e.g. the Art Institute API going down)
+is resumed after the last imported chunk, without duplicates. A file is
+recognized by its fingerprint (size and mtime); a request body, which
+has none, by the hash of the lines imported so far.
+"""
+import hashlib
+import json
+
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from . import changes
+from .models import ProjectChange, ProjectImport, ProjectPlace, ProjectPlaceAssignment, TravelProject
+from .serializers import ProjectImportSerializer
+from .stats import StatsDelta
+
+
+class ImportCompleted(Exception):
+    """The source has already been imported completely."""
+
+
+class ImportSourceChanged(Exception):
+    """The file or body differs from the one the unfinished import was reading."""
+
+
+def get_state(source, fingerprint='', restart=False):
+    """
+    Return the ProjectImport for source, reset if restart is set. Raises
+    ImportCompleted or ImportSourceChanged where resuming would import
+    projects twice. Pass fingerprint=None for sources imported with
+    hash_lines, whose lines are checked by import_projects().
+    """
+    state, _ = ProjectImport.objects.get_or_create(source=source, defaults={'fingerprint': fingerprint or ''})
+    if restart:
+        state.fingerprint = fingerprint or ''
+        state.position = state.created = state.failed = 0
+        state.completed = False
+        state.save()
+    elif state.completed:
+        raise ImportCompleted(source)
+    elif fingerprint is not None and state.position and state.fingerprint != fingerprint:
+        raise ImportSourceChanged(source)
+    return state
+
+
+def import_projects(lines, state, chunk_size=500, on_error=None, progress=None, hash_lines=False):
+    """
+    Import projects from an iterable of NDJSON lines (str or bytes),
+    skipping the lines state says are already done. Calls
+    on_error(line_number, errors) for every rejected line and
+    progress(state) after every chunk. Returns state with the totals.
+    Raises ArtworkAPIError if places cannot be validated; the chunks
+    before it are kept.
+
+    With hash_lines, state.fingerprint is kept as the SHA-256 of the
+    lines up to state.position, and ImportSourceChanged is raised before
+    anything is imported if the skipped lines do not match it.
+    """
+    serializer = ProjectImportSerializer()
+    digest = hashlib.sha256() if hash_lines else None
+    chunk = []
+    number = 0
+    for number, line in enumerate(lines, 1):
+        if digest:
+            digest.update(line.encode() if isinstance(line, str) else line)
+        if number <= state.position:
+            if number == state.position and digest and digest.hexdigest() != state.fingerprint:
+                raise ImportSourceChanged(state.source)
+            continue
+        chunk.append((number, line))
+        if len(chunk) >= chunk_size:
+            _import_chunk(serializer, chunk, state, on_error, digest)
+            if progress:
+                progress(state)
+            chunk = []
+    if number < state.position:
+        # Shorter than what was already imported
+        raise ImportSourceChanged(state.source)
+    _import_chunk(serializer, chunk, state, on_error, digest, completed=True)
+    return state
+
+
+def parse_line(serializer, line):
+    """Return (validated data, None) or (None, errors) for one line."""
+    try:
+        data = json.loads(line)
+    except ValueError as e:
+        return None, {'line': [f'Invalid JSON: {e}']}
+    if not isinstance(data, dict):
+        return None, {'line': ['Expected a JSON object']}
+    try:
+        return serializer.run_validation(data), None
+    except ValidationError as e:
+        return None, e.detail
+
+
+def _import_chunk(serializer, chunk, state, on_error, digest=None, completed=False):
+    items = []
+    errors = []
+    for number, line in chunk:
+        if not line.strip():
+            continue
+        data, line_errors = parse_line(serializer, line)
+        if line_errors:
+            errors.append((number, line_errors))
+        else:
+            data['place_ids'] = list(dict.fromkeys(data['place_ids']))
+            items.append((number, data))
+
+    # One lookup for all the places of the chunk
+    places, place_errors = ProjectPlace.objects.lookup(
+        [external_id for _, data in items for external_id in data['place_ids']]
+    )
+    valid = []
+    for number, data in items:
+        bad = {
+            str(external_id): [place_errors[external_id]]
+            for external_id in data['place_ids'] if external_id in place_errors
+        }
+        if bad:
+            errors.append((number, {'place_ids': bad}))
+        else:
+            valid.append(data)
+
+    with transaction.atomic():
+        if valid:
+            _save_projects(valid, places)
+        state.position = chunk[-1][0] if chunk else state.position
+        state.created += len(valid)
+        state.failed += len(errors)
+        state.completed = completed
+        if digest:
+            state.fingerprint = digest.hexdigest()
+        state.save(update_fields=['position', 'created', 'failed', 'completed', 'fingerprint', 'updated_at'])
+
+    if on_error:
+        for number, line_errors in sorted(errors, key=lambda error: error[0]):
+            on_error(number, line_errors)
+
+
+def _save_projects(items, places):
+    needed = {external_id: places[external_id] for data in items for external_id in data['place_ids']}
+    places = ProjectPlace.objects.bulk_save(needed)
+
+    projects = TravelProject.objects.bulk_create([
+        TravelProject(
+            name=data['name'],
+            description=data.get('description'),
+            start_date=data.get('start_date'),
+            place_count=len(data['place_ids']),
+        )
+        for data in items
+    ])
+    assignments = ProjectPlaceAssignment.objects.bulk_create([
+        ProjectPlaceAssignment(project=project, place=places[external_id])
+        for project, data in zip(projects, items)
+        for external_id in data['place_ids']
+    ])
+
+    stats = StatsDelta().add_assignments(assignments)
+    for project in projects:
+        stats.add_project(project)
+    stats.save()
+
+    by_project = {project.pk: [] for project in projects}
+    for assignment in assignments:
+        by_project[assignment.project_id].append(assignment)
+    changes.record(changes.project_changes(
+        ProjectChange.PROJECT_CREATED, [(project, by_project[project.pk]) for project in projects]
+    ))
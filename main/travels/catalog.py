@@ -0,0 +1,225 @@
+"""
+Import of Art Institute artwork dumps into the local Artwork catalog.
+
+Dumps are read as a stream, one record at a time, so memory use does
+not depend on the dump size. Supported formats, optionally gzipped:
+
+- JSON Lines, one artwork object per line
+- JSON, either an array of artworks or an API style ``{"data": [...]}``
+  document
+
+Records are upserted in batches and rows whose content did not change
+are skipped. Progress is stored in ArtworkImport after every batch so an
+interrupted import resumes where it stopped.
+"""
+import gzip
+import hashlib
+import json
+import os
+
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from .models import LOCATION_FIELDS, Artwork, ArtworkImport, artwork_location
+
+READ_SIZE = 64 * 1024
+
+class DumpFormatError(ValueError):
+    pass
+
+
+def open_dump(path):
+    """Open a dump as text, transparently decompressing gzip files."""
+    with open(path, 'rb') as f:
+        gzipped = f.read(2) == b'\x1f\x8b'
+    if gzipped:
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def detect_format(path):
+    name = path[:-3] if path.endswith('.gz') else path
+    return 'jsonl' if name.endswith(('.jsonl', '.ndjson')) else 'json'
+
+
+def iter_jsonl(f):
+    for number, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise DumpFormatError(f'Line {number}: {e}')
+
+
+class _Reader:
+    """JSON text read READ_SIZE characters at a time, decoded value by value."""
+
+    def __init__(self, f):
+        self.f = f
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Read more text, dropping what was consumed. False at the end."""
+        chunk = self.f.read(READ_SIZE)
+        self.eof = not chunk
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return not self.eof
+
+    def peek(self, skip=' \t\r\n'):
+        """The next character not in skip, or '' at the end."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in skip:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ''
+
+    def decode(self):
+        """Decode the value at the current position."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except ValueError as e:
+                # Incomplete until the rest of the value is read
+                if not self.fill():
+                    raise DumpFormatError(f'Unexpected end of dump: {e}')
+                continue
+            # A number may go on in the next chunk
+            if end == len(self.buffer) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json(f):
+    """
+    Yield the objects of the top-level array, or of the "data" array of a
+    top-level object, decoding one element at a time. Values before
+    "data" in the object are decoded and skipped.
+    """
+    reader = _Reader(f)
+    first = reader.peek()
+    if first == '{':
+        reader.pos += 1
+        # Only keys of the top-level object, not of nested ones
+        while True:
+            if reader.peek(' \t\r\n,') != '"':
+                raise DumpFormatError('No array of artworks found')
+            key = reader.decode()
+            if reader.peek() != ':':
+                raise DumpFormatError(f'Expected ":" after key {key!r}')
+            reader.pos += 1
+            if key == 'data' and reader.peek() == '[':
+                break
+            reader.decode()
+    elif first != '[':
+        raise DumpFormatError('No array of artworks found')
+    reader.pos += 1
+
+    while True:
+        char = reader.peek(' \t\r\n,')
+        if char == ']':
+            return
+        if not char:
+            raise DumpFormatError('Unexpected end of dump')
+        if char != '{':
+            raise DumpFormatError(f'Expected an artwork object, got {char!r}')
+        yield reader.decode()
+
+
+def iter_records(f, format):
+    return iter_jsonl(f) if format == 'jsonl' else iter_json(f)
+
+
+def to_artwork(record):
+    """Map a dump record to an unsaved Artwork, or None if it has no id."""
+    external_id = record.get('id')
+    if not isinstance(external_id, int):
+        return None
+    title = record.get('title') or ''
+    location = artwork_location(record)
+    source_updated_at = record.get('updated_at')
+    checksum = hashlib.sha1(
+        json.dumps([title, source_updated_at, *location.values()], ensure_ascii=False).encode()
+    ).hexdigest()
+    return Artwork(
+        external_id=external_id,
+        title=title,
+        source_updated_at=parse_datetime(source_updated_at) if source_updated_at else None,
+        checksum=checksum,
+        **location,
+    )
+
+
+def save_batch(artworks):
+    """
+    Upsert the artworks that are new or changed. Returns how many were
+    written.
+    """
+    # Last record wins if an id repeats within the batch
+    artworks = {artwork.external_id: artwork for artwork in artworks}
+    existing = dict(
+        Artwork.objects.filter(external_id__in=list(artworks)).values_list('external_id', 'checksum')
+    )
+    changed = [artwork for artwork in artworks.values() if existing.get(artwork.external_id) != artwork.checksum]
+    if changed:
+        Artwork.objects.bulk_create(
+            changed,
+            update_conflicts=True,
+            unique_fields=['external_id'],
+            update_fields=['title', *LOCATION_FIELDS, 'source_updated_at', 'checksum', 'imported_at'],
+        )
+    return len(changed)
+
+
+def fingerprint(path):
+    stat = os.stat(path)
+    return f'{stat.st_size}:{int(stat.st_mtime)}'
+
+
+def import_dump(path, format=None, batch_size=1000, restart=False, progress=None):
+    """
+    Import the dump at path. Returns the ArtworkImport row with the
+    totals. An unfinished import of the same unchanged file is resumed
+    unless restart is set.
+    """
+    format = format or detect_format(path)
+    state, _ = ArtworkImport.objects.get_or_create(source=os.path.abspath(path))
+    current = fingerprint(path)
+    if restart or state.completed or state.fingerprint != current:
+        state.fingerprint = current
+        state.position = state.written = 0
+        state.completed = False
+        state.save()
+
+    skip = state.position
+    with open_dump(path) as f:
+        batch = []
+        for index, record in enumerate(iter_records(f, format)):
+            if index < skip:
+                continue
+            batch.append(record)
+            if len(batch) >= batch_size:
+                _commit(state, batch)
+                if progress:
+                    progress(state)
+                batch = []
+        _commit(state, batch, completed=True)
+    return state
+
+
+def _commit(state, records, completed=False):
+    artworks = [artwork for artwork in map(to_artwork, records) if artwork is not None]
+    with transaction.atomic():
+        state.written += save_batch(artworks) if artworks else 0
+        state.position += len(records)
+        state.completed = completed
+        state.save(update_fields=['written', 'position', 'completed', 'updated_at'])
@@ -0,0 +1,227 @@
+"""
+Server-Sent Events stream of a project's changes.
+
+GET /api/projects/{id}/changes/ answers with ``text/event-stream``: a
+``project.snapshot`` event with the project as GET /api/projects/{id}/
+returns it, then one event per change log entry (see changes.py), named
+after its kind, with the entry id as the event id. A client that
+reconnects with Last-Event-ID (EventSource does so by itself, or pass
+?last_event_id=) gets the entries it missed instead of a snapshot, or a
+new snapshot if they have been compacted away. The stream ends after
+project.deleted, or after MAX_STREAM_DURATION, when the client simply
+reconnects.
+
+Streams are meant to be served under ASGI (main/asgi.py), where they
+wait on the event loop instead of holding a thread each. However many
+streams a worker serves, one ChangeBroker per event loop reads new log
+entries once per POLL_INTERVAL and hands them to the streams of their
+project.
+"""
+import asyncio
+import json
+import weakref
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework import status
+
+from . import changes, representations
+from .models import ProjectChange
+
+DEFAULTS = {
+    # Seconds between reads of the change log, per worker
+    'POLL_INTERVAL': 1.0,
+    # Seconds of silence after which a comment keeps proxies from closing the stream
+    'HEARTBEAT': 15,
+    # Seconds after which a stream is ended; the client reconnects
+    'MAX_STREAM_DURATION': 300,
+    # Milliseconds a client waits before reconnecting
+    'RETRY': 3000,
+    # Entries undelivered to one stream before it reads them from the log instead
+    'QUEUE_SIZE': 1000,
+    # Age in seconds after which the compact_changes command deletes entries
+    'RETENTION': 60 * 60 * 24 * 7,
+}
+
+SNAPSHOT = 'project.snapshot'
+
+
+def get_options():
+    return {**DEFAULTS, **getattr(settings, 'CHANGE_FEED', {})}
+
+
+class Subscription:
+
+    def __init__(self, project_id, size):
+        self.project_id = project_id
+        self.queue = asyncio.Queue(size)
+        # Set when the queue overflowed and entries were dropped
+        self.lagging = False
+
+
+class ChangeBroker:
+    """
+    Reads the change log for all the streams of an event loop, while
+    there are any, and puts each new entry in the queues of the streams
+    of its project.
+    """
+
+    def __init__(self):
+        self.subscriptions = defaultdict(set)
+        self.cursor = None
+        self.task = None
+
+    async def subscribe(self, project_id, options):
+        """
+        Return a Subscription to project_id. Entries after the returned
+        cursor will be queued.
+        """
+        if self.cursor is None:
+            cursor = await sync_to_async(changes.latest_id)()
+            # Another stream may have set it meanwhile
+            if self.cursor is None:
+                self.cursor = cursor
+        subscription = Subscription(project_id, options['QUEUE_SIZE'])
+        self.subscriptions[project_id].add(subscription)
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.run(options['POLL_INTERVAL']))
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscribers = self.subscriptions.get(subscription.project_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self.subscriptions[subscription.project_id]
+
+    async def run(self, poll_interval):
+        try:
+            while self.subscriptions:
+                await asyncio.sleep(poll_interval)
+                entries = await sync_to_async(self.read)()
+                for entry in entries:
+                    for subscription in self.subscriptions.get(entry.project_id, ()):
+                        try:
+                            subscription.queue.put_nowait(entry)
+                        except asyncio.QueueFull:
+                            subscription.lagging = True
+        finally:
+            self.task = None
+            # The next subscriber starts from the then latest entry
+            self.cursor = None
+
+    def read(self):
+        entries = list(ProjectChange.objects.filter(id__gt=self.cursor).order_by('id'))
+        if entries:
+            self.cursor = entries[-1].id
+        return entries
+
+
+_brokers = weakref.WeakKeyDictionary()
+
+
+def get_broker():
+    loop = asyncio.get_running_loop()
+    broker = _brokers.get(loop)
+    if broker is None:
+        broker = _brokers[loop] = ChangeBroker()
+    return broker
+
+
+def format_event(event_id, kind, data):
+    data = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return f'id: {event_id}\nevent: {kind}\ndata: {data}\n\n'
+
+
+def snapshot(project_id):
+    """Return (the latest entry id, the project's representation or None)."""
+    latest = changes.latest_id()
+    projects = representations.project_dicts([project_id])
+    return latest, projects[0] if projects else None
+
+
+def parse_last_event_id(request):
+    value = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+async def event_stream(subscription, broker, last_id, first, options):
+    """
+    Yield the events of the subscription's project after last_id,
+    starting with first, a (kind, data) event at last_id or None, until
+    the project is deleted or the stream has lasted long enough.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + options['MAX_STREAM_DURATION']
+    project_id = subscription.project_id
+    try:
+        yield f'retry: {options["RETRY"]}\n\n'
+        if first is not None:
+            yield format_event(last_id, *first)
+            if first[0] == ProjectChange.PROJECT_DELETED:
+                return
+        backlog = await sync_to_async(list)(changes.changes_after(project_id, last_id))
+        while True:
+            for entry in backlog:
+                # Entries queued while the backlog was read come twice
+                if entry.id <= last_id:
+                    continue
+                last_id = entry.id
+                yield format_event(entry.id, entry.kind, entry.data)
+                if entry.kind == ProjectChange.PROJECT_DELETED:
+                    return
+
+            if subscription.lagging:
+                subscription.lagging = False
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                backlog = await sync_to_async(list)(changes.changes_after(project_id, last_id))
+                continue
+
+            timeout = min(options['HEARTBEAT'], deadline - loop.time())
+            if timeout <= 0:
+                return
+            try:
+                backlog = [await asyncio.wait_for(subscription.queue.get(), timeout)]
+            except asyncio.TimeoutError:
+                backlog = []
+                yield ': keepalive\n\n'
+    finally:
+        broker.unsubscribe(subscription)
+
+
+@require_GET
+async def project_changes(request, project_pk):
+    options = get_options()
+    last_id = parse_last_event_id(request)
+    broker = get_broker()
+    subscription = await broker.subscribe(project_pk, options)
+
+    first = None
+    if last_id is None or await sync_to_async(changes.compacted_after)(last_id):
+        resumed = last_id is not None
+        last_id, project = await sync_to_async(snapshot)(project_pk)
+        if project is not None:
+            first = (SNAPSHOT, project)
+        elif resumed:
+            # Deleted while the client was away
+            first = (ProjectChange.PROJECT_DELETED, {'id': project_pk})
+        else:
+            broker.unsubscribe(subscription)
+            return JsonResponse({"error": "Project not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    response = StreamingHttpResponse(
+        event_stream(subscription, broker, last_id, first, options), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Unbuffered through nginx
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,152 @@
+"""
+Change log of projects and their places.
+
+Every write path (the API views and serializers, the async views, the
+bulk import and the background validation) records what it changed as
+ProjectChange rows, in its own transaction, so the log never misses a
+committed change nor shows a rolled back one. Each entry holds the new
+state of what changed, shaped like the API's representation:
+
+- project.created: the project with its places
+- project.updated: the project without its places (also recorded when
+  a place change completes it or makes it incomplete again)
+- project.deleted, place.removed: ``{"id": ...}``
+- place.added, place.updated: the place
+
+Since entries carry states rather than deltas, applying one twice or
+skipping a place.updated/project.updated that a later entry for the
+same place/project supersedes leaves a client with the same result.
+compact() relies on that to drop superseded entries, and drops entries
+older than the retention period; the change feed sends a new snapshot
+to a client whose Last-Event-ID is older than what is left.
+"""
+from datetime import timedelta
+
+from django.db.models import Exists, Max, Min, OuterRef
+from django.utils import timezone
+
+from .models import ProjectChange, ProjectPlaceAssignment
+
+
+def project_state(project):
+    return {
+        'id': project.pk,
+        'name': project.name,
+        'description': project.description,
+        'start_date': None if project.start_date is None else project.start_date.isoformat(),
+        'is_completed': project.is_completed,
+    }
+
+
+def place_state(assignment):
+    place = assignment.place
+    return {
+        'id': assignment.pk,
+        'external_id': place.external_id,
+        'title': place.title,
+        'validation_status': place.validation_status,
+        'notes': assignment.notes,
+        'visited': assignment.visited,
+    }
+
+
+def record(entries):
+    """Save ProjectChange entries (from the functions below) with one INSERT."""
+    if entries:
+        ProjectChange.objects.bulk_create(entries)
+
+
+def project_changes(kind, projects):
+    """
+    Entries for a change to projects; for project.created, projects are
+    (project, assignments) pairs.
+    """
+    entries = []
+    for project in projects:
+        if kind == ProjectChange.PROJECT_CREATED:
+            project, places = project
+            data = {**project_state(project), 'places': [place_state(assignment) for assignment in places]}
+        elif kind == ProjectChange.PROJECT_DELETED:
+            data = {'id': project.pk}
+        else:
+            data = project_state(project)
+        entries.append(ProjectChange(project_id=project.pk, kind=kind, data=data))
+    return entries
+
+
+def place_changes(kind, assignments):
+    """Entries for the same change to many assignments."""
+    return [
+        ProjectChange(
+            project_id=assignment.project_id,
+            kind=kind,
+            assignment_id=assignment.pk,
+            data={'id': assignment.pk} if kind == ProjectChange.PLACE_REMOVED else place_state(assignment),
+        )
+        for assignment in assignments
+    ]
+
+
+def completion_changes(project, was_completed):
+    """A project.updated entry if a place change flipped is_completed."""
+    if project.is_completed == was_completed:
+        return []
+    return project_changes(ProjectChange.PROJECT_UPDATED, [project])
+
+
+def record_place_status(places):
+    """Record place.updated for every assignment of places whose status changed."""
+    assignments = ProjectPlaceAssignment.objects.filter(place__in=places).with_place().order_by('id')
+    record(place_changes(ProjectChange.PLACE_UPDATED, assignments))
+
+
+def changes_after(project_id, last_id, limit=None):
+    changes = ProjectChange.objects.filter(project_id=project_id, id__gt=last_id).order_by('id')
+    return changes[:limit] if limit else changes
+
+
+def latest_id():
+    return ProjectChange.objects.aggregate(latest=Max('id'))['latest'] or 0
+
+
+def compacted_after(last_id):
+    """Whether entries after last_id have been dropped as too old."""
+    oldest = ProjectChange.objects.aggregate(oldest=Min('id'))['oldest']
+    return oldest is not None and last_id < oldest - 1
+
+
+def compact(retention, chunk_size=1000):
+    """
+    Delete superseded place.updated/project.updated entries and entries
+    older than retention (a timedelta or seconds). The latest entry is
+    always kept, so ids are never handed out twice. Deletes chunk_size
+    rows per query. Returns (superseded, expired) counts.
+    """
+    if not isinstance(retention, timedelta):
+        retention = timedelta(seconds=retention)
+
+    later_place = ProjectChange.objects.filter(assignment_id=OuterRef('assignment_id'), id__gt=OuterRef('id'))
+    later_project = ProjectChange.objects.filter(
+        project_id=OuterRef('project_id'),
+        kind__in=[ProjectChange.PROJECT_UPDATED, ProjectChange.PROJECT_DELETED],
+        id__gt=OuterRef('id'),
+    )
+    superseded = _delete_chunked(
+        ProjectChange.objects.filter(kind=ProjectChange.PLACE_UPDATED).filter(Exists(later_place)), chunk_size
+    )
+    superseded += _delete_chunked(
+        ProjectChange.objects.filter(kind=ProjectChange.PROJECT_UPDATED).filter(Exists(later_project)), chunk_size
+    )
+    expired = _delete_chunked(
+        ProjectChange.objects.filter(created_at__lt=timezone.now() - retention, id__lt=latest_id()), chunk_size
+    )
+    return superseded, expired
+
+
+def _delete_chunked(queryset, chunk_size):
+    deleted = 0
+    while True:
+        ids = list(queryset.order_by('id').values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        deleted += ProjectChange.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,50 @@
+"""
+Conditional GET support for project resources.
+
+The ETag and Last-Modified validators come from TravelProject.version
+and updated_at, read with one small query; nothing is serialized to
+compute them. A request whose If-None-Match / If-Modified-Since still
+matches gets a 304 without the assignments ever being loaded.
+"""
+import zlib
+
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from .models import TravelProject
+
+
+def project_validators(request, project_pk):
+    """
+    Return (etag, last_modified) for a project, (None, None) if it does
+    not exist. Fetched once per request.
+    """
+    cached = getattr(request, '_project_validators', None)
+    if cached is not None:
+        return cached
+
+    try:
+        row = TravelProject.objects.filter(pk=project_pk).values_list('version', 'updated_at').first()
+    except (TypeError, ValueError):
+        # Not an id; the view answers 404
+        row = None
+    if row is None:
+        validators = (None, None)
+    else:
+        version, updated_at = row
+        # Other URLs and query strings (pages, page sizes) are other representations
+        representation = zlib.crc32(request.get_full_path().encode())
+        validators = (f'{project_pk}.{version}.{representation:x}', updated_at)
+    request._project_validators = validators
+    return validators
+
+
+def conditional_project(lookup_kwarg):
+    """
+    Decorate a view method that renders the project whose id is in the
+    lookup_kwarg URL keyword argument with ETag/Last-Modified handling.
+    """
+    return method_decorator(condition(
+        etag_func=lambda request, *args, **kwargs: project_validators(request, kwargs[lookup_kwarg])[0],
+        last_modified_func=lambda request, *args, **kwargs: project_validators(request, kwargs[lookup_kwarg])[1],
+    ))
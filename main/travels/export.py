@@ -0,0 +1,137 @@
+"""
+Streaming export of all projects with their places.
+
+Rows are read with one query through iterator(), a chunk at a time, and
+written out as they come, so memory use does not grow with the number
+of projects and the first bytes go out as soon as the first chunk is
+read. Projects are ordered by (updated_at, id): an incremental pull
+passes the largest updated_at it has seen as ``since`` (inclusive, so
+rows with that same timestamp come again and are deduplicated by id).
+Deleted projects are not reported.
+
+Formats:
+
+- ndjson: one JSON object per project, shaped like the API's project
+  representation plus created_at/updated_at
+- csv: one row per place, the project columns repeated
+"""
+import csv
+import datetime
+import json
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import TravelProject
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+PROJECT_FIELDS = ['id', 'name', 'description', 'start_date', 'is_completed', 'created_at', 'updated_at']
+PLACE_FIELDS = ['id', 'external_id', 'title', 'validation_status', 'notes', 'visited']
+
+CSV_HEADER = [f'project_{name}' if name == 'id' else name for name in PROJECT_FIELDS] + [
+    'assignment_id', 'external_id', 'title', 'validation_status', 'notes', 'visited',
+]
+
+COLUMNS = PROJECT_FIELDS + [
+    'projectplaceassignment__id',
+    'projectplaceassignment__place__external_id',
+    'projectplaceassignment__place__title',
+    'projectplaceassignment__place__validation_status',
+    'projectplaceassignment__notes',
+    'projectplaceassignment__visited',
+]
+
+# Bytes collected before a piece of output is handed on
+FLUSH_SIZE = 16 * 1024
+
+
+def parse_since(value):
+    """
+    Parse an ISO 8601 date or datetime; naive values are in the current
+    time zone. Raises ValueError if it is neither.
+    """
+    since = parse_datetime(value)
+    if since is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        since = datetime.datetime.combine(day, datetime.time())
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def export_rows(since=None, chunk_size=1000):
+    """
+    Yield a tuple of COLUMNS per assignment (with None place columns for
+    a project without places), in export order.
+    """
+    projects = TravelProject.objects.all()
+    if since is not None:
+        projects = projects.filter(updated_at__gte=since)
+    # Reverse FK in values_list() is a LEFT OUTER JOIN
+    return (
+        projects.order_by('updated_at', 'id', 'projectplaceassignment__id')
+        .values_list(*COLUMNS)
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def format_value(value):
+    # Same formats as the API
+    if isinstance(value, datetime.datetime):
+        value = timezone.localtime(value).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return value
+
+
+def ndjson_lines(rows):
+    """One JSON line per project, grouping the consecutive rows of each."""
+    project = None
+    width = len(PROJECT_FIELDS)
+    for row in rows:
+        if project is None or project['id'] != row[0]:
+            if project is not None:
+                yield json.dumps(project, ensure_ascii=False) + '\n'
+            project = dict(zip(PROJECT_FIELDS, map(format_value, row[:width])))
+            project['places'] = []
+        if row[width] is not None:
+            project['places'].append(dict(zip(PLACE_FIELDS, row[width:])))
+    if project is not None:
+        yield json.dumps(project, ensure_ascii=False) + '\n'
+
+
+class _Line:
+    """File-like object that hands back what csv.writer writes."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Line())
+    yield writer.writerow(CSV_HEADER)
+    for row in rows:
+        yield writer.writerow([format_value(value) for value in row])
+
+
+def export(format='ndjson', since=None, chunk_size=1000):
+    """Yield the export as text pieces of about FLUSH_SIZE."""
+    lines = csv_lines if format == 'csv' else ndjson_lines
+    buffer = []
+    size = 0
+    for line in lines(export_rows(since, chunk_size)):
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
@@ -0,0 +1,85 @@
+"""
+SQL of the travels_placesearch full-text index (see search.py), for the
+migrations that create it and those that rebuild travels_projectplace.
+Uses SQLite FTS5; run() skips it on other databases.
+
+Migrations run this as it is now, so a change to it needs a migration
+that drops and creates the index or triggers again.
+"""
+
+CREATE_TABLE = """
+    CREATE VIRTUAL TABLE travels_placesearch USING fts5(
+        title, notes, tokenize = 'unicode61 remove_diacritics 2'
+    )
+"""
+
+ASSIGNMENT_INSERT = """
+    CREATE TRIGGER travels_placesearch_assignment_insert
+    AFTER INSERT ON travels_projectplaceassignment BEGIN
+        INSERT INTO travels_placesearch (rowid, title, notes)
+        SELECT NEW.id, p.title, NEW.notes FROM travels_projectplace p WHERE p.id = NEW.place_id;
+    END
+"""
+
+ASSIGNMENT_UPDATE = """
+    CREATE TRIGGER travels_placesearch_assignment_update
+    AFTER UPDATE OF notes, place_id ON travels_projectplaceassignment
+    WHEN OLD.notes IS NOT NEW.notes OR OLD.place_id IS NOT NEW.place_id BEGIN
+        DELETE FROM travels_placesearch WHERE rowid = OLD.id;
+        INSERT INTO travels_placesearch (rowid, title, notes)
+        SELECT NEW.id, p.title, NEW.notes FROM travels_projectplace p WHERE p.id = NEW.place_id;
+    END
+"""
+
+ASSIGNMENT_DELETE = """
+    CREATE TRIGGER travels_placesearch_assignment_delete
+    AFTER DELETE ON travels_projectplaceassignment BEGIN
+        DELETE FROM travels_placesearch WHERE rowid = OLD.id;
+    END
+"""
+
+PLACE_UPDATE = """
+    CREATE TRIGGER travels_placesearch_place_update
+    AFTER UPDATE OF title ON travels_projectplace
+    WHEN OLD.title IS NOT NEW.title BEGIN
+        UPDATE travels_placesearch SET title = NEW.title
+        WHERE rowid IN (SELECT id FROM travels_projectplaceassignment WHERE place_id = NEW.id);
+    END
+"""
+
+FILL = """
+    INSERT INTO travels_placesearch (rowid, title, notes)
+    SELECT a.id, p.title, a.notes
+    FROM travels_projectplaceassignment a JOIN travels_projectplace p ON p.id = a.place_id
+"""
+
+CREATE = [CREATE_TABLE, ASSIGNMENT_INSERT, ASSIGNMENT_UPDATE, ASSIGNMENT_DELETE, PLACE_UPDATE, FILL]
+
+DROP = [
+    "DROP TRIGGER IF EXISTS travels_placesearch_place_update",
+    "DROP TRIGGER IF EXISTS travels_placesearch_assignment_delete",
+    "DROP TRIGGER IF EXISTS travels_placesearch_assignment_update",
+    "DROP TRIGGER IF EXISTS travels_placesearch_assignment_insert",
+    "DROP TABLE IF EXISTS travels_placesearch",
+]
+
+# SQLite rebuilds travels_projectplace to add a column, which drops the
+# triggers on it and fails on the ones that read it: migrations doing
+# that drop these first and create them again afterwards.
+PLACE_TRIGGERS = [ASSIGNMENT_INSERT, ASSIGNMENT_UPDATE, PLACE_UPDATE]
+
+DROP_PLACE_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS travels_placesearch_place_update",
+    "DROP TRIGGER IF EXISTS travels_placesearch_assignment_update",
+    "DROP TRIGGER IF EXISTS travels_placesearch_assignment_insert",
+]
+
+
+def run(statements):
+    """A RunPython operation executing statements on SQLite."""
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
@@ -0,0 +1,238 @@
+"""
+Idempotency-Key support for the create endpoints.
+
+A POST sent with an ``Idempotency-Key`` header claims the key (per
+method and path) by inserting an IdempotencyKey row before it runs; its
+response is then stored in that row, as rendered JSON, for TTL seconds.
+A retry with the same key and body gets that response back, with an
+``Idempotent-Replayed: true`` header, without running the view again:
+no serializer, no Art Institute lookup, no duplicate project. A retry
+arriving while the first request still runs waits for it (up to
+WAIT_TIMEOUT, then 409), woken at once when both run in the same
+process and polling the table otherwise.
+
+Responses with a 5xx status (the Art Institute API being down, say) and
+exceptions release the key, so the retry really runs. A key reused with
+a different body is refused with 422. The claim holds a random token:
+only its request stores or releases it. While requests run, one thread
+per process extends all their claims, with one query, every
+LOCK_TIMEOUT / 3 seconds. A claim no longer extended (its worker died)
+is taken over after LOCK_TIMEOUT; expired rows are deleted by the
+purge_idempotency_keys command.
+
+    IDEMPOTENCY = {
+        'TTL': 86400,
+        'LOCK_TIMEOUT': 60,
+        'WAIT_TIMEOUT': 10,
+        'POLL_INTERVAL': 0.05,
+    }
+"""
+import functools
+import hashlib
+import logging
+import secrets
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # Seconds a response is replayed for
+    'TTL': 60 * 60 * 24,
+    # Seconds after which a claim its request stopped extending is taken over
+    'LOCK_TIMEOUT': 60,
+    # Seconds a retry waits for the first request before answering 409
+    'WAIT_TIMEOUT': 10,
+    # Seconds between checks of a first request running in another process
+    'POLL_INTERVAL': 0.05,
+}
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+# Requests of this process holding a key, set when they are done
+_in_flight = {}
+_never = threading.Event()
+
+# token -> key of the claims held by requests of this process, extended
+# by the _renewer thread
+_claims = {}
+_claims_lock = threading.Lock()
+_renewer = None
+
+
+def get_options():
+    return {**DEFAULTS, **getattr(settings, 'IDEMPOTENCY', {})}
+
+
+def make_key(method, path, value):
+    return hashlib.sha256(f'{method} {path}\n{value}'.encode()).hexdigest()
+
+
+def claim(key, token, fingerprint, options):
+    """
+    Claim key with token for a request with the body fingerprint. Returns
+    None if the request now holds it, else the IdempotencyKey of its holder.
+    """
+    while True:
+        now = timezone.now()
+        # Retries are answered with this one query
+        stored = IdempotencyKey.objects.filter(key=key).first()
+        if stored is not None:
+            if stored.expires_at > now:
+                return stored
+            # Unless its holder extended it meanwhile
+            IdempotencyKey.objects.filter(key=key, token=stored.token, expires_at__lte=now).delete()
+        try:
+            with transaction.atomic():
+                IdempotencyKey.objects.create(
+                    key=key, token=token, fingerprint=fingerprint,
+                    expires_at=now + timedelta(seconds=options['LOCK_TIMEOUT']),
+                )
+            return None
+        except IntegrityError:
+            # Claimed by a concurrent request meanwhile
+            continue
+
+
+def extend(claims, options):
+    """
+    Extend the claims still in flight of a {token: key} dict. Returns
+    how many the tokens still hold.
+    """
+    # Tokens are unique, so no row matches the key of one and the token of another
+    return IdempotencyKey.objects.filter(
+        key__in=claims.values(), token__in=claims.keys(), status_code__isnull=True
+    ).update(expires_at=timezone.now() + timedelta(seconds=options['LOCK_TIMEOUT']))
+
+
+def keep_claim(key, token):
+    """Have the claim extended until drop_claim(token)."""
+    global _renewer
+    with _claims_lock:
+        _claims[token] = key
+        # Not inherited by forked workers
+        if _renewer is None or not _renewer.is_alive():
+            _renewer = threading.Thread(target=renew_claims, name='idempotency-renewer', daemon=True)
+            _renewer.start()
+
+
+def drop_claim(token):
+    with _claims_lock:
+        _claims.pop(token, None)
+
+
+def renew():
+    """Extend every claim held by this process."""
+    with _claims_lock:
+        claims = dict(_claims)
+    if claims:
+        extend(claims, get_options())
+
+
+def renew_claims():
+    """Call renew() every LOCK_TIMEOUT / 3 seconds; runs in the _renewer thread."""
+    while True:
+        time.sleep(get_options()['LOCK_TIMEOUT'] / 3)
+        try:
+            renew()
+        except Exception:
+            logger.exception("Failed to extend the idempotency key claims")
+        finally:
+            connection.close()
+
+
+def store(key, token, response, options):
+    IdempotencyKey.objects.filter(key=key, token=token).update(
+        status_code=response.status_code,
+        body=JSONRenderer().render(response.data),
+        expires_at=timezone.now() + timedelta(seconds=options['TTL']),
+    )
+
+
+def replay(stored):
+    response = HttpResponse(bytes(stored.body), status=stored.status_code, content_type='application/json')
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def idempotent(view):
+    """
+    Make a DRF view method replay its first response to requests that
+    repeat its Idempotency-Key header. Requests without it run as usual.
+    """
+    @functools.wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        value = request.headers.get(HEADER)
+        if value is None:
+            return view(self, request, *args, **kwargs)
+        if not value or len(value) > MAX_KEY_LENGTH:
+            return Response(
+                {"error": f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters long"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        options = get_options()
+        key = make_key(request.method, request.path, value)
+        fingerprint = hashlib.sha1(request.body).hexdigest()
+        token = secrets.token_hex(16)
+        deadline = time.monotonic() + options['WAIT_TIMEOUT']
+        while True:
+            stored = claim(key, token, fingerprint, options)
+            if stored is None:
+                break
+            if stored.fingerprint != fingerprint:
+                return Response(
+                    {"error": f"This {HEADER} was already used with a different request body"},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if stored.status_code is not None:
+                return replay(stored)
+            if time.monotonic() >= deadline:
+                return Response(
+                    {"error": f"A request with this {HEADER} is still in progress"},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            _in_flight.get(key, _never).wait(options['POLL_INTERVAL'])
+
+        done = _in_flight[key] = threading.Event()
+        keep_claim(key, token)
+        kept = False
+        try:
+            response = view(self, request, *args, **kwargs)
+            if response.status_code < 500:
+                store(key, token, response, options)
+                kept = True
+            return response
+        finally:
+            drop_claim(token)
+            if not kept:
+                IdempotencyKey.objects.filter(key=key, token=token).delete()
+            if _in_flight.get(key) is done:
+                del _in_flight[key]
+            done.set()
+
+    return wrapper
+
+
+def purge(chunk_size=1000):
+    """Delete expired keys, chunk_size rows per query. Returns how many."""
+    deleted = 0
+    expired = IdempotencyKey.objects.filter(expires_at__lte=timezone.now())
+    while True:
+        keys = list(expired.values_list('key', flat=True)[:chunk_size])
+        if not keys:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(key__in=keys).delete()[0]
@@ -0,0 +1,211 @@
+"""
+Visiting order of a project's places.
+
+A place is located by the gallery its artwork hangs in (see
+LOCATION_FIELDS in models.py). Places in the same gallery are 0 m apart,
+others as far as their galleries' coordinates. The order is the shortest
+open path through all located places, optionally from a given first
+place: exact (Held-Karp dynamic programming, O(n² 2ⁿ)) for up to
+EXACT_MAX_PLACES places, nearest neighbour improved by 2-opt above that.
+
+Distance matrices and orders are kept in a per-process LRU keyed by the
+places and their locations, so asking again for the same place set
+costs a dict lookup, and a place whose location changes gets a new key.
+
+    ITINERARY = {
+        'EXACT_MAX_PLACES': 10,
+        'CACHE_SIZE': 256,
+    }
+"""
+import math
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+
+DEFAULTS = {
+    # Largest place set ordered exactly; MAX_PLACES fits
+    'EXACT_MAX_PLACES': 10,
+    # Place sets whose matrix and orders are kept per process
+    'CACHE_SIZE': 256,
+}
+
+EXACT = 'exact'
+HEURISTIC = 'heuristic'
+
+EARTH_RADIUS = 6371000
+
+Stop = namedtuple('Stop', ['external_id', 'gallery_id', 'latitude', 'longitude'])
+
+
+def get_options():
+    return {**DEFAULTS, **getattr(settings, 'ITINERARY', {})}
+
+
+def distance(a, b):
+    """Metres between two stops (equirectangular, exact enough within a museum)."""
+    if a.gallery_id is not None and a.gallery_id == b.gallery_id:
+        return 0.0
+    lat_a, lat_b = math.radians(a.latitude), math.radians(b.latitude)
+    x = math.radians(b.longitude - a.longitude) * math.cos((lat_a + lat_b) / 2)
+    return EARTH_RADIUS * math.hypot(x, lat_b - lat_a)
+
+
+def distance_matrix(stops):
+    return [[distance(a, b) for b in stops] for a in stops]
+
+
+def path_length(matrix, order):
+    return sum(matrix[a][b] for a, b in zip(order, order[1:]))
+
+
+def held_karp(matrix, start=None):
+    """Shortest open path through all nodes, from start if given."""
+    n = len(matrix)
+    if n < 2:
+        return list(range(n))
+    full = (1 << n) - 1
+    # cost[mask][j]: shortest path through the nodes of mask ending at j
+    cost = [[math.inf] * n for _ in range(full + 1)]
+    parent = [[-1] * n for _ in range(full + 1)]
+    for j in range(n) if start is None else [start]:
+        cost[1 << j][j] = 0.0
+
+    for mask in range(1, full):
+        row = cost[mask]
+        for j in range(n):
+            length = row[j]
+            if length == math.inf:
+                continue
+            distances = matrix[j]
+            for k in range(n):
+                bit = 1 << k
+                if mask & bit:
+                    continue
+                if length + distances[k] < cost[mask | bit][k]:
+                    cost[mask | bit][k] = length + distances[k]
+                    parent[mask | bit][k] = j
+
+    last = min(range(n), key=lambda j: cost[full][j])
+    order = []
+    mask = full
+    while last != -1:
+        order.append(last)
+        last, mask = parent[mask][last], mask & ~(1 << last)
+    return order[::-1]
+
+
+def nearest_neighbour(matrix, start):
+    order = [start]
+    left = set(range(len(matrix))) - {start}
+    while left:
+        distances = matrix[order[-1]]
+        order.append(min(left, key=lambda k: (distances[k], k)))
+        left.remove(order[-1])
+    return order
+
+
+def two_opt(matrix, order, fixed_start=True):
+    """Reverse segments of order while that shortens the path."""
+    order = list(order)
+    n = len(order)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1 if fixed_start else 0, n - 1):
+            for j in range(i + 1, n):
+                before = after = 0.0
+                if i > 0:
+                    before += matrix[order[i - 1]][order[i]]
+                    after += matrix[order[i - 1]][order[j]]
+                if j < n - 1:
+                    before += matrix[order[j]][order[j + 1]]
+                    after += matrix[order[i]][order[j + 1]]
+                if after < before - 1e-9:
+                    order[i:j + 1] = order[i:j + 1][::-1]
+                    improved = True
+    return order
+
+
+def heuristic(matrix, start=None):
+    """Nearest neighbour from start (or from every node) improved by 2-opt."""
+    starts = range(len(matrix)) if start is None else [start]
+    orders = [two_opt(matrix, nearest_neighbour(matrix, node), start is not None) for node in starts]
+    return min(orders, key=lambda order: path_length(matrix, order))
+
+
+class RouteCache:
+    """
+    LRU of {stops: {'matrix': ..., 'routes': {start: (order, method)}}}
+    for the last CACHE_SIZE place sets.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, stops):
+        with self._lock:
+            entry = self._entries.get(stops)
+            if entry is not None:
+                self._entries.move_to_end(stops)
+            return entry
+
+    def set(self, stops, entry, size):
+        with self._lock:
+            self._entries[stops] = entry
+            self._entries.move_to_end(stops)
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+route_cache = RouteCache()
+
+
+def plan(stops, start=None):
+    """
+    Order stops (sorted and unique by external_id), from the stop with
+    external_id start if given. Returns a dict with the order (indexes
+    into stops), the distance of each leg, the method, whether it came
+    from the cache and the time taken in milliseconds.
+    """
+    options = get_options()
+    began = time.perf_counter()
+    stops = tuple(stops)
+    first = None if start is None else [stop.external_id for stop in stops].index(start)
+
+    entry = route_cache.get(stops)
+    cached = entry is not None and first in entry['routes']
+    matrix_ms = solve_ms = 0.0
+    if entry is None:
+        entry = {'matrix': distance_matrix(stops), 'routes': {}}
+        matrix_ms = (time.perf_counter() - began) * 1000
+        route_cache.set(stops, entry, options['CACHE_SIZE'])
+    if not cached:
+        solve_began = time.perf_counter()
+        if len(stops) <= options['EXACT_MAX_PLACES']:
+            route = (held_karp(entry['matrix'], first), EXACT)
+        else:
+            route = (heuristic(entry['matrix'], first), HEURISTIC)
+        # Concurrent requests may both solve; either result is the same
+        entry['routes'][first] = route
+        solve_ms = (time.perf_counter() - solve_began) * 1000
+
+    order, method = entry['routes'][first]
+    matrix = entry['matrix']
+    return {
+        'order': order,
+        'legs': [0.0] + [matrix[a][b] for a, b in zip(order, order[1:])],
+        'method': method,
+        'cached': cached,
+        'timing_ms': {
+            'matrix': round(matrix_ms, 3),
+            'solve': round(solve_ms, 3),
+            'total': round((time.perf_counter() - began) * 1000, 3),
+        },
+    }
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from main.travels.artic import ArtworkAPIError
+from main.travels.models import (
+    ARTWORKS_BATCH_SIZE, LOCATION_FIELDS, ProjectPlace, TravelProject, artwork_location, fetch_artworks,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill in the gallery and coordinates of valid places that have none, such as places "
+        "validated before locations were stored, from the catalog or the Art Institute API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=ARTWORKS_BATCH_SIZE,
+            help="Places looked up per query and API request.",
+        )
+
+    def handle(self, *args, chunk_size=ARTWORKS_BATCH_SIZE, **options):
+        places = ProjectPlace.objects.filter(
+            validation_status=ProjectPlace.VALID, gallery_id__isnull=True, latitude__isnull=True
+        ).only('id', 'external_id', *LOCATION_FIELDS).order_by('pk')
+
+        checked = located = 0
+        last_pk = 0
+        while True:
+            chunk = list(places.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                break
+            try:
+                artworks = fetch_artworks([place.external_id for place in chunk])
+            except ArtworkAPIError as e:
+                raise CommandError(f"Art Institute API failed after {checked} places ({e}); run the command again.")
+            last_pk = chunk[-1].pk
+            checked += len(chunk)
+
+            # Artworks that are not on view have no location to fill in
+            found = []
+            for place in chunk:
+                artwork = artworks.get(place.external_id)
+                if artwork is None or artwork.get('gallery_id') is None and artwork.get('latitude') is None:
+                    continue
+                for field, value in artwork_location(artwork).items():
+                    setattr(place, field, value)
+                found.append(place)
+            # The projects get a new version, so their cached payloads
+            # and ETags are not served with the old locations
+            with transaction.atomic():
+                ProjectPlace.objects.bulk_update(found, LOCATION_FIELDS)
+                TravelProject.objects.filter(projectplaceassignment__place__in=found).update(
+                    version=F('version') + 1, updated_at=timezone.now()
+                )
+            located += len(found)
+
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} places without a location, located {located}."))
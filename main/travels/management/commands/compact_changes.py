@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from main.travels.change_feed import get_options
+from main.travels.changes import compact
+
+
+class Command(BaseCommand):
+    help = (
+        "Compact the project change log read by the change feed: delete updates superseded "
+        "by a later change and entries older than CHANGE_FEED['RETENTION']."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention', type=int,
+            help="Age in seconds of the oldest entries kept (default: CHANGE_FEED['RETENTION']).",
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help="Entries deleted per query.",
+        )
+
+    def handle(self, *args, retention=None, chunk_size=1000, **options):
+        if retention is None:
+            retention = get_options()['RETENTION']
+        superseded, expired = compact(retention, chunk_size)
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {superseded} superseded and {expired} expired change log entries."
+        ))
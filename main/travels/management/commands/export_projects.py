@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main.travels.export import FORMATS, export, parse_since
+
+
+class Command(BaseCommand):
+    help = (
+        "Write all projects with their places as NDJSON or CSV, streamed with "
+        "constant memory. --since limits it to projects changed since then."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(FORMATS), default='ndjson')
+        parser.add_argument(
+            '--since',
+            help="ISO 8601 date or datetime; only projects with updated_at at or after it.",
+        )
+        parser.add_argument('--output', help="File to write; standard output by default.")
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help="Rows fetched from the database at a time.",
+        )
+
+    def handle(self, *args, format='ndjson', since=None, output=None, chunk_size=1000, **options):
+        if since is not None:
+            try:
+                since = parse_since(since)
+            except ValueError:
+                raise CommandError("--since must be an ISO 8601 date or datetime.")
+
+        pieces = export(format, since, chunk_size)
+        if output:
+            with open(output, 'w', encoding='utf-8', newline='') as f:
+                f.writelines(pieces)
+        else:
+            for piece in pieces:
+                self.stdout.write(piece, ending='')
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main.travels.catalog import DumpFormatError, import_dump
+
+
+class Command(BaseCommand):
+    help = (
+        "Import an Art Institute artworks dump (JSON or JSON Lines, optionally gzipped) "
+        "into the local artwork catalog. Unfinished imports of the same file are resumed "
+        "and unchanged artworks are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path to the dump file.")
+        parser.add_argument(
+            '--format', choices=['json', 'jsonl'],
+            help="Dump format; guessed from the file name by default.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Number of records written per transaction.",
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help="Ignore the progress of an earlier, unfinished import.",
+        )
+
+    def handle(self, *args, path, format=None, batch_size=1000, restart=False, **options):
+        def progress(state):
+            self.stdout.write(f"{state.position} records processed, {state.written} written")
+
+        try:
+            state = import_dump(path, format=format, batch_size=batch_size, restart=restart, progress=progress)
+        except (OSError, DumpFormatError) as e:
+            raise CommandError(f"Import of {path} failed: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {path}: {state.position} records processed, {state.written} written."
+        ))
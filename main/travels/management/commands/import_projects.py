@@ -0,0 +1,68 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.travels.artic import ArtworkAPIError
+from main.travels.bulk_import import ImportCompleted, ImportSourceChanged, get_state, import_projects
+from main.travels.catalog import fingerprint, open_dump
+
+
+class Command(BaseCommand):
+    help = (
+        "Create projects in bulk from an NDJSON file (optionally gzipped), one project per line "
+        "as sent to POST /api/projects/. Rejected lines are reported and skipped. An interrupted "
+        "import is resumed where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path to the NDJSON file.")
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help="Lines validated and saved per transaction.",
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help="Import from the first line even if the file was (partly) imported before.",
+        )
+        parser.add_argument(
+            '--errors',
+            help="Write rejected lines as NDJSON to this file instead of standard error.",
+        )
+
+    def handle(self, *args, path, chunk_size=500, restart=False, errors=None, **options):
+        try:
+            state = get_state(os.path.abspath(path), fingerprint(path), restart=restart)
+        except ImportCompleted:
+            raise CommandError(f"{path} has already been imported; use --restart to import it again.")
+        except ImportSourceChanged:
+            raise CommandError(f"{path} changed since its import was interrupted; use --restart.")
+        except OSError as e:
+            raise CommandError(f"Import of {path} failed: {e}")
+
+        error_file = open(errors, 'a', encoding='utf-8') if errors else None
+
+        def on_error(line, line_errors):
+            record = json.dumps({'line': line, 'errors': line_errors}, ensure_ascii=False)
+            if error_file:
+                error_file.write(record + '\n')
+            else:
+                self.stderr.write(record)
+
+        def progress(state):
+            self.stdout.write(f"{state.position} lines processed, {state.created} projects created, {state.failed} rejected")
+
+        try:
+            with open_dump(path) as f:
+                import_projects(f, state, chunk_size=chunk_size, on_error=on_error, progress=progress)
+        except ArtworkAPIError as e:
+            raise CommandError(
+                f"Art Institute API failed after line {state.position} ({e}); run the command again to resume."
+            )
+        finally:
+            if error_file:
+                error_file.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {path}: {state.created} projects created, {state.failed} lines rejected."
+        ))
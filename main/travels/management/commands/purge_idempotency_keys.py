@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from main.travels.idempotency import purge
+
+
+class Command(BaseCommand):
+    help = "Delete stored Idempotency-Key responses older than IDEMPOTENCY['TTL']."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help="Keys deleted per query.",
+        )
+
+    def handle(self, *args, chunk_size=1000, **options):
+        deleted = purge(chunk_size)
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired idempotency keys."))
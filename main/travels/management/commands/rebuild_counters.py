@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q
+
+from main.travels.models import TravelProject
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute TravelProject.place_count, visited_count and is_completed "
+        "from the place assignments and fix the projects that are out of sync."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only report projects with wrong counters; exit with status 1 if there are any.",
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help="Number of projects checked per query.",
+        )
+
+    def handle(self, *args, check=False, chunk_size=1000, **options):
+        projects = TravelProject.objects.annotate(
+            actual_places=Count('projectplaceassignment'),
+            actual_visited=Count('projectplaceassignment', filter=Q(projectplaceassignment__visited=True)),
+        ).order_by('pk')
+
+        checked = wrong = 0
+        last_pk = 0
+        while True:
+            chunk = list(projects.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+            checked += len(chunk)
+
+            for project in chunk:
+                expected = (
+                    project.actual_places,
+                    project.actual_visited,
+                    project.actual_places == project.actual_visited,
+                )
+                if (project.place_count, project.visited_count, project.is_completed) == expected:
+                    continue
+
+                wrong += 1
+                self.stdout.write(
+                    f"Project {project.pk}: place_count={project.place_count} "
+                    f"visited_count={project.visited_count} is_completed={project.is_completed}, "
+                    f"expected {expected[0]}/{expected[1]}/{expected[2]}"
+                )
+                if not check:
+                    project.recount_places()
+
+        if check and wrong:
+            raise CommandError(f"{wrong} of {checked} projects have wrong counters.")
+        action = "found" if check else "fixed"
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} projects, {action} {wrong} with wrong counters."))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main.travels import stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the usage statistics (PlaceStats, MonthStats) from the projects and place "
+        "assignments and replace the stored ones. Writes made while it runs may be lost, "
+        "so run it when the API is quiet."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only report whether the stored statistics are right; exit with status 1 if not.",
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=10000,
+            help="Ids aggregated per query.",
+        )
+
+    def handle(self, *args, check=False, chunk_size=10000, **options):
+        places, months = stats.compute(chunk_size)
+        stored_places, stored_months = stats.stored()
+        wrong_places = set(places.items()).symmetric_difference(stored_places.items())
+        wrong_months = set(months.items()).symmetric_difference(stored_months.items())
+        wrong = len({place_id for place_id, _ in wrong_places}) + len({month for month, _ in wrong_months})
+
+        if check:
+            if wrong:
+                raise CommandError(f"{wrong} of {len(places)} places and {len(months)} months are out of sync.")
+        else:
+            stats.rebuild(places, months)
+        action = "found" if check else "fixed"
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {len(places)} places and {len(months)} months, {action} {wrong} out of sync."
+        ))
@@ -0,0 +1,62 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from main.travels.models import ARTWORKS_BATCH_SIZE
+from main.travels.validation import claim_jobs, run_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Validate pending places (see ASYNC_PLACE_VALIDATION) against the Art Institute API: "
+        "fill in their titles or mark them rejected. Runs until stopped unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=4,
+            help="Concurrent Art Institute API requests.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=ARTWORKS_BATCH_SIZE,
+            help="Ids looked up per API request.",
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Exit when no job is due instead of waiting for new ones.",
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help="Seconds to wait before checking an empty queue again.",
+        )
+        parser.add_argument(
+            '--lease', type=int, default=60,
+            help="Seconds a claimed job is reserved for this worker.",
+        )
+
+    def handle(self, *args, threads=4, batch_size=ARTWORKS_BATCH_SIZE, once=False,
+               poll_interval=1.0, lease=60, **options):
+        totals = [0, 0, 0]
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='validate_places') as pool:
+            try:
+                while True:
+                    close_old_connections()
+                    # Enough jobs to give every thread a batch
+                    jobs = claim_jobs(threads * batch_size, lease)
+                    if not jobs:
+                        if once:
+                            break
+                        time.sleep(poll_interval)
+                        continue
+
+                    counts = run_jobs(jobs, pool, batch_size)
+                    totals = [total + count for total, count in zip(totals, counts)]
+                    self.stdout.write("{} validated, {} rejected, {} to retry".format(*counts))
+            except KeyboardInterrupt:
+                pass
+
+        self.stdout.write(self.style.SUCCESS(
+            "Done: {} places validated, {} rejected, {} lookups to retry.".format(*totals)
+        ))
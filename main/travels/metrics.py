@@ -0,0 +1,294 @@
+"""
+Per-request timings and Prometheus metrics.
+
+MetricsMiddleware measures every request and splits the time into:
+
+- db: SQL queries, counted by a wrapper installed on every database
+  connection when it is opened
+- artic: Art Institute API calls, timed by ArticClient
+- serialize: serializer to_representation() and response rendering
+
+The split is sent back in a ``Server-Timing`` header and aggregated per
+URL name into histograms, exposed in the Prometheus text format by the
+``/metrics`` view. The histograms live in the worker process, so each
+worker is scraped on its own. Requests slower than
+SLOW_REQUEST_THRESHOLD seconds are logged to ``main.travels.metrics``
+with the SQL they ran.
+
+Recording costs a few perf_counter() calls and a list append per query,
+cheap enough to leave on in production.
+
+Configured with the ``REQUEST_METRICS`` setting, see DEFAULTS.
+"""
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SERVER_TIMING': True,
+    # Seconds; None disables the slow request log
+    'SLOW_REQUEST_THRESHOLD': 1.0,
+    # Queries kept per request for the slow request log
+    'MAX_LOGGED_QUERIES': 50,
+}
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_current = ContextVar('travels_request_timings', default=None)
+# Names of the timers running in this task or thread; tasks started
+# within a timer (asyncio.gather) get a copy of it
+_running = ContextVar('travels_running_timers', default=frozenset())
+
+
+def get_options():
+    return {**DEFAULTS, **getattr(settings, 'REQUEST_METRICS', {})}
+
+
+class RequestTimings:
+    """Time and count spent per component in one request."""
+
+    def __init__(self, max_logged_queries=0):
+        self.durations = {'db': 0.0, 'artic': 0.0, 'serialize': 0.0}
+        self.counts = {'db': 0, 'artic': 0, 'serialize': 0}
+        self.queries = []
+        self.max_logged_queries = max_logged_queries
+
+    def add(self, name, seconds):
+        self.durations[name] += seconds
+        self.counts[name] += 1
+
+
+@contextmanager
+def timer(name):
+    """
+    Add the time spent in the block to the current request's timings.
+    Nested timers of the same name are counted once, by the outermost;
+    concurrent ones (in tasks of the same request) each count.
+    """
+    timings = _current.get()
+    running = _running.get()
+    if timings is None or name in running:
+        yield
+        return
+    token = _running.set(running | {name})
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _running.reset(token)
+        timings.add(name, time.perf_counter() - start)
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper, see connection.execute_wrapper()."""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        timings.add('db', elapsed)
+        if len(timings.queries) < timings.max_logged_queries:
+            timings.queries.append((sql, elapsed))
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    """connection_created receiver, see TravelsConfig.ready()."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class Histogram:
+    """Cumulative Prometheus histogram for one label set."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Registry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # name -> (help, buckets, {labels: Histogram})
+        self.histograms = {}
+        # name -> (help, {labels: count})
+        self.counters = {}
+
+    def histogram(self, name, help, buckets):
+        self.histograms.setdefault(name, (help, buckets, {}))
+
+    def counter(self, name, help):
+        self.counters.setdefault(name, (help, {}))
+
+    def observe(self, name, labels, value):
+        _, buckets, series = self.histograms[name]
+        with self._lock:
+            histogram = series.get(labels)
+            if histogram is None:
+                histogram = series[labels] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name, labels):
+        _, series = self.counters[name]
+        with self._lock:
+            series[labels] = series.get(labels, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            for _, _, series in self.histograms.values():
+                series.clear()
+            for _, series in self.counters.values():
+                series.clear()
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, (help, series) in self.counters.items():
+                lines += [f'# HELP {name} {help}', f'# TYPE {name} counter']
+                for labels, value in sorted(series.items()):
+                    lines.append(f'{name}{{{format_labels(labels)}}} {value}')
+            for name, (help, buckets, series) in self.histograms.items():
+                lines += [f'# HELP {name} {help}', f'# TYPE {name} histogram']
+                for labels, histogram in sorted(series.items()):
+                    label_text = format_labels(labels)
+                    cumulative = 0
+                    for bound, count in zip(buckets + ('+Inf',), histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_sum{{{label_text}}} {histogram.sum:.6f}')
+                    lines.append(f'{name}_count{{{label_text}}} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    return ','.join(f'{key}="{value}"' for key, value in labels)
+
+
+registry = Registry()
+registry.counter('travels_requests_total', 'Requests by view, method and status.')
+registry.histogram('travels_request_duration_seconds', 'Total request time.', SECONDS_BUCKETS)
+registry.histogram('travels_request_db_seconds', 'Time spent in SQL queries.', SECONDS_BUCKETS)
+registry.histogram('travels_request_db_queries', 'SQL queries per request.', COUNT_BUCKETS)
+registry.histogram('travels_request_artic_seconds', 'Time spent calling the Art Institute API.', SECONDS_BUCKETS)
+registry.histogram('travels_request_artic_calls', 'Art Institute API calls per request.', COUNT_BUCKETS)
+registry.histogram('travels_request_serialize_seconds', 'Time spent serializing and rendering.', SECONDS_BUCKETS)
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unmatched'
+
+
+class MetricsMiddleware:
+    """
+    Measure each request, see the module docstring. Put it first in
+    MIDDLEWARE so the total covers the other middleware too. Works
+    under WSGI and ASGI, without making async views sync.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        measure = self.start()
+        if measure is None:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(measure[0])
+        return self.finish(request, response, *measure[1:])
+
+    async def __acall__(self, request):
+        measure = self.start()
+        if measure is None:
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(measure[0])
+        return self.finish(request, response, *measure[1:])
+
+    def start(self):
+        options = get_options()
+        if not options['ENABLED']:
+            return None
+        threshold = options['SLOW_REQUEST_THRESHOLD']
+        timings = RequestTimings(options['MAX_LOGGED_QUERIES'] if threshold is not None else 0)
+        return _current.set(timings), timings, options, time.perf_counter()
+
+    def finish(self, request, response, timings, options, start):
+        total = time.perf_counter() - start
+        name = view_name(request)
+        self.observe(name, request.method, response.status_code, timings, total)
+        if options['SERVER_TIMING']:
+            response['Server-Timing'] = server_timing(timings, total)
+        threshold = options['SLOW_REQUEST_THRESHOLD']
+        if threshold is not None and total >= threshold:
+            log_slow_request(request, name, timings, total)
+        return response
+
+    def process_template_response(self, request, response):
+        # Render DRF responses here, instead of after the middleware, so
+        # the rendering is timed
+        with timer('serialize'):
+            return response.render()
+
+    def observe(self, name, method, status_code, timings, total):
+        labels = (('view', name),)
+        registry.inc('travels_requests_total', labels + (('method', method), ('status', status_code)))
+        registry.observe('travels_request_duration_seconds', labels, total)
+        registry.observe('travels_request_db_seconds', labels, timings.durations['db'])
+        registry.observe('travels_request_db_queries', labels, timings.counts['db'])
+        registry.observe('travels_request_artic_seconds', labels, timings.durations['artic'])
+        registry.observe('travels_request_artic_calls', labels, timings.counts['artic'])
+        registry.observe('travels_request_serialize_seconds', labels, timings.durations['serialize'])
+
+
+def server_timing(timings, total):
+    return ', '.join([
+        f'db;dur={timings.durations["db"] * 1000:.1f};desc="{timings.counts["db"]} queries"',
+        f'artic;dur={timings.durations["artic"] * 1000:.1f};desc="{timings.counts["artic"]} calls"',
+        f'serialize;dur={timings.durations["serialize"] * 1000:.1f}',
+        f'total;dur={total * 1000:.1f}',
+    ])
+
+
+def log_slow_request(request, name, timings, total):
+    lines = [
+        f'Slow request {request.method} {request.get_full_path()} ({name}): {total * 1000:.1f} ms, '
+        f'{timings.counts["db"]} queries in {timings.durations["db"] * 1000:.1f} ms, '
+        f'{timings.counts["artic"]} Art Institute calls in {timings.durations["artic"] * 1000:.1f} ms, '
+        f'serialize {timings.durations["serialize"] * 1000:.1f} ms'
+    ]
+    lines += [f'  {elapsed * 1000:.1f} ms  {sql}' for sql, elapsed in timings.queries]
+    if timings.counts['db'] > len(timings.queries):
+        lines.append(f'  ... {timings.counts["db"] - len(timings.queries)} more queries')
+    logger.warning('\n'.join(lines))
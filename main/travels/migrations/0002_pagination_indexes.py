@@ -0,0 +1,21 @@
+# Generated by Django 6.0.1 on 2026-10-18 06:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travels', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='projectplaceassignment',
+            index=models.Index(fields=['project', 'id'], name='travels_assignment_page_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelproject',
+            index=models.Index(fields=['created_at', 'id'], name='travels_project_page_idx'),
+        ),
+    ]
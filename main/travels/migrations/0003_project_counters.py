@@ -0,0 +1,39 @@
+# Generated by Django 6.0.1 on 2026-10-18 06:08
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def fill_counters(apps, schema_editor):
+    TravelProject = apps.get_model('travels', 'TravelProject')
+    projects = TravelProject.objects.annotate(
+        actual_places=Count('projectplaceassignment'),
+        actual_visited=Count('projectplaceassignment', filter=Q(projectplaceassignment__visited=True)),
+    )
+    for project in projects.iterator():
+        TravelProject.objects.filter(pk=project.pk).update(
+            place_count=project.actual_places,
+            visited_count=project.actual_visited,
+            is_completed=project.actual_places == project.actual_visited,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travels', '0002_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='travelproject',
+            name='place_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='travelproject',
+            name='visited_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
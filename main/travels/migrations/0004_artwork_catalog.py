@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-18 06:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travels', '0003_project_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Artwork',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('external_id', models.IntegerField(unique=True)),
+                ('title', models.TextField(blank=True)),
+                ('source_updated_at', models.DateTimeField(blank=True, null=True)),
+                ('checksum', models.CharField(max_length=40)),
+                ('imported_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArtworkImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=1024, unique=True)),
+                ('fingerprint', models.CharField(blank=True, max_length=64)),
+                ('position', models.PositiveBigIntegerField(default=0)),
+                ('written', models.PositiveBigIntegerField(default=0)),
+                ('completed', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
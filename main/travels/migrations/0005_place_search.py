@@ -0,0 +1,18 @@
+# Full-text index over place titles and assignment notes, kept in sync
+# by triggers so every write path (including bulk ones) updates it.
+# Uses SQLite FTS5; skipped on other databases. The SQL is in fts.py.
+
+from django.db import migrations
+
+from main.travels.fts import CREATE, DROP, run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travels', '0004_artwork_catalog'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(CREATE), run(DROP)),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 06:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travels', '0005_place_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='travelproject',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='travelproject',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-18 06:18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+from main.travels.fts import DROP_PLACE_TRIGGERS, PLACE_TRIGGERS, run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travels', '0006_project_version'),
+    ]
+
+    operations = [
+        # SQLite rebuilds travels_projectplace below, see fts.PLACE_TRIGGERS
+        migrations.RunPython(run(DROP_PLACE_TRIGGERS), run(PLACE_TRIGGERS)),
+        migrations.AddField(
+            model_name='projectplace',
+            name='validation_status',
+            field=models.CharField(choices=[('valid', 'Valid'), ('pending', 'Pending'), ('rejected', 'Rejected')], default='valid', max_length=8),
+        ),
+        migrations.RunPython(run(PLACE_TRIGGERS), run(DROP_PLACE_TRIGGERS)),
+        migrations.CreateModel(
+            name='PlaceValidationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('worker', models.CharField(blank=True, max_length=32)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('place', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='validation_job', to='travels.projectplace')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['run_after', 'id'], name='travels_validation_queue_idx')],
+            },
+        ),
+    ]
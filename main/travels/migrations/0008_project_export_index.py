@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-18 06:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travels', '0007_place_validation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='travelproject',
+            index=models.Index(fields=['updated_at', 'id'], name='travels_project_export_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 6.0.1 on 2026-10-18 06:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travels', '0008_project_export_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=1024, unique=True)),
+                ('fingerprint', models.CharField(blank=True, max_length=64)),
+                ('position', models.PositiveBigIntegerField(default=0)),
+                ('created', models.PositiveBigIntegerField(default=0)),
+                ('failed', models.PositiveBigIntegerField(default=0)),
+                ('completed', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-18 06:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travels', '0009_project_import'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('project_id', models.BigIntegerField()),
+                ('kind', models.CharField(choices=[('project.created', 'Project created'), ('project.updated', 'Project updated'), ('project.deleted', 'Project deleted'), ('place.added', 'Place added'), ('place.updated', 'Place updated'), ('place.removed', 'Place removed')], max_length=16)),
+                ('assignment_id', models.BigIntegerField(blank=True, null=True)),
+                ('data', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project_id', 'id'], name='travels_change_feed_idx'), models.Index(fields=['assignment_id', 'id'], name='travels_change_place_idx'), models.Index(fields=['created_at'], name='travels_change_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-18 06:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travels', '0010_project_change'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthStats',
+            fields=[
+                ('month', models.CharField(max_length=7, primary_key=True, serialize=False)),
+                ('project_count', models.IntegerField(default=0)),
+                ('completed_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PlaceStats',
+            fields=[
+                ('place', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='travels.projectplace')),
+                ('added_count', models.IntegerField(default=0)),
+                ('visited_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-added_count', 'place'], name='travels_stats_added_idx'), models.Index(fields=['-visited_count', 'place'], name='travels_stats_visited_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 6.0.1 on 2026-10-18 06:36
+
+from django.db import migrations, models
+
+from main.travels.fts import DROP_PLACE_TRIGGERS, PLACE_TRIGGERS, run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travels', '0011_usage_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artwork',
+            name='gallery_id',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='artwork',
+            name='gallery_title',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='artwork',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='artwork',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        # SQLite rebuilds travels_projectplace below, see fts.PLACE_TRIGGERS
+        migrations.RunPython(run(DROP_PLACE_TRIGGERS), run(PLACE_TRIGGERS)),
+        migrations.AddField(
+            model_name='projectplace',
+            name='gallery_id',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='projectplace',
+            name='gallery_title',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='projectplace',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='projectplace',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(run(PLACE_TRIGGERS), run(DROP_PLACE_TRIGGERS)),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 6.0.1 on 2026-10-18 06:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travels', '0012_artwork_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('fingerprint', models.CharField(max_length=40)),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('body', models.BinaryField(default=b'')),
+                ('expires_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['expires_at'], name='travels_idempotency_exp_idx')],
+            },
+        ),
+    ]
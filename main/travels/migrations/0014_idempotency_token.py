@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 06:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travels', '0013_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='token',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+    ]
@@ -1,6 +1,204 @@
-import requests
-from django.db import models
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Q, Value, When
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from .artic import get_async_client, get_client
+from .artwork_cache import get_artwork_cache
+from .singleflight import SingleFlight, process_lock
+
+# Max ids per request accepted by the Art Institute API
+ARTWORKS_BATCH_SIZE = 100
+
+MAX_PLACES = 10
+
+PLACE_NOT_FOUND = 'Place with this external_id was not found in Art Institute API'
+
+# Where an artwork hangs, as the Art Institute API describes it (the
+# coordinates are those of the center of its gallery). Stored on Artwork
+# and ProjectPlace next to the title.
+LOCATION_FIELDS = ('gallery_id', 'gallery_title', 'latitude', 'longitude')
+
+# Concurrent lookups of the same ids in this process share one request
+artwork_flights = SingleFlight()
+place_flights = SingleFlight()
+
+
+def fetch_artworks(external_ids, network=True):
+    """
+    Return {external_id: artwork data (id, title, LOCATION_FIELDS) or None} for the
+    given ids, None meaning the Art Institute API does not know the id.
+    Answers, including "not found", are cached. Ids that are not cached
+    are looked up in the local Artwork catalog and only then with a
+    single ``ids=1,2,3`` request per batch, unless the network fallback
+    is disabled with ARTWORK_NETWORK_FALLBACK = False.
+    With network=False the API is not called at all and ids it would
+    have been asked about are left out of the result.
+    Raises ArtworkAPIError if the API cannot be reached.
+    """
+    external_ids = list(dict.fromkeys(external_ids))
+    cache = get_artwork_cache()
+    # Entries cached before locations were stored are looked up again
+    artworks = {
+        external_id: artwork for external_id, artwork in cache.get_many(external_ids).items()
+        if artwork is None or 'latitude' in artwork
+    }
+    unknown = [external_id for external_id in external_ids if external_id not in artworks]
+
+    if unknown:
+        catalog = {
+            artwork['external_id']: {'id': artwork.pop('external_id'), **artwork}
+            for artwork in Artwork.objects.filter(external_id__in=unknown).values('external_id', 'title', *LOCATION_FIELDS)
+        }
+        cache.set_many(catalog)
+        artworks.update(catalog)
+        unknown = [external_id for external_id in unknown if external_id not in catalog]
+
+    if unknown and not getattr(settings, 'ARTWORK_NETWORK_FALLBACK', True):
+        # Not cached, so the id is found as soon as a catalog import has it
+        artworks.update(dict.fromkeys(unknown))
+        unknown = []
+
+    if unknown and network:
+        # Ids other threads are fetching right now are waited for
+        artworks.update(artwork_flights.do_many(unknown, fetch_artworks_from_api))
+    return artworks
+
+
+def fetch_artworks_from_api(external_ids):
+    """
+    Look external_ids up on the Art Institute API, one request per batch,
+    and cache the answers. Does not touch the database.
+    """
+    artworks = {}
+    for i in range(0, len(external_ids), ARTWORKS_BATCH_SIZE):
+        batch = external_ids[i:i + ARTWORKS_BATCH_SIZE]
+        artworks.update(cache_api_artworks(batch, get_client().get_artworks(batch)))
+    return artworks
+
+
+async def afetch_artworks(external_ids, network=True):
+    """
+    Async fetch_artworks(): the API requests of all batches are in
+    flight at once, on the event loop instead of a thread.
+    """
+    external_ids = list(dict.fromkeys(external_ids))
+    artworks = await sync_to_async(fetch_artworks)(external_ids, network=False)
+    unknown = [external_id for external_id in external_ids if external_id not in artworks]
+    if not unknown or not network:
+        return artworks
+
+    client = await get_async_client()
+    batches = [unknown[i:i + ARTWORKS_BATCH_SIZE] for i in range(0, len(unknown), ARTWORKS_BATCH_SIZE)]
+    results = await asyncio.gather(*[client.get_artworks(batch) for batch in batches])
+    for batch, items in zip(batches, results):
+        artworks.update(cache_api_artworks(batch, items))
+    return artworks
+
+
+def cache_api_artworks(batch, items):
+    """
+    Turn the API answer for a batch of ids into {external_id: artwork
+    or None} and cache it.
+    """
+    data = {
+        item.get('id'): {'id': item.get('id'), 'title': item.get('title') or '', **artwork_location(item)}
+        for item in items
+    }
+    fetched = {external_id: data.get(external_id) for external_id in batch}
+    get_artwork_cache().set_many(fetched)
+    return fetched
+
+
+def artwork_location(artwork):
+    """LOCATION_FIELDS of an artwork dict, with defaults for missing ones."""
+    location = {field: artwork.get(field) for field in LOCATION_FIELDS}
+    location['gallery_title'] = location['gallery_title'] or ''
+    return location
+
+
+def deferred_validation():
+    """
+    Whether places unknown locally are accepted as pending and looked up
+    later by the validate_places worker instead of during the request.
+    """
+    return getattr(settings, 'ASYNC_PLACE_VALIDATION', False)
+
+
+def fetch_artwork(external_id):
+    """
+    Return artwork data for external_id, or None if the Art Institute API
+    does not know it.
+    """
+    return fetch_artworks([external_id])[external_id]
+
+
+class Artwork(models.Model):
+    """
+    Local catalog of Art Institute artworks, filled from dumps by the
+    import_artworks command and checked before the API.
+    """
+    external_id = models.IntegerField(unique=True)
+    title = models.TextField(blank=True)
+    gallery_id = models.IntegerField(blank=True, null=True)
+    gallery_title = models.CharField(max_length=255, blank=True)
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+    source_updated_at = models.DateTimeField(blank=True, null=True)
+    # Hash of the imported fields, to skip unchanged rows on re-import
+    checksum = models.CharField(max_length=40)
+    imported_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.title or 'Artwork'} ({self.external_id})"
+
+
+class ArtworkImport(models.Model):
+    """Progress of an artwork dump import, so it can be resumed."""
+    source = models.CharField(max_length=1024, unique=True)
+    # Size and mtime of the dump; a changed file is imported from the start
+    fingerprint = models.CharField(max_length=64, blank=True)
+    # Records processed and rows written so far
+    position = models.PositiveBigIntegerField(default=0)
+    written = models.PositiveBigIntegerField(default=0)
+    completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.source
+
+
+class ProjectImport(models.Model):
+    """Progress of a bulk project import, so it can be resumed."""
+    source = models.CharField(max_length=1024, unique=True)
+    # Size and mtime of an imported file
+    fingerprint = models.CharField(max_length=64, blank=True)
+    # Lines processed, projects created and lines rejected so far
+    position = models.PositiveBigIntegerField(default=0)
+    created = models.PositiveBigIntegerField(default=0)
+    failed = models.PositiveBigIntegerField(default=0)
+    completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.source
+
+
+class ProjectPlaceAssignmentQuerySet(models.QuerySet):
+
+    def with_place(self):
+        """
+        Join the place and load only the columns that
+        ProjectPlaceAssignmentSerializer reads.
+        """
+        return self.select_related('place').only(
+            'id', 'project_id', 'place', 'notes', 'visited',
+            'place__external_id', 'place__title', 'place__validation_status',
+        )
 
 
 class ProjectPlaceAssignment(models.Model):
@@ -9,40 +207,300 @@ class ProjectPlaceAssignment(models.Model):
     visited = models.BooleanField(default=False)
     notes = models.TextField(blank=True)
 
+    objects = ProjectPlaceAssignmentQuerySet.as_manager()
+
     class Meta:
         unique_together = ('project', 'place')
+        indexes = [
+            # Keyset pagination of a project's places
+            models.Index(fields=['project', 'id'], name='travels_assignment_page_idx'),
+        ]
+
+
+class ProjectPlaceManager(models.Manager):
+
+    def lookup(self, external_ids):
+        """
+        Resolve external_ids to places in one query and at most one API
+        request per batch of unknown ids.
+
+        Returns (places, errors): places maps every valid id to a
+        ProjectPlace (unsaved for ids not stored yet, see bulk_save),
+        errors maps ids unknown to the Art Institute API to a message.
+        With deferred_validation() ids that are not known locally come
+        back as pending places instead of being looked up.
+        """
+        external_ids = list(dict.fromkeys(external_ids))
+        places, errors, unknown = self._split(external_ids, self.filter(external_id__in=external_ids))
+        artworks = fetch_artworks(unknown, network=not deferred_validation())
+        self._resolve(places, errors, unknown, artworks)
+        return places, errors
+
+    async def alookup(self, external_ids):
+        """Async lookup(), see afetch_artworks()."""
+        external_ids = list(dict.fromkeys(external_ids))
+        stored = [place async for place in self.filter(external_id__in=external_ids)]
+        places, errors, unknown = self._split(external_ids, stored)
+        artworks = await afetch_artworks(unknown, network=not deferred_validation())
+        self._resolve(places, errors, unknown, artworks)
+        return places, errors
+
+    def _split(self, external_ids, stored):
+        """Sort the ids into stored places, rejected ids and unknown ids."""
+        places = {place.external_id: place for place in stored}
+        errors = {
+            external_id: PLACE_NOT_FOUND
+            for external_id, place in places.items() if place.validation_status == ProjectPlace.REJECTED
+        }
+        for external_id in errors:
+            del places[external_id]
+        unknown = [external_id for external_id in external_ids if external_id not in places and external_id not in errors]
+        return places, errors, unknown
+
+    def _resolve(self, places, errors, unknown, artworks):
+        """Add unsaved places, or errors, for the unknown ids."""
+        for external_id in unknown:
+            if external_id not in artworks:
+                # Looked up later by the validate_places worker
+                places[external_id] = self.model(external_id=external_id, validation_status=ProjectPlace.PENDING)
+            elif artworks[external_id] is None:
+                errors[external_id] = PLACE_NOT_FOUND
+            else:
+                artwork = artworks[external_id]
+                places[external_id] = self.model(
+                    external_id=external_id, title=artwork['title'], **artwork_location(artwork)
+                )
+
+    def resolve(self, external_id):
+        """
+        Return the place for external_id, validating and saving it first
+        if it is new. Raises ValidationError for unknown or rejected ids
+        and ArtworkAPIError if the API cannot be reached.
+
+        Concurrent calls for the same id share a single lookup and
+        insert: in this process always, across processes when
+        SINGLE_FLIGHT_LOCK_DIR is set. An insert that still races with
+        another one reuses the row that won.
+        """
+        field = self.model._meta.get_field('external_id')
+        try:
+            # int() would also take True or 1.5 for 1
+            if isinstance(external_id, bool) or isinstance(external_id, float) and not external_id.is_integer():
+                raise ValidationError(field.error_messages['invalid'], code='invalid', params={'value': external_id})
+            external_id = field.to_python(external_id)
+        except ValidationError as e:
+            raise ValidationError({'external_id': e.messages})
+        return place_flights.do(external_id, lambda: self._resolve_one(external_id))
+
+    def _resolve_one(self, external_id):
+        with process_lock('place', external_id):
+            places, errors = self.lookup([external_id])
+            if errors:
+                raise ValidationError({'external_id': [errors[external_id]]})
+            return self.bulk_save(places)[external_id]
+
+    def bulk_save(self, places):
+        """
+        Insert the unsaved places returned by lookup() and return
+        {external_id: place} with primary keys set for all of them.
+        Places inserted concurrently by another request are reused.
+        """
+        new = [place for place in places.values() if place.pk is None]
+        if not new:
+            return dict(places)
+        self.bulk_create(new, ignore_conflicts=True)
+        saved = {place.external_id: place for place in self.filter(external_id__in=list(places))}
+        PlaceValidationJob.objects.bulk_create(
+            [
+                PlaceValidationJob(place=saved[place.external_id])
+                for place in new if saved[place.external_id].validation_status == ProjectPlace.PENDING
+            ],
+            ignore_conflicts=True,
+        )
+        return {external_id: saved[external_id] for external_id in places}
 
 
 class ProjectPlace(models.Model):
+    VALID = 'valid'
+    PENDING = 'pending'
+    REJECTED = 'rejected'
+    VALIDATION_STATUSES = [
+        (VALID, 'Valid'),
+        (PENDING, 'Pending'),
+        (REJECTED, 'Rejected'),
+    ]
+
     external_id = models.IntegerField(unique=True)
     title = models.CharField(max_length=255, blank=True)  # тягнемо з API
+    # Where the artwork hangs, see LOCATION_FIELDS; filled with the title
+    gallery_id = models.IntegerField(blank=True, null=True)
+    gallery_title = models.CharField(max_length=255, blank=True)
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Whether the Art Institute API knows external_id; pending until the
+    # validate_places worker has looked it up, see deferred_validation()
+    validation_status = models.CharField(max_length=8, choices=VALIDATION_STATUSES, default=VALID)
+
+    objects = ProjectPlaceManager()
 
     def clean(self):
         # Validate that the place exists in Art Institute API
-        r = requests.get(
-            'https://api.artic.edu/api/v1/artworks',
-            params={'ids': self.external_id},
-            timeout=5,
-        )
-        data = r.json().get('data', [])
+        artworks = fetch_artworks([self.external_id], network=not deferred_validation())
+        if self.external_id not in artworks:
+            self.validation_status = self.PENDING
+            return
 
-        if not data:
-            raise ValidationError(
-                {'external_id': 'Place with this external_id was not found in Art Institute API'}
-            )
+        artwork = artworks[self.external_id]
+        if artwork is None:
+            raise ValidationError({'external_id': PLACE_NOT_FOUND})
 
-        # Fill title from API
-        self.title = data[0].get('title', '')
+        # Fill title and location from API
+        self.title = artwork['title'] or ''
+        for field, value in artwork_location(artwork).items():
+            setattr(self, field, value)
+        self.validation_status = self.VALID
 
     def save(self, *args, **kwargs):
         self.full_clean()
         super().save(*args, **kwargs)
+        if self.validation_status == self.PENDING:
+            PlaceValidationJob.objects.get_or_create(place=self)
 
     def __str__(self):
         return f"{self.title or 'Place'} ({self.external_id})"
 
 
+class PlaceValidationJob(models.Model):
+    """
+    Queued Art Institute lookup of a pending ProjectPlace, run by the
+    validate_places command (see validation.py). Deleted once the place
+    is validated or rejected.
+    """
+    place = models.OneToOneField(ProjectPlace, on_delete=models.CASCADE, related_name='validation_job')
+    attempts = models.PositiveIntegerField(default=0)
+    # Not run before this time (backoff after failed attempts)
+    run_after = models.DateTimeField(default=timezone.now)
+    # Claim of a worker, which owns the job until locked_until
+    worker = models.CharField(max_length=32, blank=True)
+    locked_until = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['run_after', 'id'], name='travels_validation_queue_idx'),
+        ]
+
+
+class ProjectChange(models.Model):
+    """
+    Append-only log of the changes to projects and their places, written
+    in the same transaction as the change and read by the change feed
+    (see changes.py). Kept after the project is deleted, so project_id
+    and assignment_id are plain columns.
+    """
+    PROJECT_CREATED = 'project.created'
+    PROJECT_UPDATED = 'project.updated'
+    PROJECT_DELETED = 'project.deleted'
+    PLACE_ADDED = 'place.added'
+    PLACE_UPDATED = 'place.updated'
+    PLACE_REMOVED = 'place.removed'
+    KINDS = [
+        (PROJECT_CREATED, 'Project created'),
+        (PROJECT_UPDATED, 'Project updated'),
+        (PROJECT_DELETED, 'Project deleted'),
+        (PLACE_ADDED, 'Place added'),
+        (PLACE_UPDATED, 'Place updated'),
+        (PLACE_REMOVED, 'Place removed'),
+    ]
+
+    project_id = models.BigIntegerField()
+    kind = models.CharField(max_length=16, choices=KINDS)
+    assignment_id = models.BigIntegerField(blank=True, null=True)
+    # New state of the project or place, as the API represents it
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # A project's changes after a Last-Event-ID
+            models.Index(fields=['project_id', 'id'], name='travels_change_feed_idx'),
+            # Compaction
+            models.Index(fields=['assignment_id', 'id'], name='travels_change_place_idx'),
+            models.Index(fields=['created_at'], name='travels_change_created_idx'),
+        ]
+
+
+class PlaceStats(models.Model):
+    """
+    How many projects have a place, and in how many it is visited. Kept
+    up to date by every assignment write (see stats.py); the rebuild_stats
+    command recomputes it.
+    """
+    place = models.OneToOneField(ProjectPlace, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    added_count = models.IntegerField(default=0)
+    visited_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Most added / most visited first
+            models.Index(fields=['-added_count', 'place'], name='travels_stats_added_idx'),
+            models.Index(fields=['-visited_count', 'place'], name='travels_stats_visited_idx'),
+        ]
+
+
+class MonthStats(models.Model):
+    """
+    Projects and completed projects per start_date month, kept up to date
+    like PlaceStats.
+    """
+    # YYYY-MM, empty for projects without a start_date
+    month = models.CharField(max_length=7, primary_key=True)
+    project_count = models.IntegerField(default=0)
+    completed_count = models.IntegerField(default=0)
+
+
+class IdempotencyKey(models.Model):
+    """
+    Response to a POST sent with an Idempotency-Key header, replayed to
+    retries of the same request until expires_at (see idempotency.py).
+    """
+    # sha256 of the method, path and header value
+    key = models.CharField(max_length=64, primary_key=True)
+    # sha1 of the request body
+    fingerprint = models.CharField(max_length=40)
+    # Random value of the request holding the key; only it stores or releases it
+    token = models.CharField(max_length=32, blank=True)
+    # None while the first request is in flight
+    status_code = models.PositiveSmallIntegerField(blank=True, null=True)
+    # Rendered JSON
+    body = models.BinaryField(default=b'')
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires_at'], name='travels_idempotency_exp_idx'),
+        ]
+
+
+class TravelProjectQuerySet(models.QuerySet):
+
+    def with_places(self):
+        """
+        Prefetch the assignments with their places for
+        TravelProjectSerializer: two queries however many projects.
+        """
+        return self.prefetch_related(places_prefetch())
+
+
+def places_prefetch():
+    return models.Prefetch(
+        'projectplaceassignment_set',
+        queryset=ProjectPlaceAssignment.objects.with_place().order_by('id'),
+    )
+
+
 class TravelProject(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
@@ -50,34 +508,137 @@ class TravelProject(models.Model):
     is_completed = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Maintained by adjust_counters() on every assignment change
+    place_count = models.PositiveIntegerField(default=0)
+    visited_count = models.PositiveIntegerField(default=0)
+
+    # Bumped on any change to the project or its assignments; used for
+    # ETag/Last-Modified validators
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
     places = models.ManyToManyField(
         'ProjectPlace',
         through='ProjectPlaceAssignment',
         related_name='projects'
     )
 
+    objects = TravelProjectQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the project list
+            models.Index(fields=['created_at', 'id'], name='travels_project_page_idx'),
+            # Incremental exports (updated_at >= since, in that order)
+            models.Index(fields=['updated_at', 'id'], name='travels_project_export_idx'),
+        ]
+
     def clean(self):
-        if self.pk and self.projectplaceassignment_set.filter(visited=True).exists():
+        if self.pk and self.visited_count:
             raise ValidationError("Cannot delete project with visited places.")
 
     def delete(self, *args, **kwargs):
         self.clean()
         super().delete(*args, **kwargs)
 
-    def update_completion_status(self):
+    def adjust_counters(self, places=0, visited=0):
         """
-        Mark project as completed if all assigned places are visited.
-        Checks visited status from ProjectPlaceAssignment (through table).
+        Apply assignment changes to place_count and visited_count (and so
+        is_completed) with a single UPDATE using F() expressions.
+
+        Adding places is refused if the project would get more than
+        MAX_PLACES places, removing them if it would be left without any.
+        The check is part of the UPDATE, so concurrent requests cannot
+        get past it. Returns False if the change was refused.
+
+        Also bumps version and updated_at, so call it (without deltas)
+        after any other change to the project or its assignments.
+
+        Call it in a transaction: the counters, is_completed and
+        start_date are then read back as the UPDATE left them, and
+        was_completed is set to is_completed before it, even when
+        concurrent requests changed the project since it was loaded.
         """
-        self.is_completed = not self.projectplaceassignment_set.filter(visited=False).exists()
-        self.save(update_fields=["is_completed"])
+        now = timezone.now()
+        queryset = TravelProject.objects.filter(pk=self.pk)
+        if places > 0:
+            queryset = queryset.filter(place_count__lte=MAX_PLACES - places)
+        elif places < 0:
+            queryset = queryset.filter(place_count__gte=1 - places)
+
+        updated = queryset.update(
+            place_count=F('place_count') + places,
+            visited_count=F('visited_count') + visited,
+            # Completed when all places are visited, computed from the
+            # old column values like the rest of the SET clause
+            is_completed=Case(
+                When(place_count=F('visited_count') + visited - places, then=Value(True)),
+                default=Value(False),
+            ),
+            version=F('version') + 1,
+            updated_at=now,
+        )
+        if not updated:
+            return False
+
+        # The UPDATE locked the row until the end of the transaction
+        self.refresh_from_db(
+            fields=['place_count', 'visited_count', 'is_completed', 'start_date', 'version', 'updated_at']
+        )
+        old_places = self.place_count - places
+        self.was_completed = old_places > 0 and old_places == self.visited_count - visited
+        return True
+
+    def recount_places(self):
+        """
+        Recompute the counters from ProjectPlaceAssignment (through table).
+        Only needed to repair them, see the rebuild_counters command.
+        """
+        fields = ['place_count', 'visited_count', 'is_completed', 'version', 'updated_at']
+        with transaction.atomic():
+            # Assignment writes update the project row too, so the lock
+            # keeps them out until the new counters are written
+            self.refresh_from_db(from_queryset=TravelProject.objects.select_for_update(), fields=fields)
+            counts = self.projectplaceassignment_set.aggregate(
+                places=Count('id'),
+                visited=Count('id', filter=Q(visited=True)),
+            )
+            TravelProject.objects.filter(pk=self.pk).update(
+                place_count=counts['places'],
+                visited_count=counts['visited'],
+                is_completed=counts['places'] == counts['visited'],
+                version=F('version') + 1,
+                updated_at=timezone.now(),
+            )
+            self.refresh_from_db(fields=fields)
+
+    def assign_places(self, places):
+        """
+        Assign places (as returned by ProjectPlace.objects.lookup) to the
+        project in one transaction, skipping places already assigned.
+        Returns the new assignments.
+        """
+        with transaction.atomic():
+            places = ProjectPlace.objects.bulk_save(places)
+            if self.place_count:
+                assigned = set(
+                    self.projectplaceassignment_set
+                    .filter(place__in=list(places.values()))
+                    .values_list('place_id', flat=True)
+                )
+                places = {k: place for k, place in places.items() if place.pk not in assigned}
+            if not places:
+                return []
+
+            if not self.adjust_counters(places=len(places)):
+                raise ValidationError(f"A project cannot have more than {MAX_PLACES} places.")
+            return ProjectPlaceAssignment.objects.bulk_create(
+                [ProjectPlaceAssignment(project=self, place=place) for place in places.values()]
+            )
 
     def add_places(self, places):
         """Add places to project with max 10 validation"""
-        if self.places.count() + len(places) > 10:
-            raise ValidationError("A project cannot have more than 10 places.")
-        self.places.add(*places)
-        self.update_completion_status()
+        self.assign_places({place.external_id: place for place in places})
 
     def __str__(self):
         return self.name
@@ -0,0 +1,190 @@
+"""
+Keyset (a.k.a. seek) pagination.
+
+Pages are selected with a WHERE on the ordering columns instead of an
+OFFSET, so with an index on those columns a deep page costs the same as
+the first one. The ordering must be unique, hence the trailing ``id``.
+Cursors are opaque base64 tokens holding the boundary row's values.
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    ordering = ('created_at', 'id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        page_size = api_settings.PAGE_SIZE
+        max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 100)
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            pass
+        return max(1, min(page_size, max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+        self.fields = [queryset.model._meta.get_field(name) for name in self.ordering]
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        if reverse:
+            queryset = queryset.order_by(*[f'-{name}' for name in self.ordering])
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self.seek_filter(position, reverse))
+
+        # One extra row tells whether there is a page after this one
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+
+        # Going backwards there is always a page after this one; going
+        # forwards there is one before it unless this is the first page
+        has_next = reverse or has_more
+        has_previous = has_more if reverse else position is not None
+
+        self.next_position = self.previous_position = None
+        if results and has_next:
+            self.next_position = self.get_position(results[-1])
+        if results and has_previous:
+            self.previous_position = self.get_position(results[0])
+        return results
+
+    def seek_filter(self, position, reverse):
+        """
+        Rows strictly after position in the ordering, i.e.
+        (a > x) OR (a = x AND b > y) for ordering (a, b).
+        """
+        lookup = 'lt' if reverse else 'gt'
+        condition = Q()
+        for i, name in enumerate(self.ordering):
+            equal = {self.ordering[j]: position[j] for j in range(i)}
+            condition |= Q(**equal, **{f'{name}__{lookup}': position[i]})
+        return condition
+
+    def get_position(self, obj):
+        if isinstance(obj, dict):
+            # Row of a values() queryset
+            obj = self.model(**{field.attname: obj[field.attname] for field in self.fields})
+        return [field.value_to_string(obj) for field in self.fields]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            values = cursor['p']
+            if len(values) != len(self.fields):
+                raise ValueError
+            position = [field.to_python(value) for field, value in zip(self.fields, values)]
+            return position, bool(cursor.get('r'))
+        except (BinasciiError, KeyError, TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position, reverse):
+        cursor = {'p': position}
+        if reverse:
+            cursor['r'] = 1
+        encoded = urlsafe_b64encode(json.dumps(cursor, separators=(',', ':')).encode()).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+
+class ProjectPlacePagination(KeysetPagination):
+    # Assignments have no timestamp of their own; id follows insertion order
+    ordering = ('id',)
+
+
+class SearchPagination(KeysetPagination):
+    """
+    Forward-only keyset pagination of search results by (score, id);
+    the rows come from a fetch(after, limit) callable, not a queryset.
+    """
+
+    def paginate_rows(self, fetch, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+
+        rows = fetch(self.decode_search_cursor(request), page_size + 1)
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        self.previous_position = None
+        self.next_position = [rows[-1]['score'], rows[-1]['id']] if has_more else None
+        return rows
+
+    def decode_search_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            score, assignment_id = json.loads(urlsafe_b64decode(encoded.encode('ascii')))['p']
+            return float(score), int(assignment_id)
+        except (BinasciiError, KeyError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
@@ -0,0 +1,129 @@
+"""
+Serializer-free read path for projects and places.
+
+Builds the same dicts as TravelProjectSerializer and
+ProjectPlaceAssignmentSerializer (same keys, order and value formats,
+so the rendered JSON is byte-for-byte identical) straight from
+values_list() rows, through field mappings compiled once per field
+selection. Skips model instances and the per-field serializer machinery,
+which dominate the cost of large list pages.
+
+Used when the FAST_READ_PATH setting is on, and always for sparse
+fieldsets (``?fields=id,name``); leaving ``places`` out of a project's
+fields also skips the query for them.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .models import ProjectPlaceAssignment, TravelProject
+
+FIELDS_PARAM = 'fields'
+
+
+def iso_date(value):
+    return None if value is None else value.isoformat()
+
+
+# (key, column, converter) in serializer field order
+PROJECT_FIELDS = (
+    ('id', 'id', None),
+    ('name', 'name', None),
+    ('description', 'description', None),
+    ('start_date', 'start_date', iso_date),
+    ('is_completed', 'is_completed', None),
+)
+PLACE_FIELDS = (
+    ('id', 'id', None),
+    ('external_id', 'place__external_id', None),
+    ('title', 'place__title', None),
+    ('validation_status', 'place__validation_status', None),
+    ('notes', 'notes', None),
+    ('visited', 'visited', None),
+)
+PROJECT_KEYS = [key for key, _, _ in PROJECT_FIELDS] + ['places']
+PLACE_KEYS = [key for key, _, _ in PLACE_FIELDS]
+
+
+class UnknownFields(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_code = 'unknown_fields'
+
+
+def enabled(request):
+    return getattr(settings, 'FAST_READ_PATH', False) or FIELDS_PARAM in request.query_params
+
+
+def requested_fields(request, keys):
+    """
+    The keys selected with ?fields=, in representation order, or all of
+    them. Raises UnknownFields (a 400) for names that are not keys.
+    """
+    value = request.query_params.get(FIELDS_PARAM)
+    if not value:
+        return tuple(keys)
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = names.difference(keys)
+    if unknown:
+        raise UnknownFields({"error": f"Unknown fields: {', '.join(sorted(unknown))}"})
+    return tuple(key for key in keys if key in names)
+
+
+@lru_cache(maxsize=None)
+def compile_mapping(spec, selected):
+    """
+    Return (columns, build) for the selected keys of a field spec, where
+    build(row) turns a values_list() row of columns into the dict.
+    The first column is always the id, used for grouping and paging.
+    """
+    fields = [field for field in spec if field[0] in selected]
+    columns = ['id'] + [column for _, column, _ in fields]
+    keys = [(key, index, converter) for index, (key, _, converter) in enumerate(fields, 1)]
+
+    if not any(converter for _, _, converter in keys):
+        plain = [(key, index) for key, index, _ in keys]
+
+        def build(row):
+            return {key: row[index] for key, index in plain}
+    else:
+        def build(row):
+            return {key: row[index] if converter is None else converter(row[index]) for key, index, converter in keys}
+    return columns, build
+
+
+def places_queryset(queryset, fields=PLACE_KEYS):
+    """Rows of an assignment queryset for place_dicts()."""
+    columns, _ = compile_mapping(PLACE_FIELDS, tuple(fields))
+    return queryset.values(*columns)
+
+
+def place_dicts(rows, fields=PLACE_KEYS):
+    """Place dicts from the rows of places_queryset()."""
+    columns, build = compile_mapping(PLACE_FIELDS, tuple(fields))
+    return [build([row[column] for column in columns]) for row in rows]
+
+
+def project_dicts(project_ids, fields=PROJECT_KEYS):
+    """
+    Project dicts for project_ids, in that order, skipping missing ones:
+    one query for the projects and one for all their places.
+    """
+    columns, build = compile_mapping(PROJECT_FIELDS, tuple(fields))
+    rows = TravelProject.objects.filter(pk__in=project_ids).values_list(*columns)
+    projects = {row[0]: build(row) for row in rows}
+
+    if 'places' in fields and projects:
+        place_columns, build_place = compile_mapping(PLACE_FIELDS, tuple(PLACE_KEYS))
+        for project in projects.values():
+            project['places'] = []
+        assignments = (
+            ProjectPlaceAssignment.objects.filter(project_id__in=list(projects))
+            .order_by('id')
+            .values_list('project_id', *place_columns)
+        )
+        for row in assignments:
+            projects[row[0]]['places'].append(build_place(row[1:]))
+
+    return [projects[pk] for pk in project_ids if pk in projects]
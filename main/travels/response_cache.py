@@ -0,0 +1,79 @@
+"""
+Server-side cache of serialized project and place payloads.
+
+Entries are never deleted explicitly. Instead every key contains the
+version and updated_at of the project(s) it renders, read from the
+database on each request, and every write path bumps those through
+TravelProject.adjust_counters(). A write therefore makes the old entries
+unreachable the moment it commits, in every process, and a reader can
+never get a payload older than the version it has just read. The keys
+of list pages contain the (id, version) of each project on the page, so
+creating or deleting projects changes them as well. Stale entries just
+expire.
+
+When several requests miss the same key at once, only one renders the
+payload; the others wait for it for a short while (stampede guard).
+
+Configured with the ``RESPONSE_CACHE`` setting, see DEFAULTS.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULTS = {
+    'ENABLED': True,
+    'ALIAS': 'default',
+    'TIMEOUT': 60 * 5,
+    # How long a renderer holds the lock, and how long others wait for it
+    'LOCK_TIMEOUT': 10,
+    'WAIT': 2.0,
+    'POLL_INTERVAL': 0.02,
+}
+
+
+def get_options():
+    return {**DEFAULTS, **getattr(settings, 'RESPONSE_CACHE', {})}
+
+
+def make_key(kind, request, *parts):
+    """
+    Key for a payload of the given kind, rendered for this exact URL
+    (pages, page sizes and host all end up in the payload) from data at
+    the state described by parts.
+    """
+    raw = repr((request.build_absolute_uri(), parts)).encode()
+    return f'travels:response:{kind}:{hashlib.sha1(raw).hexdigest()}'
+
+
+def get_or_render(key, render):
+    """
+    Return the cached payload for key, or render, cache and return it.
+    """
+    options = get_options()
+    if not options['ENABLED']:
+        return render()
+
+    cache = caches[options['ALIAS']]
+    payload = cache.get(key)
+    if payload is not None:
+        return payload
+
+    lock = f'{key}:lock'
+    if cache.add(lock, 1, options['LOCK_TIMEOUT']):
+        try:
+            payload = render()
+            cache.set(key, payload, options['TIMEOUT'])
+        finally:
+            cache.delete(lock)
+        return payload
+
+    # Someone else is rendering it; wait instead of rendering it again
+    deadline = time.monotonic() + options['WAIT']
+    while time.monotonic() < deadline:
+        time.sleep(options['POLL_INTERVAL'])
+        payload = cache.get(key)
+        if payload is not None:
+            return payload
+    return render()
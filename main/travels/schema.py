@@ -0,0 +1,25 @@
+"""
+OpenAPI annotations of the views.
+
+The schema is generated where drf_spectacular is installed (main.settings,
+see main/docs.py). Settings that leave it out, like main.settings_api, do
+not import it at all: the annotations below are then no-ops.
+"""
+from django.apps import apps
+
+if apps.is_installed('drf_spectacular'):
+    from drf_spectacular.utils import OpenApiParameter, extend_schema
+else:
+    class OpenApiParameter:
+        QUERY = 'query'
+        PATH = 'path'
+        HEADER = 'header'
+        COOKIE = 'cookie'
+
+        def __init__(self, *args, **kwargs):
+            pass
+
+    def extend_schema(*args, **kwargs):
+        return lambda f: f
+
+__all__ = ['OpenApiParameter', 'extend_schema']
@@ -0,0 +1,71 @@
+"""
+Full-text search over place titles and assignment notes.
+
+Backed by the travels_placesearch FTS5 table (see fts.py), which
+has one row per ProjectPlaceAssignment, keyed by its id, and is kept in
+sync by triggers.
+"""
+import re
+
+from django.db import connection
+
+WORD = re.compile(r'\w+')
+
+# bm25 column weights: a hit in the title counts more than in the notes
+TITLE_WEIGHT = 2.0
+NOTES_WEIGHT = 1.0
+
+
+class SearchUnavailable(Exception):
+    """The database has no full-text index (it is not SQLite)."""
+
+
+def build_match(query):
+    """
+    Turn user input into an FTS5 query where every word must match as a
+    prefix, e.g. 'water lil' -> '"water"* "lil"*'. Quoting the words
+    keeps FTS5 operators in the input from being interpreted.
+    """
+    return ' '.join(f'"{word}"*' for word in WORD.findall(query))
+
+
+def search_places(match, project_id=None, after=None, limit=20):
+    """
+    Return up to limit matches for an FTS5 match expression, best first,
+    as dicts with the assignment and place fields plus its score. Pass
+    the (score, id) of the last row of a page as after to get the next.
+    """
+    if connection.vendor != 'sqlite':
+        raise SearchUnavailable()
+
+    conditions = []
+    params = [TITLE_WEIGHT, NOTES_WEIGHT, match]
+    if project_id is not None:
+        conditions.append('a.project_id = %s')
+        params.append(project_id)
+    if after is not None:
+        score, assignment_id = after
+        conditions.append('(s.score > %s OR (s.score = %s AND s.id > %s))')
+        params += [score, score, assignment_id]
+    params.append(limit)
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    sql = f"""
+        SELECT s.id, a.project_id, p.external_id, p.title, a.notes, a.visited, s.score
+        FROM (
+            SELECT rowid AS id, bm25(travels_placesearch, %s, %s) AS score
+            FROM travels_placesearch WHERE travels_placesearch MATCH %s
+        ) s
+        JOIN travels_projectplaceassignment a ON a.id = s.id
+        JOIN travels_projectplace p ON p.id = a.place_id
+        {where}
+        ORDER BY s.score, s.id
+        LIMIT %s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    for row in rows:
+        row['visited'] = bool(row['visited'])
+    return rows
@@ -1,20 +1,71 @@
-from rest_framework import serializers
-from .models import TravelProject, ProjectPlace, ProjectPlaceAssignment
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+from . import changes
+from .artic import ArtworkAPIError
+from .metrics import timer
+from .models import MAX_PLACES, TravelProject, ProjectChange, ProjectPlace, ProjectPlaceAssignment, places_prefetch
+from .stats import StatsDelta
+
+
+class ArtworkServiceUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Art Institute API is unavailable, try again later.'
+    default_code = 'artwork_service_unavailable'
+
+
+class TimedRepresentationMixin:
+    """Count to_representation() as serialization in the request metrics."""
+
+    def to_representation(self, instance):
+        with timer('serialize'):
+            return super().to_representation(instance)
 
 
 # Serializer for M2M place in project context
-class ProjectPlaceAssignmentSerializer(serializers.ModelSerializer):
+class ProjectPlaceAssignmentSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     id = serializers.IntegerField(required=False)
     external_id = serializers.IntegerField(source='place.external_id', read_only=True)
     title = serializers.CharField(source='place.title', read_only=True)
+    # pending until the Art Institute API has been asked, see ASYNC_PLACE_VALIDATION
+    validation_status = serializers.CharField(source='place.validation_status', read_only=True)
 
     class Meta:
         model = ProjectPlaceAssignment
-        fields = ['id', 'external_id', 'title', 'notes', 'visited']
-        read_only_fields = ['id', 'external_id', 'title']
+        fields = ['id', 'external_id', 'title', 'validation_status', 'notes', 'visited']
+        read_only_fields = ['id', 'external_id', 'title', 'validation_status']
 
 
-class TravelProjectSerializer(serializers.ModelSerializer):
+class AssignmentChangeSerializer(serializers.Serializer):
+    """One item of a bulk notes/visited update."""
+    assignment_id = serializers.IntegerField()
+    visited = serializers.BooleanField(required=False)
+    notes = serializers.CharField(required=False, allow_blank=True)
+
+
+class ProjectImportSerializer(serializers.ModelSerializer):
+    """
+    One line of a bulk project import. Only the shape is checked here;
+    the place ids are validated a chunk of lines at a time.
+    """
+    place_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=MAX_PLACES,
+        error_messages={
+            'empty': 'A project must have at least one place',
+            'max_length': f'A project cannot have more than {MAX_PLACES} places',
+        },
+    )
+
+    class Meta:
+        model = TravelProject
+        fields = ['name', 'description', 'start_date', 'place_ids']
+
+
+class TravelProjectSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     # Read-only nested field to show assignments
     places = ProjectPlaceAssignmentSerializer(
         source='projectplaceassignment_set',
@@ -32,28 +83,60 @@ class TravelProjectSerializer(serializers.ModelSerializer):
     class Meta:
         model = TravelProject
         fields = ['id', 'name', 'description', 'start_date', 'is_completed', 'places', 'place_ids']
+        read_only_fields = ['is_completed']
 
-    def create(self, validated_data):
-        place_ids = validated_data.pop('place_ids', [])
-        project = TravelProject.objects.create(**validated_data)
-
-        for external_id in place_ids:
-            place, _ = ProjectPlace.objects.get_or_create(external_id=external_id)
-            ProjectPlaceAssignment.objects.create(project=project, place=place)
+    def validate_place_ids(self, value):
+        # Validate all ids at once (a single Art Institute request for the
+        # unknown ones); the resolved places replace the ids. The async
+        # views resolve them beforehand and pass the result in the context.
+        try:
+            places, errors = self.context.get('place_lookup') or ProjectPlace.objects.lookup(value)
+        except ArtworkAPIError:
+            raise ArtworkServiceUnavailable()
+        if errors:
+            raise serializers.ValidationError(
+                {str(external_id): [message] for external_id, message in errors.items()}
+            )
+        return places
 
-        project.update_completion_status()
+    def create(self, validated_data):
+        places = validated_data.pop('place_ids', {})
+        try:
+            with transaction.atomic():
+                project = TravelProject.objects.create(**validated_data)
+                added = project.assign_places(places)
+                StatsDelta().add_project(project).add_assignments(added).save()
+                # Load the places for the response in two queries
+                prefetch_related_objects([project], places_prefetch())
+                changes.record(changes.project_changes(
+                    ProjectChange.PROJECT_CREATED, [(project, project.projectplaceassignment_set.all())]
+                ))
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({'place_ids': e.messages})
         return project
 
     def update(self, instance, validated_data):
-        place_ids = validated_data.pop('place_ids', None)
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-
-        if place_ids is not None:
-            for external_id in place_ids:
-                place, _ = ProjectPlace.objects.get_or_create(external_id=external_id)
-                ProjectPlaceAssignment.objects.get_or_create(project=instance, place=place)
+        places = validated_data.pop('place_ids', None)
+        try:
+            with transaction.atomic():
+                # What the statistics move the project from, locked
+                instance.refresh_from_db(
+                    from_queryset=TravelProject.objects.select_for_update(), fields=['start_date', 'is_completed']
+                )
+                start_date, was_completed = instance.start_date, instance.is_completed
+                for attr, value in validated_data.items():
+                    setattr(instance, attr, value)
+                # Only the edited fields, the counters are updated with F()
+                instance.save(update_fields=list(validated_data))
 
-        instance.update_completion_status()
+                added = instance.assign_places(places) if places is not None else []
+                # Bump the version
+                instance.adjust_counters()
+                StatsDelta().update_project(instance, start_date, was_completed).add_assignments(added).save()
+                changes.record(
+                    changes.project_changes(ProjectChange.PROJECT_UPDATED, [instance])
+                    + changes.place_changes(ProjectChange.PLACE_ADDED, added)
+                )
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({'place_ids': e.messages})
         return instance
@@ -0,0 +1,106 @@
+"""
+Coalescing of concurrent work on the same key.
+
+When several threads of a process ask for the same key at once, the
+first one does the work and the others wait for its result (or its
+exception) instead of repeating it. Used so that a popular artwork
+being added by many users at once costs one Art Institute lookup and
+one insert.
+
+process_lock() extends that across processes with a file lock, when
+the SINGLE_FLIGHT_LOCK_DIR setting names a directory shared by them.
+"""
+import os
+import threading
+import zlib
+from contextlib import contextmanager
+
+from django.conf import settings
+
+# Keys are spread over this many lock files
+LOCK_BUCKETS = 256
+
+
+class _Call:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """Return fn(), run once for all concurrent callers with key."""
+        return self.do_many([key], lambda keys: {key: fn()})[key]
+
+    def do_many(self, keys, fn):
+        """
+        Return {key: value} for keys, where fn(keys) returns that dict.
+        fn is called with the keys no other thread is working on; the
+        results for the others are waited for.
+        """
+        own = {}
+        waiting = {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                call = self._calls.get(key)
+                if call is None:
+                    own[key] = self._calls[key] = _Call()
+                else:
+                    waiting[key] = call
+
+        results = {}
+        if own:
+            try:
+                results = fn(list(own))
+                for key, call in own.items():
+                    call.result = results.get(key)
+            except BaseException as e:
+                for call in own.values():
+                    call.error = e
+                raise
+            finally:
+                with self._lock:
+                    for key in own:
+                        del self._calls[key]
+                for call in own.values():
+                    call.done.set()
+
+        for key, call in waiting.items():
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            results[key] = call.result
+        return results
+
+
+@contextmanager
+def process_lock(name, key):
+    """
+    Hold an exclusive lock on key, shared with the other processes using
+    SINGLE_FLIGHT_LOCK_DIR. Does nothing when that is not set, or where
+    there is no fcntl.
+    """
+    directory = getattr(settings, 'SINGLE_FLIGHT_LOCK_DIR', None)
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+    if not directory or fcntl is None:
+        yield
+        return
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{name}-{zlib.crc32(str(key).encode()) % LOCK_BUCKETS}.lock')
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
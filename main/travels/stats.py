@@ -0,0 +1,176 @@
+"""
+Usage statistics: most added and most visited places, completion rate
+by start month.
+
+PlaceStats and MonthStats hold running totals, so reading them costs
+the same however many projects there are. Every write path collects
+what it changed in a StatsDelta and saves it in its own transaction,
+with one UPDATE per distinct delta (plus, the first time a place or
+month is counted, the insert of its row). rebuild() recomputes both
+tables from the projects and assignments.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Q
+
+from .models import MonthStats, PlaceStats, ProjectPlaceAssignment, TravelProject
+
+
+def month_key(start_date):
+    return '' if start_date is None else start_date.strftime('%Y-%m')
+
+
+class StatsDelta:
+    """Changes to the statistics made by one write, saved with save()."""
+
+    def __init__(self):
+        # place id -> [added, visited]; month -> [projects, completed]
+        self.places = defaultdict(lambda: [0, 0])
+        self.months = defaultdict(lambda: [0, 0])
+
+    def add_assignments(self, assignments, sign=1):
+        """Count assignments as added (sign=1) or removed (sign=-1)."""
+        for assignment in assignments:
+            counts = self.places[assignment.place_id]
+            counts[0] += sign
+            if assignment.visited:
+                counts[1] += sign
+        return self
+
+    def visit(self, place_id, visited):
+        self.places[place_id][1] += 1 if visited else -1
+        return self
+
+    def add_project(self, project, sign=1):
+        """Count a project as created (sign=1) or deleted (sign=-1)."""
+        counts = self.months[month_key(project.start_date)]
+        counts[0] += sign
+        if project.is_completed:
+            counts[1] += sign
+        return self
+
+    def update_project(self, project, old_start_date, was_completed):
+        """Account for a change of project's start_date or is_completed."""
+        old = self.months[month_key(old_start_date)]
+        old[0] -= 1
+        old[1] -= 1 if was_completed else 0
+        return self.add_project(project)
+
+    def save(self):
+        _apply(PlaceStats, 'place_id', ('added_count', 'visited_count'), self.places)
+        _apply(MonthStats, 'month', ('project_count', 'completed_count'), self.months)
+
+
+def _apply(model, key, fields, deltas):
+    by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        if any(delta):
+            by_delta[tuple(delta)].append(pk)
+
+    for delta, pks in by_delta.items():
+        increments = {field: F(field) + value for field, value in zip(fields, delta)}
+        queryset = model.objects.filter(**{f'{key}__in': pks})
+        if queryset.update(**increments) == len(pks):
+            continue
+        # Rows seen for the first time: inserted at zero (another
+        # transaction may insert them concurrently), then incremented
+        missing = set(pks).difference(queryset.values_list(key, flat=True))
+        model.objects.bulk_create([model(**{key: pk}) for pk in missing], ignore_conflicts=True)
+        model.objects.filter(**{f'{key}__in': missing}).update(**increments)
+
+
+def top_places(field, limit):
+    """The places with the largest field (added_count or visited_count)."""
+    return (
+        PlaceStats.objects.filter(**{f'{field}__gt': 0})
+        .order_by(f'-{field}', 'place_id')
+        .values_list('place__external_id', 'place__title', field)[:limit]
+    )
+
+
+def completion_by_month():
+    rows = MonthStats.objects.filter(project_count__gt=0).values_list('month', 'project_count', 'completed_count')
+    return [
+        {
+            'month': month or None,
+            'projects': projects,
+            'completed': completed,
+            'completion_rate': round(completed / projects, 4),
+        }
+        # Projects without a start_date last
+        for month, projects, completed in sorted(rows, key=lambda row: (not row[0], row[0]))
+    ]
+
+
+def compute(chunk_size=10000):
+    """
+    Compute ({place id: (added, visited)}, {month: (projects, completed)})
+    from the assignments and projects, chunk_size ids at a time.
+    """
+    places = Counter()
+    visits = Counter()
+    last_id = ProjectPlaceAssignment.objects.aggregate(last=Max('id'))['last'] or 0
+    for start in range(0, last_id, chunk_size):
+        rows = (
+            ProjectPlaceAssignment.objects.filter(id__gt=start, id__lte=start + chunk_size)
+            .values('place_id')
+            .annotate(added=Count('id'), visited=Count('id', filter=Q(visited=True)))
+            .order_by()
+        )
+        for row in rows:
+            places[row['place_id']] += row['added']
+            visits[row['place_id']] += row['visited']
+
+    months = Counter()
+    completed = Counter()
+    last_id = 0
+    while True:
+        rows = list(
+            TravelProject.objects.filter(pk__gt=last_id).order_by('pk')
+            .values_list('pk', 'start_date', 'is_completed')[:chunk_size]
+        )
+        if not rows:
+            break
+        for _, start_date, is_completed in rows:
+            months[month_key(start_date)] += 1
+            completed[month_key(start_date)] += is_completed
+        last_id = rows[-1][0]
+
+    return (
+        {place_id: (places[place_id], visits[place_id]) for place_id in places},
+        {month: (months[month], completed[month]) for month in months},
+    )
+
+
+def stored():
+    """The stored statistics, shaped like compute() returns them."""
+    return (
+        {
+            place_id: (added, visited)
+            for place_id, added, visited in PlaceStats.objects.values_list('place_id', 'added_count', 'visited_count')
+            if added or visited
+        },
+        {
+            month: (projects, completed)
+            for month, projects, completed in MonthStats.objects.values_list('month', 'project_count', 'completed_count')
+            if projects or completed
+        },
+    )
+
+
+def rebuild(places, months, batch_size=1000):
+    """Replace the stored statistics with those from compute()."""
+    with transaction.atomic():
+        PlaceStats.objects.all().delete()
+        MonthStats.objects.all().delete()
+        PlaceStats.objects.bulk_create(
+            [PlaceStats(place_id=place_id, added_count=added, visited_count=visited)
+             for place_id, (added, visited) in places.items()],
+            batch_size=batch_size,
+        )
+        MonthStats.objects.bulk_create(
+            [MonthStats(month=month, project_count=projects, completed_count=completed)
+             for month, (projects, completed) in months.items()],
+            batch_size=batch_size,
+        )
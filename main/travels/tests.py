@@ -1,3 +1,1491 @@
-from django.test import TestCase
+import asyncio
+import csv
+import hashlib
+import io
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import requests
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.response import Response
+
+from . import artic, catalog, idempotency, itinerary, metrics, stats
+from .artic import ArtworkAPIError, ArtworkAPIUnavailable, ArticClient, AsyncArticClient, CircuitBreaker
+from .artwork_cache import MISSING, LocMemArtworkCache, get_artwork_cache
+from .async_views import add_assignment
+from .changes import compact
+from .singleflight import SingleFlight
+from .validation import complete_jobs
+from .stats import StatsDelta
+from .models import (
+    ARTWORKS_BATCH_SIZE,
+    PLACE_NOT_FOUND,
+    Artwork,
+    IdempotencyKey,
+    MonthStats,
+    PlaceStats,
+    PlaceValidationJob,
+    ProjectChange,
+    ProjectImport,
+    ProjectPlace,
+    ProjectPlaceAssignment,
+    TravelProject,
+    afetch_artworks,
+    fetch_artworks,
+)
+
+
+def create_project(name, external_ids, visited=False):
+    """Create a project with places directly, without the Art Institute API."""
+    ProjectPlace.objects.bulk_create(
+        [ProjectPlace(external_id=external_id, title=f'Artwork {external_id}') for external_id in external_ids],
+        ignore_conflicts=True,
+    )
+    project = TravelProject.objects.create(
+        name=name,
+        place_count=len(external_ids),
+        visited_count=len(external_ids) if visited else 0,
+        is_completed=visited,
+    )
+    assignments = ProjectPlaceAssignment.objects.bulk_create([
+        ProjectPlaceAssignment(project=project, place=place, visited=visited)
+        for place in ProjectPlace.objects.filter(external_id__in=external_ids)
+    ])
+    StatsDelta().add_project(project).add_assignments(assignments).save()
+    return project
+
+
+def fake_fetch_artworks(external_ids, network=True):
+    """Stand-in for the Art Institute API: ids below 1000 exist."""
+    return {
+        external_id: {'id': external_id, 'title': f'Artwork {external_id}'} if external_id < 1000 else None
+        for external_id in external_ids
+    }
+
+
+def mock_artworks():
+    return mock.patch('main.travels.models.fetch_artworks', side_effect=fake_fetch_artworks)
+
+
+class ArtworkCacheTests(TestCase):
+
+    def setUp(self):
+        self.cache = LocMemArtworkCache(ttl=60, negative_ttl=5, max_entries=2)
+
+    def test_lru_eviction(self):
+        self.cache.set_many({1: {'id': 1}, 2: {'id': 2}})
+        # 1 is used, so 2 is the least recently used when 3 comes in
+        self.cache.get(1)
+        self.cache.set(3, {'id': 3})
+        self.assertEqual(self.cache.get_many([1, 2, 3]), {1: {'id': 1}, 3: {'id': 3}})
+        self.assertEqual((self.cache.evictions, self.cache.size()), (1, 2))
+
+    def test_ttl(self):
+        with mock.patch('main.travels.artwork_cache.time.monotonic', return_value=100):
+            self.cache.set_many({1: {'id': 1}, 2: None})
+        with mock.patch('main.travels.artwork_cache.time.monotonic', return_value=104):
+            # A cached "not found" is a hit too
+            self.assertEqual(self.cache.get_many([1, 2]), {1: {'id': 1}, 2: None})
+        with mock.patch('main.travels.artwork_cache.time.monotonic', return_value=106):
+            self.assertIs(self.cache.get(2), MISSING)
+            self.assertEqual(self.cache.get(1), {'id': 1})
+        with mock.patch('main.travels.artwork_cache.time.monotonic', return_value=161):
+            self.assertIs(self.cache.get(1), MISSING)
+        self.assertEqual((self.cache.hits, self.cache.misses), (3, 2))
+
+    def test_stats_endpoint(self):
+        cache = get_artwork_cache()
+        cache.clear()
+        cache.reset_stats()
+        cache.set_many({1: {'id': 1, 'title': 'Artwork 1'}, 2: None})
+        cache.get_many([1, 2, 3])
+        response = self.client.get(reverse('artwork-cache-stats'))
+        self.assertEqual(response.json(), {
+            'backend': 'LocMemArtworkCache',
+            'hits': 2,
+            'misses': 1,
+            'evictions': 0,
+            'hit_rate': 2 / 3,
+            'size': 2,
+        })
+
+
+class BatchLookupTests(TestCase):
+
+    def setUp(self):
+        get_artwork_cache().clear()
+
+    def test_ids_are_fetched_in_batches(self):
+        client = mock.Mock()
+        client.get_artworks.side_effect = lambda ids: [{'id': i, 'title': f'Artwork {i}'} for i in ids if i % 2]
+        external_ids = list(range(1, 2 * ARTWORKS_BATCH_SIZE + 51))
+        with mock.patch('main.travels.models.get_client', return_value=client):
+            artworks = fetch_artworks(external_ids)
+            # All answers, "not found" included, are cached now
+            self.assertEqual(fetch_artworks(external_ids), artworks)
+        self.assertEqual(
+            [len(call.args[0]) for call in client.get_artworks.call_args_list],
+            [ARTWORKS_BATCH_SIZE, ARTWORKS_BATCH_SIZE, 50],
+        )
+        self.assertEqual(artworks[3]['title'], 'Artwork 3')
+        self.assertIsNone(artworks[4])
+
+    def test_unknown_ids_are_reported_per_id(self):
+        with mock_artworks():
+            places, errors = ProjectPlace.objects.lookup([1, 1000, 2, 1001])
+        self.assertEqual(sorted(places), [1, 2])
+        self.assertEqual(errors, {1000: PLACE_NOT_FOUND, 1001: PLACE_NOT_FOUND})
+
+    def test_assigned_places_are_skipped(self):
+        project = create_project('Trip', [1, 2])
+        with mock_artworks():
+            places, errors = ProjectPlace.objects.lookup([2, 3])
+        assignments = project.assign_places(places)
+        self.assertEqual([assignment.place.external_id for assignment in assignments], [3])
+        project.refresh_from_db()
+        self.assertEqual(project.place_count, 3)
+        self.assertEqual(ProjectPlace.objects.filter(external_id=3).count(), 1)
+
+
+class ArtworkCatalogTests(TestCase):
+
+    def parse(self, text):
+        return [record['id'] for record in catalog.iter_json(io.StringIO(text))]
+
+    def write_dump(self, text, suffix='.json'):
+        with tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False) as f:
+            f.write(text)
+        self.addCleanup(os.remove, f.name)
+        return f.name
+
+    def test_top_level_data_only(self):
+        text = '{"config": {"data": []}, "info": {"total": 2}, "data": [{"id": 1}, {"id": 2, "title": "a]b"}]}'
+        self.assertEqual(self.parse(text), [1, 2])
+        self.assertEqual(self.parse(' [{"id": 1}, {"id": 2}] '), [1, 2])
+        for text in ['{"config": {"data": [{"id": 1}]}}', '{"data": 5}', '[{"id": 1}']:
+            with self.assertRaises(catalog.DumpFormatError):
+                self.parse(text)
+
+    def test_chunk_boundaries(self):
+        text = '{"limit": 12345, "data": [{"id": 1, "title": "Water Lilies"}, {"id": 22}, {"id": 333}]}'
+        for read_size in (1, 2, 3, 7, 16):
+            with mock.patch('main.travels.catalog.READ_SIZE', read_size):
+                self.assertEqual(self.parse(text), [1, 22, 333])
+
+    def test_resume_and_skip_unchanged(self):
+        path = self.write_dump('\n'.join(
+            json.dumps({'id': external_id, 'title': f'Artwork {external_id}'}) for external_id in range(1, 6)
+        ), suffix='.jsonl')
+        save_batch = catalog.save_batch
+        batches = []
+
+        def fail_on_second_batch(artworks):
+            batches.append([artwork.external_id for artwork in artworks])
+            if len(batches) == 2:
+                raise OSError('disk full')
+            return save_batch(artworks)
+
+        with mock.patch('main.travels.catalog.save_batch', side_effect=fail_on_second_batch):
+            with self.assertRaises(OSError):
+                catalog.import_dump(path, batch_size=2)
+            state = catalog.import_dump(path, batch_size=2)
+        # The failed batch is redone, the saved one is not
+        self.assertEqual(batches, [[1, 2], [3, 4], [3, 4], [5]])
+        self.assertEqual((state.position, state.written, state.completed), (5, 5, True))
+        self.assertEqual(Artwork.objects.count(), 5)
+
+        # Same content again: nothing written
+        state = catalog.import_dump(path, batch_size=2, restart=True)
+        self.assertEqual((state.position, state.written), (5, 0))
+        Artwork.objects.filter(external_id=2).update(checksum='outdated')
+        state = catalog.import_dump(path, batch_size=2, restart=True)
+        self.assertEqual(state.written, 1)
+
+
+@override_settings(RESPONSE_CACHE={'ENABLED': False})
+class QueryBudgetTests(TestCase):
+    """
+    Read endpoints must run a fixed number of queries, however many
+    projects and places they return.
+    """
+
+    def setUp(self):
+        self.projects = [
+            create_project(f'Project {i}', range(i * 10, i * 10 + 10))
+            for i in range(5)
+        ]
+        self.project = self.projects[0]
+        self.assignment = self.project.projectplaceassignment_set.first()
+
+    def assertQueryBudget(self, url, budget):
+        with self.assertNumQueries(budget):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_project_list(self):
+        # Page of versions, projects, assignments with places
+        response = self.assertQueryBudget(reverse('projects-list'), 3)
+        self.assertEqual(len(response.json()['results']), 5)
+        self.assertEqual(len(response.json()['results'][0]['places']), 10)
+
+        create_project('One more', range(100, 110))
+        self.assertQueryBudget(reverse('projects-list'), 3)
+
+    def test_project_detail(self):
+        # Validators, project, assignments with places
+        response = self.assertQueryBudget(reverse('projects-detail', args=[self.project.pk]), 3)
+        self.assertEqual(len(response.json()['places']), 10)
+
+    def test_project_place_list(self):
+        response = self.assertQueryBudget(reverse('project-places-list', args=[self.project.pk]), 2)
+        self.assertEqual(response.json()['results'][0]['title'], 'Artwork 0')
+
+    def test_project_place_detail(self):
+        self.assertQueryBudget(
+            reverse('project-place-detail', args=[self.project.pk, self.assignment.pk]), 1
+        )
+
+
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        self.projects = [create_project(f'Project {i}', [i]) for i in range(5)]
+
+    def get_page(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_walks_pages_forward_and_back(self):
+        first = self.get_page(reverse('projects-list') + '?page_size=2')
+        self.assertEqual([p['name'] for p in first['results']], ['Project 0', 'Project 1'])
+        self.assertIsNone(first['previous'])
+
+        second = self.get_page(first['next'])
+        self.assertEqual([p['name'] for p in second['results']], ['Project 2', 'Project 3'])
+
+        last = self.get_page(second['next'])
+        self.assertEqual([p['name'] for p in last['results']], ['Project 4'])
+        self.assertIsNone(last['next'])
+
+        back = self.get_page(last['previous'])
+        self.assertEqual(back['results'], second['results'])
+
+    def test_page_size_is_capped(self):
+        with self.settings(API_MAX_PAGE_SIZE=3):
+            page = self.get_page(reverse('projects-list') + '?page_size=50')
+        self.assertEqual(len(page['results']), 3)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('projects-list') + '?cursor=nonsense')
+        self.assertEqual(response.status_code, 404)
+
+
+class CompletionCounterTests(TestCase):
+
+    def setUp(self):
+        patcher = mock_artworks()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        response = self.client.post(
+            reverse('projects-list'), {'name': 'Trip', 'place_ids': [1, 2]}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.project = TravelProject.objects.get(pk=response.json()['id'])
+        self.places_url = reverse('project-places-list', args=[self.project.pk])
+
+    def assertCounters(self, places, visited, completed):
+        self.project.refresh_from_db()
+        self.assertEqual(
+            (self.project.place_count, self.project.visited_count, self.project.is_completed),
+            (places, visited, completed),
+        )
+
+    def place_url(self, assignment_id):
+        return reverse('project-place-detail', args=[self.project.pk, assignment_id])
+
+    def test_counters_follow_assignment_changes(self):
+        self.assertCounters(2, 0, False)
+
+        assignments = list(self.project.projectplaceassignment_set.order_by('id'))
+        for assignment in assignments:
+            self.client.patch(self.place_url(assignment.pk), {'visited': True}, content_type='application/json')
+        self.assertCounters(2, 2, True)
+
+        response = self.client.post(self.places_url, {'external_id': 3}, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertCounters(3, 2, False)
+
+        self.client.delete(self.place_url(response.json()['id']))
+        self.assertCounters(2, 2, True)
+
+        self.client.delete(self.place_url(assignments[0].pk))
+        self.assertCounters(1, 1, True)
+
+        response = self.client.delete(self.place_url(assignments[1].pk))
+        self.assertEqual(response.status_code, 400)
+        self.assertCounters(1, 1, True)
+
+    def test_place_limit(self):
+        for external_id in range(3, 11):
+            self.client.post(self.places_url, {'external_id': external_id}, content_type='application/json')
+        self.assertCounters(10, 0, False)
+
+        response = self.client.post(self.places_url, {'external_id': 11}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.patch(
+            reverse('projects-detail', args=[self.project.pk]), {'place_ids': [11]}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertCounters(10, 0, False)
+
+    def stale(self, assignment):
+        """Make the next request read assignment as it is now, as if it raced with later ones."""
+        stale = ProjectPlaceAssignment.objects.select_related('place', 'project').get(pk=assignment.pk)
+        return mock.patch.object(
+            ProjectPlaceAssignment.objects, 'select_related', return_value=mock.Mock(get=mock.Mock(return_value=stale))
+        )
+
+    def test_concurrent_requests_count_once(self):
+        self.client.post(self.places_url, {'external_id': 3}, content_type='application/json')
+        first, second, third = self.project.projectplaceassignment_set.order_by('id')
+
+        with self.stale(first):
+            self.client.patch(self.place_url(first.pk), {'visited': True}, content_type='application/json')
+            self.client.patch(self.place_url(first.pk), {'visited': True}, content_type='application/json')
+        self.assertCounters(3, 1, False)
+
+        with self.stale(third):
+            self.assertEqual(self.client.delete(self.place_url(third.pk)).status_code, 204)
+            self.assertEqual(self.client.delete(self.place_url(third.pk)).status_code, 404)
+        self.assertCounters(2, 1, False)
+
+        # Visited since it was read: still counted as a visited place
+        with self.stale(second):
+            self.client.patch(self.place_url(second.pk), {'visited': True}, content_type='application/json')
+            self.client.delete(self.place_url(second.pk))
+        self.assertCounters(1, 1, True)
+
+    def test_rebuild_counters(self):
+        TravelProject.objects.filter(pk=self.project.pk).update(place_count=7, is_completed=True)
+        call_command('rebuild_counters', stdout=mock.MagicMock())
+        self.assertCounters(2, 0, False)
+
+        # Bumped from the stored version, not from a copy read earlier
+        stale = TravelProject.objects.get(pk=self.project.pk)
+        self.client.patch(reverse('projects-detail', args=[self.project.pk]), {'name': 'Renamed'},
+                          content_type='application/json')
+        self.project.refresh_from_db()
+        version = self.project.version
+        stale.recount_places()
+        self.project.refresh_from_db()
+        self.assertEqual((stale.version, self.project.version), (version + 1, version + 1))
+        self.assertEqual(self.project.name, 'Renamed')
+
+
+class BulkUpdateTests(TestCase):
+
+    def setUp(self):
+        self.first = create_project('First', [1, 2])
+        self.second = create_project('Second', [3])
+        self.assignments = list(ProjectPlaceAssignment.objects.order_by('id'))
+
+    def test_bulk_update(self):
+        changes = [
+            {'assignment_id': self.assignments[0].pk, 'visited': True, 'notes': 'Seen'},
+            {'assignment_id': self.assignments[1].pk, 'visited': True},
+            {'assignment_id': self.assignments[2].pk, 'notes': 'Later'},
+            {'assignment_id': 999, 'visited': True},
+            {'visited': 'nope'},
+        ]
+        # SELECT, savepoint, bulk UPDATE, one counter UPDATE and read back
+        # per project, change log INSERT, stats UPDATEs (visits,
+        # completions), release
+        with self.assertNumQueries(11):
+            response = self.client.patch(reverse('places-bulk-update'), changes, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result['status'] for result in response.json()],
+            ['updated', 'updated', 'updated', 'not_found', 'invalid'],
+        )
+        self.assertEqual(response.json()[0]['place']['notes'], 'Seen')
+
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.visited_count, self.first.is_completed), (2, True))
+        self.assertEqual((self.second.visited_count, self.second.is_completed), (0, False))
+        self.assertEqual(ProjectPlaceAssignment.objects.get(pk=self.assignments[2].pk).notes, 'Later')
+
+    def test_expects_a_list(self):
+        response = self.client.patch(reverse('places-bulk-update'), {}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class PlaceSearchTests(TestCase):
+
+    def setUp(self):
+        self.project = create_project('Chicago', [1, 2, 3])
+        ProjectPlace.objects.filter(external_id=1).update(title='Water Lilies')
+        ProjectPlace.objects.filter(external_id=2).update(title='Nighthawks')
+        self.assignment = ProjectPlaceAssignment.objects.get(project=self.project, place__external_id=3)
+        self.assignment.notes = 'Right next to the water lilies room'
+        self.assignment.save()
+        create_project('Elsewhere', [1])
+
+    def search(self, query):
+        response = self.client.get(reverse('place-search'), {'q': query, 'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_prefix_match_on_titles_and_notes(self):
+        page = self.search('water lil')
+        self.assertEqual(len(page['results']), 2)
+        # Title matches rank above the note match
+        self.assertEqual({row['title'] for row in page['results']}, {'Water Lilies'})
+
+        rest = self.client.get(page['next']).json()
+        self.assertEqual([row['id'] for row in rest['results']], [self.assignment.pk])
+        self.assertIsNone(rest['next'])
+
+    def test_index_follows_writes(self):
+        self.assertEqual(self.search('nighthawk')['results'][0]['external_id'], 2)
+
+        ProjectPlace.objects.filter(external_id=2).update(title='Gothic')
+        self.assertEqual(self.search('nighthawk')['results'], [])
+
+        self.assignment.delete()
+        self.assertEqual(len(self.search('room')['results']), 0)
+
+    def test_query_is_required(self):
+        response = self.client.get(reverse('place-search'), {'q': '  *'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        self.project = create_project('Trip', [1, 2])
+        self.assignment = self.project.projectplaceassignment_set.first()
+
+    def test_not_modified_without_loading_places(self):
+        for url in (
+            reverse('projects-detail', args=[self.project.pk]),
+            reverse('project-places-list', args=[self.project.pk]),
+        ):
+            response = self.client.get(url)
+            self.assertTrue(response.has_header('Last-Modified'))
+
+            with self.assertNumQueries(1):
+                cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(cached.status_code, 304)
+
+            cached = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+            self.assertEqual(cached.status_code, 304)
+
+    def test_not_an_id(self):
+        for fast in (False, True):
+            with override_settings(FAST_READ_PATH=fast):
+                self.assertEqual(self.client.get(reverse('projects-detail', args=['abc'])).status_code, 404)
+                self.assertEqual(self.client.get(reverse('projects-detail', args=[999])).status_code, 404)
+
+    def test_assignment_change_invalidates(self):
+        url = reverse('projects-detail', args=[self.project.pk])
+        etag = self.client.get(url)['ETag']
+
+        self.client.patch(
+            reverse('project-place-detail', args=[self.project.pk, self.assignment.pk]),
+            {'notes': 'Changed'},
+            content_type='application/json',
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_pages_have_their_own_etag(self):
+        url = reverse('project-places-list', args=[self.project.pk])
+        self.assertNotEqual(self.client.get(url)['ETag'], self.client.get(url + '?page_size=1')['ETag'])
+
+
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.project = create_project('Trip', [1, 2])
+        self.assignment = self.project.projectplaceassignment_set.first()
+        self.urls = [
+            reverse('projects-list'),
+            reverse('projects-detail', args=[self.project.pk]),
+            reverse('project-places-list', args=[self.project.pk]),
+        ]
+
+    def test_repeated_reads_are_served_from_cache(self):
+        for url in self.urls:
+            first = self.client.get(url).json()
+            with self.assertNumQueries(1):
+                self.assertEqual(self.client.get(url).json(), first)
+
+    def test_writes_are_visible_immediately(self):
+        for url in self.urls:
+            self.client.get(url)
+
+        self.client.patch(
+            reverse('project-place-detail', args=[self.project.pk, self.assignment.pk]),
+            {'visited': True},
+            content_type='application/json',
+        )
+        project = self.client.get(self.urls[0]).json()['results'][0]
+        self.assertTrue(project['places'][0]['visited'])
+        self.assertTrue(self.client.get(self.urls[1]).json()['places'][0]['visited'])
+        self.assertTrue(self.client.get(self.urls[2]).json()['results'][0]['visited'])
+
+        create_project('Another', [3])
+        self.assertEqual(len(self.client.get(self.urls[0]).json()['results']), 2)
+
+
+@override_settings(RESPONSE_CACHE={'ENABLED': False})
+class RequestMetricsTests(TestCase):
+
+    def setUp(self):
+        metrics.registry.reset()
+        self.project = create_project('Trip', [1, 2])
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('projects-detail', args=[self.project.pk]))
+        timing = dict(
+            (part.split(';')[0], part) for part in response['Server-Timing'].split(', ')
+        )
+        self.assertEqual(set(timing), {'db', 'artic', 'serialize', 'total'})
+        self.assertIn('desc="3 queries"', timing['db'])
+        self.assertIn('desc="0 calls"', timing['artic'])
+
+    def test_histograms_by_view(self):
+        self.client.get(reverse('projects-list'))
+        self.client.get(reverse('projects-list'))
+
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertIn('travels_requests_total{view="projects-list",method="GET",status="200"} 2', text)
+        self.assertIn('travels_request_db_queries_bucket{view="projects-list",le="3"} 2', text)
+        self.assertIn('travels_request_duration_seconds_count{view="projects-list"} 2', text)
+
+    def test_concurrent_timers_each_count(self):
+        async def call(nested=False):
+            with metrics.timer('artic'):
+                await asyncio.sleep(0.01)
+                if nested:
+                    with metrics.timer('artic'):
+                        await asyncio.sleep(0)
+
+        async def request():
+            await asyncio.gather(call(), call(nested=True), call())
+
+        timings = metrics.RequestTimings()
+        token = metrics._current.set(timings)
+        self.addCleanup(metrics._current.reset, token)
+        async_to_sync(request)()
+        self.assertEqual(timings.counts['artic'], 3)
+        self.assertGreaterEqual(timings.durations['artic'], 0.03)
+
+    @override_settings(REQUEST_METRICS={'SLOW_REQUEST_THRESHOLD': 0})
+    def test_slow_request_log(self):
+        with self.assertLogs('main.travels.metrics', 'WARNING') as logs:
+            self.client.get(reverse('projects-detail', args=[self.project.pk]))
+        self.assertIn('3 queries', logs.output[0])
+        self.assertIn('FROM "travels_projectplaceassignment"', logs.output[0])
+
+
+@override_settings(ASYNC_PLACE_VALIDATION=True)
+class AsyncValidationTests(TestCase):
+
+    def setUp(self):
+        get_artwork_cache().clear()
+        patcher = mock.patch('main.travels.models.fetch_artworks_from_api')
+        self.api_in_request = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def validate_places(self, side_effect=fake_fetch_artworks):
+        with mock.patch('main.travels.validation.fetch_artworks_from_api', side_effect=side_effect):
+            call_command('validate_places', '--once', stdout=mock.MagicMock())
+
+    def test_places_are_accepted_pending_and_validated_later(self):
+        response = self.client.post(
+            reverse('projects-list'), {'name': 'Trip', 'place_ids': [5, 2000]}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([place['validation_status'] for place in response.json()['places']], ['pending'] * 2)
+        project_url = reverse('projects-detail', args=[response.json()['id']])
+        places_url = reverse('project-places-list', args=[response.json()['id']])
+        response = self.client.post(places_url, {'external_id': 6}, content_type='application/json')
+        self.assertEqual(response.json()['validation_status'], 'pending')
+        self.assertEqual(PlaceValidationJob.objects.count(), 3)
+        self.api_in_request.assert_not_called()
+
+        etag = self.client.get(project_url)['ETag']
+        self.validate_places()
+
+        self.assertFalse(PlaceValidationJob.objects.exists())
+        response = self.client.get(project_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(place['title'], place['validation_status']) for place in response.json()['places']],
+            [('Artwork 5', 'valid'), ('', 'rejected'), ('Artwork 6', 'valid')],
+        )
+
+        # Rejected ids are refused right away from now on
+        response = self.client.post(places_url, {'external_id': 2000}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            reverse('projects-list'), {'name': 'Other', 'place_ids': [2000]}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.api_in_request.assert_not_called()
+
+    def test_failed_lookups_are_retried(self):
+        self.client.post(
+            reverse('projects-list'), {'name': 'Trip', 'place_ids': [5]}, content_type='application/json'
+        )
+        self.validate_places(side_effect=ArtworkAPIError('down'))
+
+        job = PlaceValidationJob.objects.get()
+        self.assertEqual((job.attempts, job.last_error, job.locked_until), (1, 'down', None))
+        self.assertEqual(ProjectPlace.objects.get(external_id=5).validation_status, 'pending')
+
+
+def upstream_response(status_code, body=b'{"data": []}'):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = body
+    return response
+
+
+class ArticClientTests(TestCase):
+
+    def setUp(self):
+        self.client = ArticClient(
+            base_url='http://artic.test', fields=['id', 'title'], timeout=(1, 1), pool_connections=1,
+            pool_maxsize=1, retries=2, backoff=0.1, backoff_max=0.15, circuit_failure_threshold=3,
+            circuit_reset_timeout=30, user_agent='test',
+        )
+        patcher = mock.patch('main.travels.artic.time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def answer(self, *answers):
+        return mock.patch.object(self.client.session, 'get', side_effect=list(answers))
+
+    def test_retries_429_and_5xx_with_backoff(self):
+        with self.answer(upstream_response(429), upstream_response(502),
+                         upstream_response(200, b'{"data": [{"id": 1}]}')) as get:
+            self.assertEqual(self.client.get_artworks([1]), [{'id': 1}])
+        self.assertEqual(get.call_count, 3)
+        # Jittered, capped at backoff_max
+        self.assertEqual(len(self.sleep.call_args_list), 2)
+        self.assertTrue(all(0 <= call.args[0] <= 0.15 for call in self.sleep.call_args_list))
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_client_errors_are_not_retried(self):
+        with self.answer(upstream_response(404)) as get, self.assertRaises(ArtworkAPIError):
+            self.client.get_artworks([1])
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual(self.client.breaker.failures, 0)
+
+    def test_circuit_opens_and_recovers(self):
+        errors = [requests.ConnectionError('down'), requests.exceptions.InvalidHeader('bad'),
+                  upstream_response(200, b'<html>')]
+        with self.answer(*errors), self.assertRaises(ArtworkAPIUnavailable):
+            self.client.get_artworks([1])
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.OPEN)
+        with self.answer() as get, self.assertRaises(ArtworkAPIUnavailable):
+            self.client.get_artworks([1])
+        get.assert_not_called()
+
+        later = time.monotonic() + 31
+        with mock.patch('main.travels.artic.time.monotonic', return_value=later):
+            self.assertEqual(self.client.breaker.state, CircuitBreaker.HALF_OPEN)
+            # A failed trial opens the circuit again, and is not left running
+            with self.answer(upstream_response(200, b'not json')) as get, self.assertRaises(ArtworkAPIUnavailable):
+                self.client.get_artworks([1])
+            self.assertEqual(get.call_count, 1)
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.OPEN)
+
+        with mock.patch('main.travels.artic.time.monotonic', return_value=later + 31):
+            with self.answer(upstream_response(200)):
+                self.assertEqual(self.client.get_artworks([1]), [])
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_one_trial_at_a_time(self):
+        breaker = CircuitBreaker(1, 30)
+        breaker.record_failure()
+        with mock.patch('main.travels.artic.time.monotonic', return_value=time.monotonic() + 31):
+            self.assertEqual((breaker.allow(), breaker.allow()), (True, False))
+            breaker.record_success()
+            self.assertEqual((breaker.allow(), breaker.allow()), (True, True))
+
+
+def fake_api_artworks(external_ids):
+    """ArticClient.get_artworks() answering like fake_fetch_artworks."""
+    return [artwork for artwork in fake_fetch_artworks(external_ids).values() if artwork]
+
+
+class FakeAsyncClient:
+    """Async Art Institute client that answers like fake_fetch_artworks."""
+
+    def __init__(self):
+        self.in_flight = self.max_in_flight = 0
+
+    async def get_artworks(self, external_ids):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return [artwork for artwork in fake_fetch_artworks(external_ids).values() if artwork]
+
+
+class AsyncCreateTests(TestCase):
+
+    def setUp(self):
+        get_artwork_cache().clear()
+        self.upstream = FakeAsyncClient()
+        patcher = mock.patch('main.travels.models.get_async_client', return_value=self.upstream)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_create_project_and_place(self):
+        response = await self.async_client.post(
+            reverse('async-projects-create'), {'name': 'Trip', 'place_ids': [1, 2]}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        project = response.json()
+        self.assertEqual([place['title'] for place in project['places']], ['Artwork 1', 'Artwork 2'])
+
+        url = reverse('async-project-places-create', args=[project['id']])
+        with mock.patch('main.travels.models.get_client', return_value=mock.Mock(get_artworks=fake_api_artworks)):
+            response = await self.async_client.post(
+                url, {'external_id': 3, 'notes': 'Later'}, content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual((response.json()['title'], response.json()['notes']), ('Artwork 3', 'Later'))
+
+            response = await self.async_client.post(url, {'external_id': 3}, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            response = await self.async_client.post(url, {'external_id': 2000}, content_type='application/json')
+            self.assertEqual(response.json(), {'external_id': [PLACE_NOT_FOUND]})
+
+        # Same representation as the sync endpoints
+        detail = await self.async_client.get(reverse('projects-detail', args=[project['id']]))
+        self.assertEqual(detail.json()['places'][:2], project['places'])
+
+    async def test_place_ids_not_a_list(self):
+        for url in (reverse('async-projects-create'), reverse('projects-list')):
+            for place_ids in (5, 'abc', [1] * 11):
+                response = await self.async_client.post(
+                    url, {'name': 'Trip', 'place_ids': place_ids}, content_type='application/json'
+                )
+                self.assertEqual(response.status_code, 400, (url, place_ids))
+
+    async def test_place_external_id(self):
+        project = await sync_to_async(create_project)('Trip', [1])
+        for url in (reverse('async-project-places-create', args=[project.pk]),
+                    reverse('project-places-list', args=[project.pk])):
+            for external_id in (True, 1.5, '1.5', 'abc', [2]):
+                response = await self.async_client.post(
+                    url, {'external_id': external_id}, content_type='application/json'
+                )
+                self.assertEqual(response.status_code, 400, (url, external_id))
+                self.assertIn('external_id', response.json())
+
+    async def test_lookups_run_concurrently(self):
+        results = await asyncio.gather(*[afetch_artworks([external_id]) for external_id in (1, 2, 2000)])
+        self.assertEqual(self.upstream.max_in_flight, 3)
+        self.assertEqual(results[2], {2000: None})
+
+    def test_client_closed_with_its_loop(self):
+        client = async_to_sync(artic.get_async_client)()
+        self.assertTrue(client.client.is_closed)
+
+    async def test_client_retries(self):
+        answers = [httpx.Response(503), httpx.Response(200, json={'data': [{'id': 1, 'title': 'One'}]})]
+        client = AsyncArticClient(
+            CircuitBreaker(5, 30), base_url='http://artic.test', fields=['id', 'title'], timeout=(1, 1),
+            retries=2, backoff=0, backoff_max=0, user_agent='test', async_max_concurrency=2,
+        )
+        client.client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: answers.pop(0)))
+        self.assertEqual(await client.get_artworks([1]), [{'id': 1, 'title': 'One'}])
+        self.assertEqual(client.breaker.failures, 0)
+
+
+class SingleFlightTests(TestCase):
+
+    def test_concurrent_callers_share_one_call(self):
+        flights = SingleFlight()
+        calls = []
+        started = threading.Event()
+
+        def fetch(keys):
+            calls.append(keys)
+            started.set()
+            time.sleep(0.05)
+            return {key: key * 10 for key in keys}
+
+        results = {}
+
+        def call(keys):
+            results[tuple(keys)] = flights.do_many(keys, fetch)
+
+        first = threading.Thread(target=call, args=([1, 2],))
+        first.start()
+        started.wait()
+        others = [threading.Thread(target=call, args=(keys,)) for keys in ([1], [2, 3], [1, 2])]
+        for thread in others:
+            thread.start()
+        for thread in [first] + others:
+            thread.join()
+
+        # Only 3 was not in flight already
+        self.assertEqual(calls, [[1, 2], [3]])
+        self.assertEqual(results[(2, 3)], {2: 20, 3: 30})
+        self.assertEqual(results[(1, 2)], {1: 10, 2: 20})
+
+    def test_errors_are_shared(self):
+        flights = SingleFlight()
+        with self.assertRaises(ArtworkAPIError):
+            flights.do(1, mock.Mock(side_effect=ArtworkAPIError('down')))
+        self.assertEqual(flights.do(1, lambda: 'retried'), 'retried')
+
+    def test_lost_insert_race_reuses_the_winner(self):
+        project = create_project('Trip', [1])
+        winner = ProjectPlace(external_id=5, title='Artwork 5')
+        lookup = ProjectPlace.objects.lookup
+
+        def lookup_then_lose_race(external_ids):
+            result = lookup(external_ids)
+            # Another request inserts the same place meanwhile
+            winner.save()
+            return result
+
+        with mock_artworks(), mock.patch.object(ProjectPlace.objects, 'lookup', side_effect=lookup_then_lose_race):
+            response = self.client.post(
+                reverse('project-places-list', args=[project.pk]), {'external_id': 5}, content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(ProjectPlace.objects.filter(external_id=5).count(), 1)
+        self.assertEqual(project.projectplaceassignment_set.get(place__external_id=5).place_id, winner.pk)
+
+
+class ExportTests(TestCase):
+
+    def setUp(self):
+        self.first = create_project('First', [1, 2])
+        self.second = create_project('Second', [3], visited=True)
+
+    def export(self, **params):
+        response = self.client.get(reverse('projects-export'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        projects = [json.loads(line) for line in self.export().splitlines()]
+        self.assertEqual([project['name'] for project in projects], ['First', 'Second'])
+        self.assertEqual([place['external_id'] for place in projects[0]['places']], [1, 2])
+        self.assertTrue(projects[1]['places'][0]['visited'])
+
+        # The same places as the API shows
+        api = self.client.get(reverse('projects-detail', args=[self.first.pk])).json()
+        self.assertEqual(projects[0]['places'], api['places'])
+
+    def test_csv(self):
+        rows = list(csv.DictReader(io.StringIO(self.export(format='csv'))))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual((rows[2]['project_id'], rows[2]['external_id']), (str(self.second.pk), '3'))
+
+    def test_since(self):
+        self.first.adjust_counters()
+        self.first.refresh_from_db()
+        projects = [json.loads(line) for line in self.export(since=self.first.updated_at.isoformat()).splitlines()]
+        self.assertEqual([project['name'] for project in projects], ['First'])
+
+        response = self.client.get(reverse('projects-export'), {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('export_projects', '--format', 'csv', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 4)
+
+
+class BulkImportTests(TestCase):
+
+    def setUp(self):
+        patcher = mock_artworks()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, lines, **params):
+        url = reverse('projects-bulk-import')
+        if params:
+            url += '?' + '&'.join(f'{key}={value}' for key, value in params.items())
+        return self.client.post(url, '\n'.join(lines), content_type='application/x-ndjson')
+
+    def test_import(self):
+        lines = [
+            json.dumps({'name': 'First', 'place_ids': [1, 2, 2]}),
+            json.dumps({'name': 'No places', 'place_ids': []}),
+            '',
+            json.dumps({'name': 'Unknown place', 'place_ids': [3, 2000]}),
+            'not json',
+            json.dumps({'name': 'Second', 'description': 'Trip', 'start_date': '2026-05-01', 'place_ids': [2, 3]}),
+        ]
+        response = self.post(lines)
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertEqual((result['created'], result['failed'], result['completed']), (2, 3, True))
+        self.assertEqual([error['line'] for error in result['errors']], [2, 4, 5])
+        self.assertEqual(result['errors'][1]['errors'], {'place_ids': {'2000': [PLACE_NOT_FOUND]}})
+
+        second = TravelProject.objects.get(name='Second')
+        self.assertEqual((second.place_count, second.visited_count, second.is_completed), (2, 0, False))
+        detail = self.client.get(reverse('projects-detail', args=[second.pk])).json()
+        self.assertEqual([place['external_id'] for place in detail['places']], [2, 3])
+        self.assertEqual(ProjectPlace.objects.count(), 3)
+
+        # A completed source is not imported twice
+        self.assertEqual(self.post(lines, source=result['source']).status_code, 409)
+
+    def test_resume_after_upstream_failure(self):
+        lines = [json.dumps({'name': f'Project {i}', 'place_ids': [i + 1]}) for i in range(4)]
+        calls = []
+
+        def flaky(external_ids, network=True):
+            calls.append(external_ids)
+            if len(calls) == 2:
+                raise ArtworkAPIError('down')
+            return fake_fetch_artworks(external_ids)
+
+        with mock.patch('main.travels.models.fetch_artworks', side_effect=flaky), \
+                mock.patch('main.travels.views.BULK_IMPORT_CHUNK_SIZE', 2):
+            response = self.post(lines, source='partner')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual((response.json()['position'], response.json()['created']), (2, 2))
+
+            # Lines already imported must be the same
+            changed = [json.dumps({'name': 'Other', 'place_ids': [1]}), *lines[1:]]
+            for body in (changed, lines[:1]):
+                response = self.post(body, source='partner')
+                self.assertEqual(response.status_code, 409)
+            self.assertEqual(ProjectImport.objects.get(source='partner').position, 2)
+
+            response = self.post(lines, source='partner')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['created'], response.json()['completed']), (4, True))
+        self.assertEqual(TravelProject.objects.count(), 4)
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as f:
+            f.write(json.dumps({'name': 'Trip', 'place_ids': [1]}) + '\n')
+        self.addCleanup(os.remove, f.name)
+        call_command('import_projects', f.name, stdout=io.StringIO())
+        self.assertTrue(TravelProject.objects.filter(name='Trip', place_count=1).exists())
+
+
+@override_settings(RESPONSE_CACHE={'ENABLED': False})
+class FastReadPathTests(TestCase):
+
+    def setUp(self):
+        self.projects = [create_project(f'Project {i}', range(i * 10, i * 10 + 3)) for i in range(3)]
+        TravelProject.objects.filter(pk=self.projects[0].pk).update(description='Ünïcode', start_date='2026-05-01')
+        ProjectPlaceAssignment.objects.filter(project=self.projects[1]).update(notes='See it', visited=True)
+        self.project = self.projects[1]
+        self.assignment = self.project.projectplaceassignment_set.first()
+        self.urls = [
+            reverse('projects-list'),
+            reverse('projects-list') + '?page_size=2',
+            reverse('projects-detail', args=[self.projects[0].pk]),
+            reverse('project-places-list', args=[self.project.pk]),
+            reverse('project-places-list', args=[self.project.pk]) + '?page_size=1',
+            reverse('project-place-detail', args=[self.project.pk, self.assignment.pk]),
+        ]
+
+    def test_same_bytes_as_the_serializers(self):
+        for url in self.urls:
+            with self.settings(FAST_READ_PATH=False):
+                expected = self.client.get(url).content
+            with self.settings(FAST_READ_PATH=True):
+                self.assertEqual(self.client.get(url).content, expected, url)
+
+    def test_sparse_fields(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('projects-list'), {'fields': 'name,id'})
+        self.assertEqual(response.json()['results'][0], {'id': self.projects[0].pk, 'name': 'Project 0'})
+
+        response = self.client.get(reverse('project-places-list', args=[self.project.pk]), {'fields': 'title'})
+        self.assertEqual(response.json()['results'][0], {'title': 'Artwork 10'})
+
+        response = self.client.get(reverse('projects-list'), {'fields': 'name,secret'})
+        self.assertEqual((response.status_code, response.json()), (400, {'error': 'Unknown fields: secret'}))
+
+
+class SchemaFileTests(TestCase):
+
+    def setUp(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.yaml', delete=False) as f:
+            f.write('openapi: 3.0.3\n')
+        self.addCleanup(os.remove, f.name)
+        self.path = f.name
+
+    def test_served_from_file(self):
+        with self.settings(OPENAPI_SCHEMA_FILE=self.path):
+            response = self.client.get(reverse('schema'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'application/vnd.oai.openapi')
+            self.assertEqual(response.content, b'openapi: 3.0.3\n')
+
+            etag = response['ETag']
+            self.assertEqual(self.client.get(reverse('schema'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+            # A new file is picked up without a restart
+            with open(self.path, 'w') as f:
+                f.write('openapi: 3.1.0\n')
+            os.utime(self.path, ns=(time.time_ns() + 10 ** 9,) * 2)
+            response = self.client.get(reverse('schema'), HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual((response.status_code, response.content), (200, b'openapi: 3.1.0\n'))
+
+    def test_generated_without_file(self):
+        from drf_spectacular.drainage import GENERATOR_STATS
+
+        with self.settings(OPENAPI_SCHEMA_FILE=self.path + '.missing'), self.assertLogs('main.docs', 'WARNING'), \
+                GENERATOR_STATS.silence():
+            response = self.client.get(reverse('schema'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'/api/projects/', response.content)
+
+    def test_api_settings(self):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='main.settings_api')
+        result = subprocess.run(
+            [sys.executable, 'manage.py', 'check'], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+        # drf_spectacular is left out, and not imported by the views either
+        command = "import sys, main.urls; print(any(m.startswith('drf_spectacular') for m in sys.modules))"
+        result = subprocess.run(
+            [sys.executable, 'manage.py', 'shell', '-c', command], cwd=settings.BASE_DIR, env=env,
+            capture_output=True, text=True,
+        )
+        self.assertEqual((result.returncode, result.stdout.split()[-1:]), (0, ['False']), result.stderr)
+
+
+class UsageStatsTests(TestCase):
+
+    def setUp(self):
+        patcher = mock_artworks()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create(self, place_ids, start_date=None):
+        data = {'name': 'Trip', 'place_ids': place_ids}
+        if start_date:
+            data['start_date'] = start_date
+        return self.client.post(reverse('projects-list'), data, content_type='application/json').json()
+
+    def test_kept_up_to_date(self):
+        first = self.create([1, 2], '2026-05-10')
+        second = self.create([2, 3], '2026-05-20')
+        third = self.create([2])
+        self.client.patch(reverse('project-place-detail', args=[first['id'], first['places'][1]['id']]),
+                          {'visited': True}, content_type='application/json')
+        self.client.patch(reverse('places-bulk-update'), [
+            {'assignment_id': place['id'], 'visited': True} for place in second['places']
+        ], content_type='application/json')
+        self.client.delete(reverse('project-place-detail', args=[second['id'], second['places'][1]['id']]))
+        self.client.delete(reverse('projects-detail', args=[third['id']]))
+        self.client.patch(reverse('projects-detail', args=[first['id']]), {'start_date': '2026-06-01'},
+                          content_type='application/json')
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('usage-stats'))
+        self.assertEqual(response.json(), {
+            'most_added': [
+                {'external_id': 2, 'title': 'Artwork 2', 'projects': 2},
+                {'external_id': 1, 'title': 'Artwork 1', 'projects': 1},
+            ],
+            'most_visited': [{'external_id': 2, 'title': 'Artwork 2', 'visits': 2}],
+            'completion_by_month': [
+                {'month': '2026-05', 'projects': 1, 'completed': 1, 'completion_rate': 1.0},
+                {'month': '2026-06', 'projects': 1, 'completed': 0, 'completion_rate': 0.0},
+            ],
+        })
+        self.assertEqual(stats.stored(), stats.compute(chunk_size=2))
+
+    def test_no_drift_after_racing_writes(self):
+        first = self.create([1, 2], '2026-05-10')
+        self.create([3])
+        stale_project = TravelProject.objects.get(pk=first['id'])
+        stale_assignment = ProjectPlaceAssignment.objects.select_related('place', 'project').get(
+            pk=first['places'][0]['id']
+        )
+
+        # Completed by a bulk update the other requests did not see
+        self.client.patch(reverse('places-bulk-update'), [
+            {'assignment_id': place['id'], 'visited': True} for place in first['places']
+        ], content_type='application/json')
+        add_assignment(stale_project, ProjectPlace.objects.get(external_id=3), '')
+        with mock.patch.object(ProjectPlaceAssignment.objects, 'select_related',
+                               return_value=mock.Mock(get=mock.Mock(return_value=stale_assignment))):
+            self.client.delete(reverse('project-place-detail', args=[first['id'], stale_assignment.pk]))
+        self.client.patch(reverse('projects-detail', args=[first['id']]), {'start_date': '2026-06-01'},
+                          content_type='application/json')
+
+        project = TravelProject.objects.get(pk=first['id'])
+        self.assertEqual((project.place_count, project.visited_count, project.is_completed), (2, 1, False))
+        call_command('rebuild_stats', '--check', stdout=io.StringIO())
+        self.assertEqual(
+            [change.data['is_completed'] for change in ProjectChange.objects.filter(
+                project_id=project.pk, kind=ProjectChange.PROJECT_UPDATED).order_by('pk')],
+            [True, False, False],
+        )
+
+    def test_rebuild(self):
+        create_project('Trip', [1, 2], visited=True)
+        PlaceStats.objects.update(added_count=5)
+        MonthStats.objects.all().delete()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_stats', '--check', stdout=io.StringIO())
+
+        call_command('rebuild_stats', '--chunk-size', '1', stdout=io.StringIO())
+        self.assertEqual(stats.stored(), stats.compute())
+        self.assertEqual(
+            self.client.get(reverse('usage-stats')).json()['completion_by_month'],
+            [{'month': None, 'projects': 1, 'completed': 1, 'completion_rate': 1.0}],
+        )
+
+
+# Galleries along one street, 0.001° of longitude (~83 m) apart
+GALLERIES = {1: 3, 2: 1, 3: 4, 4: 1, 5: 2}
+
+
+def fake_located_artworks(external_ids, network=True):
+    """fake_fetch_artworks() with gallery locations; id 6 has none."""
+    artworks = fake_fetch_artworks(external_ids)
+    for external_id, gallery in GALLERIES.items():
+        if external_id in artworks:
+            artworks[external_id].update(
+                gallery_id=gallery, gallery_title=f'Gallery {gallery}', latitude=41.88, longitude=-87.62 + gallery / 1000
+            )
+    return artworks
+
+
+class ItineraryTests(TestCase):
+
+    def setUp(self):
+        itinerary.route_cache.clear()
+        with mock.patch('main.travels.models.fetch_artworks', side_effect=fake_located_artworks):
+            self.project = self.client.post(
+                reverse('projects-list'), {'name': 'Trip', 'place_ids': [1, 2, 3, 4, 5, 6]},
+                content_type='application/json',
+            ).json()
+        self.url = reverse('projects-itinerary', args=[self.project['id']])
+
+    def test_order(self):
+        response = self.client.get(self.url).json()
+        self.assertEqual([stop['external_id'] for stop in response['stops']], [3, 1, 5, 4, 2])
+        self.assertEqual([stop['gallery_title'] for stop in response['stops'][-2:]], ['Gallery 1', 'Gallery 1'])
+        self.assertEqual(response['stops'][-1]['distance_m'], 0)
+        self.assertAlmostEqual(response['total_distance_m'], 248.6, delta=1)
+        self.assertEqual([place['external_id'] for place in response['unlocated']], [6])
+        self.assertEqual((response['method'], response['cached']), ('exact', False))
+
+        # Same place set: served from the cache
+        response = self.client.get(self.url).json()
+        self.assertEqual(response['cached'], True)
+        self.assertEqual((response['timing_ms']['matrix'], response['timing_ms']['solve']), (0, 0))
+        self.assertLess(response['timing_ms']['total'], 1)
+
+        response = self.client.get(self.url, {'start': 5}).json()
+        self.assertEqual([stop['external_id'] for stop in response['stops']], [5, 4, 2, 1, 3])
+        self.assertEqual(self.client.get(self.url, {'start': 6}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('projects-itinerary', args=[999])).status_code, 404)
+
+    @override_settings(ITINERARY={'EXACT_MAX_PLACES': 2})
+    def test_heuristic(self):
+        response = self.client.get(self.url).json()
+        self.assertEqual(response['method'], 'heuristic')
+        self.assertAlmostEqual(response['total_distance_m'], 248.6, delta=1)
+
+    def test_exact_matches_brute_force(self):
+        stops = [itinerary.Stop(i, None, 41.88 + (i * 7 % 5) / 1000, -87.62 + (i * 3 % 7) / 1000) for i in range(7)]
+        matrix = itinerary.distance_matrix(stops)
+        shortest = min(
+            itinerary.path_length(matrix, order) for order in itertools.permutations(range(7))
+        )
+        self.assertAlmostEqual(itinerary.path_length(matrix, itinerary.held_karp(matrix)), shortest)
+        self.assertGreaterEqual(itinerary.path_length(matrix, itinerary.heuristic(matrix)), shortest - 1e-6)
+
+    def test_stored_on_validation(self):
+        ProjectPlace.objects.filter(external_id=6).update(validation_status=ProjectPlace.PENDING)
+        place = ProjectPlace.objects.get(external_id=6)
+        job = PlaceValidationJob.objects.create(place=place)
+        complete_jobs([job], {6: {'id': 6, 'title': 'Artwork 6', 'gallery_id': 7, 'latitude': 41.8, 'longitude': -87.6}})
+        place.refresh_from_db()
+        self.assertEqual((place.gallery_id, place.gallery_title, place.latitude), (7, '', 41.8))
+
+    def test_backfill_locations(self):
+        ProjectPlace.objects.update(gallery_id=None, gallery_title='', latitude=None, longitude=None)
+        # Cached before locations were stored
+        self.addCleanup(get_artwork_cache().clear)
+        get_artwork_cache().set_many({i: {'id': i, 'title': f'Artwork {i}'} for i in range(1, 7)})
+        detail_url = reverse('projects-detail', args=[self.project['id']])
+        etag = self.client.get(detail_url)['ETag']
+        version = TravelProject.objects.get(pk=self.project['id']).version
+        with mock.patch('main.travels.models.fetch_artworks_from_api', side_effect=fake_located_artworks) as fetch:
+            call_command('backfill_locations', '--chunk-size', '4', stdout=io.StringIO())
+        self.assertEqual([call.args[0] for call in fetch.call_args_list], [[1, 2, 3, 4], [5, 6]])
+
+        # Located in both chunks
+        self.assertEqual(TravelProject.objects.get(pk=self.project['id']).version, version + 2)
+        self.assertEqual(self.client.get(detail_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        response = self.client.get(self.url).json()
+        self.assertEqual([stop['external_id'] for stop in response['stops']], [3, 1, 5, 4, 2])
+        self.assertEqual([place['external_id'] for place in response['unlocated']], [6])
+
+
+class IdempotencyTests(TestCase):
+
+    def post(self, url, data, key='retry-1'):
+        return self.client.post(url, data, content_type='application/json', headers={'Idempotency-Key': key})
+
+    def test_project_retry_is_replayed(self):
+        url = reverse('projects-list')
+        with mock_artworks():
+            first = self.post(url, {'name': 'Trip', 'place_ids': [1, 2]})
+        self.assertEqual(first.status_code, 201)
+
+        with mock.patch('main.travels.models.fetch_artworks') as fetch, \
+                mock.patch('main.travels.views.TravelProjectSerializer') as serializer, \
+                self.assertNumQueries(1):
+            retry = self.post(url, {'name': 'Trip', 'place_ids': [1, 2]})
+        fetch.assert_not_called()
+        serializer.assert_not_called()
+        self.assertEqual((retry.status_code, retry.json()), (201, first.json()))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(TravelProject.objects.count(), 1)
+
+        self.assertEqual(self.post(url, {'name': 'Other', 'place_ids': [1]}).status_code, 422)
+        with mock_artworks():
+            self.assertEqual(self.post(url, {'name': 'Trip', 'place_ids': [1, 2]}, key='retry-2').status_code, 201)
+        self.assertEqual(TravelProject.objects.count(), 2)
+
+    def test_failed_request_releases_the_key(self):
+        project = create_project('Trip', [1])
+        url = reverse('project-places-list', args=[project.pk])
+        with mock.patch('main.travels.models.fetch_artworks', side_effect=ArtworkAPIError('down')):
+            self.assertEqual(self.post(url, {'external_id': 2}).status_code, 503)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        with mock_artworks():
+            first = self.post(url, {'external_id': 2})
+        retry = self.post(url, {'external_id': 2})
+        self.assertEqual((first.status_code, retry.status_code), (201, 201))
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(project.projectplaceassignment_set.count(), 2)
+
+    def test_retry_waits_for_the_first_request(self):
+        url = reverse('projects-list')
+        key = idempotency.make_key('POST', url, 'retry-1')
+        body = json.dumps({'name': 'Trip', 'place_ids': [1]}).encode()
+        IdempotencyKey.objects.create(
+            key=key, fingerprint=hashlib.sha1(body).hexdigest(), expires_at=timezone.now() + timedelta(minutes=1)
+        )
+
+        def finish(timeout):
+            IdempotencyKey.objects.filter(key=key).update(status_code=201, body=b'{"id":1}')
+
+        with mock.patch.object(idempotency._never, 'wait', side_effect=finish) as wait:
+            response = self.client.post(url, body, content_type='application/json', headers={'Idempotency-Key': 'retry-1'})
+        self.assertEqual(wait.call_count, 1)
+        self.assertEqual((response.status_code, response.json()), (201, {'id': 1}))
+
+        IdempotencyKey.objects.filter(key=key).update(status_code=None)
+        with override_settings(IDEMPOTENCY={'WAIT_TIMEOUT': 0}):
+            self.assertEqual(self.post(url, {'name': 'Trip', 'place_ids': [1]}).status_code, 409)
+
+        # Abandoned by its worker: taken over
+        IdempotencyKey.objects.filter(key=key).update(expires_at=timezone.now())
+        with mock_artworks():
+            self.assertEqual(self.post(url, {'name': 'Trip', 'place_ids': [1]}).status_code, 201)
+        self.assertEqual(TravelProject.objects.count(), 1)
+
+    def test_claim_is_extended_while_running(self):
+        options = idempotency.get_options()
+        self.assertIsNone(idempotency.claim('k', 'first', 'f', options))
+        IdempotencyKey.objects.filter(key='k').update(expires_at=timezone.now())
+        self.assertEqual(idempotency.extend({'first': 'k'}, options), 1)
+        self.assertEqual(idempotency.claim('k', 'second', 'f', options).token, 'first')
+
+        # No longer extended: its worker died
+        IdempotencyKey.objects.filter(key='k').update(expires_at=timezone.now())
+        self.assertIsNone(idempotency.claim('k', 'second', 'f', options))
+        self.assertEqual(idempotency.extend({'first': 'k'}, options), 0)
+
+    def test_running_claims_share_one_renewer(self):
+        renewers = []
+
+        def view(viewset, request):
+            renewers.append(idempotency._renewer)
+            IdempotencyKey.objects.update(expires_at=timezone.now())
+            with self.assertNumQueries(1):
+                idempotency.renew()
+            self.assertGreater(IdempotencyKey.objects.get().expires_at, timezone.now())
+            return Response({'id': 1}, status=201)
+
+        for value in ('retry-1', 'retry-2'):
+            request = mock.Mock(method='POST', path='/x/', body=b'{}', headers={'Idempotency-Key': value})
+            self.assertEqual(idempotency.idempotent(view)(None, request).status_code, 201)
+            IdempotencyKey.objects.all().delete()
+        self.assertIs(renewers[0], renewers[1])
+        self.assertTrue(renewers[0].is_alive())
+        self.assertEqual(idempotency._claims, {})
+        with self.assertNumQueries(0):
+            idempotency.renew()
+
+    def test_taken_over_claim_is_left_to_its_new_holder(self):
+        key = idempotency.make_key('POST', '/x/', 'retry-1')
+
+        def view(viewset, request):
+            # A retry took the claim over while this request ran
+            IdempotencyKey.objects.filter(key=key).update(token='retry')
+            return Response({'id': 1}, status=status_code)
+
+        request = mock.Mock(method='POST', path='/x/', body=b'{}', headers={'Idempotency-Key': 'retry-1'})
+        for status_code in (201, 503):
+            idempotency.idempotent(view)(None, request)
+            stored = IdempotencyKey.objects.get(key=key)
+            self.assertEqual((stored.token, stored.status_code), ('retry', None))
+            stored.delete()
+
+    def test_purge(self):
+        now = timezone.now()
+        IdempotencyKey.objects.create(key='old', fingerprint='', status_code=201, expires_at=now - timedelta(seconds=1))
+        IdempotencyKey.objects.create(key='new', fingerprint='', status_code=201, expires_at=now + timedelta(hours=1))
+        call_command('purge_idempotency_keys', '--chunk-size', '1', stdout=io.StringIO())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['new'])
+
+
+def parse_event(text):
+    """Fields of one Server-Sent Event, with data decoded."""
+    event = dict(line.split(': ', 1) for line in text.strip().split('\n'))
+    event['data'] = json.loads(event['data'])
+    return event
+
+
+@override_settings(CHANGE_FEED={'POLL_INTERVAL': 0.01, 'HEARTBEAT': 1})
+class ChangeFeedTests(TestCase):
+
+    def setUp(self):
+        patcher = mock_artworks()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.project = create_project('Trip', [1, 2])
+        self.assignments = list(self.project.projectplaceassignment_set.order_by('id'))
+
+    def kinds(self):
+        return list(ProjectChange.objects.order_by('id').values_list('kind', flat=True))
+
+    def test_writes_are_logged(self):
+        response = self.client.post(
+            reverse('projects-list'), {'name': 'New', 'place_ids': [1, 3]}, content_type='application/json'
+        )
+        project_id = response.json()['id']
+        self.client.patch(reverse('projects-detail', args=[project_id]), {'name': 'Renamed'},
+                          content_type='application/json')
+        self.client.patch(reverse('places-bulk-update'), [
+            {'assignment_id': assignment.pk, 'visited': True} for assignment in self.assignments
+        ], content_type='application/json')
+        self.client.post(reverse('project-places-list', args=[self.project.pk]), {'external_id': 4},
+                         content_type='application/json')
+        self.client.delete(reverse('projects-detail', args=[project_id]))
+
+        self.assertEqual(self.kinds(), [
+            'project.created', 'project.updated',
+            'place.updated', 'place.updated', 'project.updated',
+            'place.added', 'project.updated',
+            'project.deleted',
+        ])
+        created = ProjectChange.objects.get(kind='project.created')
+        self.assertEqual([place['external_id'] for place in created.data['places']], [1, 3])
+        completed, reopened = ProjectChange.objects.filter(project_id=self.project.pk, kind='project.updated')
+        self.assertEqual((completed.data['is_completed'], reopened.data['is_completed']), (True, False))
+
+    def test_compact(self):
+        for notes in ('a', 'b', 'c'):
+            self.client.patch(reverse('project-place-detail', args=[self.project.pk, self.assignments[0].pk]),
+                              {'notes': notes}, content_type='application/json')
+        self.assertEqual(compact(60), (2, 0))
+        self.assertEqual(ProjectChange.objects.get().data['notes'], 'c')
+
+        ProjectChange.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+        self.client.delete(reverse('project-place-detail', args=[self.project.pk, self.assignments[1].pk]))
+        self.assertEqual(compact(60), (0, 1))
+        self.assertEqual(self.kinds(), ['place.removed'])
+
+    async def read_events(self, stream, count):
+        events = []
+        while len(events) < count:
+            text = (await asyncio.wait_for(anext(stream), 5)).decode()
+            if not text.startswith((':', 'retry')):
+                events.append(parse_event(text))
+        return events
+
+    async def test_stream(self):
+        url = reverse('project-changes', args=[self.project.pk])
+        response = await self.async_client.get(url)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+        [snapshot] = await self.read_events(stream, 1)
+        self.assertEqual(snapshot['event'], 'project.snapshot')
+        self.assertEqual([place['external_id'] for place in snapshot['data']['places']], [1, 2])
+
+        place_url = reverse('project-place-detail', args=[self.project.pk, self.assignments[0].pk])
+        await self.async_client.patch(place_url, {'visited': True, 'notes': 'Seen'}, content_type='application/json')
+        [update] = await self.read_events(stream, 1)
+        self.assertEqual((update['event'], update['data']['notes']), ('place.updated', 'Seen'))
+        await stream.aclose()
+
+        # Resumed after the last event seen
+        await self.async_client.patch(place_url, {'notes': 'Twice'}, content_type='application/json')
+        response = await self.async_client.get(url, headers={'Last-Event-ID': update['id']})
+        stream = response.streaming_content
+        [missed] = await self.read_events(stream, 1)
+        self.assertEqual(missed['data']['notes'], 'Twice')
+        await stream.aclose()
+
+        # Compacted away: a new snapshot
+        await sync_to_async(compact)(0)
+        response = await self.async_client.get(url, {'last_event_id': snapshot['id']})
+        stream = response.streaming_content
+        [snapshot] = await self.read_events(stream, 1)
+        self.assertEqual((snapshot['event'], snapshot['data']['places'][0]['notes']), ('project.snapshot', 'Twice'))
+        await stream.aclose()
+
+        response = await self.async_client.get(reverse('project-changes', args=[999]))
+        self.assertEqual(response.status_code, 404)
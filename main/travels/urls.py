@@ -1,6 +1,15 @@
 from rest_framework.routers import DefaultRouter
 from django.urls import path, include
-from .views import TravelProjectViewSet, ProjectPlaceAssignmentViewSet
+from . import async_views, change_feed
+from .views import (
+    TravelProjectViewSet,
+    ProjectPlaceAssignmentViewSet,
+    AssignmentBulkUpdateView,
+    PlaceSearchView,
+    ArtworkCacheStatsView,
+    UsageStatsView,
+    export_view,
+)
 
 router = DefaultRouter()
 router.register(r'projects', TravelProjectViewSet, basename='projects')
@@ -19,7 +28,17 @@ place_detail = ProjectPlaceAssignmentViewSet.as_view({
 })
 
 urlpatterns = [
+    # Async create endpoints for ASGI deployments
+    path('async/projects/', async_views.create_project, name='async-projects-create'),
+    path('async/projects/<int:project_pk>/places/', async_views.create_place, name='async-project-places-create'),
+    # Server-Sent Events, for ASGI deployments
+    path('projects/<int:project_pk>/changes/', change_feed.project_changes, name='project-changes'),
     path('', include(router.urls)),
     path('projects/<int:project_pk>/places/', place_list, name='project-places-list'),
     path('projects/<int:project_pk>/places/<int:pk>/', place_detail, name='project-place-detail'),
+    path('places/bulk/', AssignmentBulkUpdateView.as_view(), name='places-bulk-update'),
+    path('search/', PlaceSearchView.as_view(), name='place-search'),
+    path('stats/', UsageStatsView.as_view(), name='usage-stats'),
+    path('artworks/cache/', ArtworkCacheStatsView.as_view(), name='artwork-cache-stats'),
+    path('export/', export_view, name='projects-export'),
 ]
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""
+Background validation of pending places.
+
+With ASYNC_PLACE_VALIDATION = True, places that are not known locally
+are accepted as pending and get a PlaceValidationJob row. The
+validate_places command drains that queue: it claims jobs, looks their
+ids up on the Art Institute API in batches, from a pool of threads, and
+marks each place valid (with its title) or rejected. The queue is a
+plain table, so nothing but the database is needed.
+
+Claims are leases: a job claimed by a worker that died is picked up
+again once locked_until has passed. Lookups that fail are retried with
+exponential backoff.
+"""
+import uuid
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import changes
+from .artic import ArtworkAPIError
+from .models import (
+    ARTWORKS_BATCH_SIZE,
+    LOCATION_FIELDS,
+    PlaceValidationJob,
+    ProjectPlace,
+    TravelProject,
+    artwork_location,
+    fetch_artworks,
+    fetch_artworks_from_api,
+)
+
+RETRY_BACKOFF = 5
+RETRY_BACKOFF_MAX = 60 * 10
+
+
+def claim_jobs(limit, lease=60):
+    """
+    Claim up to limit due jobs for this worker for lease seconds and
+    return them with their places.
+    """
+    now = timezone.now()
+    due = PlaceValidationJob.objects.filter(run_after__lte=now).filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+    )
+    ids = list(due.order_by('run_after', 'id').values_list('id', flat=True)[:limit])
+    if not ids:
+        return []
+
+    # Only rows still unclaimed are taken, so two workers racing for the
+    # same jobs split them instead of both running them
+    worker = uuid.uuid4().hex
+    due.filter(id__in=ids).update(worker=worker, locked_until=now + timedelta(seconds=lease))
+    return list(PlaceValidationJob.objects.filter(worker=worker).select_related('place'))
+
+
+def run_jobs(jobs, pool, batch_size=ARTWORKS_BATCH_SIZE):
+    """
+    Validate the places of the claimed jobs. Ids the artwork cache or
+    catalog already know are settled at once, the others are looked up
+    with one API request per batch, the batches running concurrently on
+    the thread pool. Returns (validated, rejected, retried) counts.
+    """
+    by_external_id = {job.place.external_id: job for job in jobs}
+    artworks = fetch_artworks(list(by_external_id), network=False)
+    unknown = [external_id for external_id in by_external_id if external_id not in artworks]
+
+    futures = [
+        (pool.submit(fetch_artworks_from_api, unknown[i:i + batch_size]), unknown[i:i + batch_size])
+        for i in range(0, len(unknown), batch_size)
+    ]
+    failed = []
+    for future, batch in futures:
+        try:
+            artworks.update(future.result())
+        except ArtworkAPIError as e:
+            failed.append(([by_external_id[external_id] for external_id in batch], e))
+
+    done = [job for external_id, job in by_external_id.items() if external_id in artworks]
+    validated, rejected = complete_jobs(done, artworks)
+    for batch_jobs, error in failed:
+        retry_jobs(batch_jobs, error)
+    return validated, rejected, sum(len(batch_jobs) for batch_jobs, _ in failed)
+
+
+def complete_jobs(jobs, artworks):
+    """
+    Store the lookup results of jobs and delete them. The projects using
+    the places get a new version, so their cached payloads and ETags
+    show the new status. Returns (validated, rejected) counts.
+    """
+    if not jobs:
+        return 0, 0
+
+    places = []
+    for job in jobs:
+        place = job.place
+        artwork = artworks[place.external_id]
+        if artwork is None:
+            place.validation_status = ProjectPlace.REJECTED
+        else:
+            place.validation_status = ProjectPlace.VALID
+            place.title = artwork['title'] or ''
+            for field, value in artwork_location(artwork).items():
+                setattr(place, field, value)
+        places.append(place)
+
+    with transaction.atomic():
+        ProjectPlace.objects.bulk_update(places, ['validation_status', 'title', *LOCATION_FIELDS])
+        PlaceValidationJob.objects.filter(id__in=[job.id for job in jobs]).delete()
+        TravelProject.objects.filter(projectplaceassignment__place__in=places).update(
+            version=F('version') + 1, updated_at=timezone.now()
+        )
+        changes.record_place_status(places)
+
+    rejected = sum(1 for place in places if place.validation_status == ProjectPlace.REJECTED)
+    return len(places) - rejected, rejected
+
+
+def retry_jobs(jobs, error):
+    """Release jobs whose lookup failed, to be run again after a backoff."""
+    now = timezone.now()
+    for job in jobs:
+        job.attempts += 1
+        job.run_after = now + timedelta(seconds=min(RETRY_BACKOFF_MAX, RETRY_BACKOFF * 2 ** (job.attempts - 1)))
+        job.worker = ''
+        job.locked_until = None
+        job.last_error = str(error)
+    PlaceValidationJob.objects.bulk_update(jobs, ['attempts', 'run_after', 'worker', 'locked_until', 'last_error'])
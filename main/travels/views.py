@@ -1,8 +1,54 @@
+import uuid
+
 from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import TravelProject, ProjectPlace, ProjectPlaceAssignment
-from .serializers import TravelProjectSerializer, ProjectPlaceAssignmentSerializer
+from rest_framework.views import APIView
+from .artic import ArtworkAPIError
+from .artwork_cache import get_artwork_cache
+from . import changes, export, itinerary, metrics, representations, response_cache, stats
+from .bulk_import import ImportCompleted, ImportSourceChanged, get_state, import_projects
+from .conditional import conditional_project, project_validators
+from .idempotency import HEADER as IDEMPOTENCY_HEADER, idempotent
+from .pagination import ProjectPlacePagination, SearchPagination
+from .models import LOCATION_FIELDS, MAX_PLACES, TravelProject, ProjectChange, ProjectPlace, ProjectPlaceAssignment
+from .schema import OpenApiParameter, extend_schema
+from .search import SearchUnavailable, build_match, search_places
+from .stats import StatsDelta
+from .serializers import (
+    AssignmentChangeSerializer,
+    TravelProjectSerializer,
+    ProjectPlaceAssignmentSerializer,
+)
+
+# Max changes accepted by one bulk update request
+BULK_UPDATE_MAX_ITEMS = 500
+
+# Lines validated and saved per transaction by the bulk project import
+BULK_IMPORT_CHUNK_SIZE = 500
+
+# Default and max ?limit= of the usage statistics rankings
+STATS_LIMIT = 10
+STATS_MAX_LIMIT = 100
+
+
+fields_parameter = extend_schema(parameters=[
+    OpenApiParameter(
+        representations.FIELDS_PARAM, str,
+        description='Comma-separated fields to include, e.g. id,name (leaves out places).',
+    ),
+])
+
+idempotency_parameter = extend_schema(parameters=[
+    OpenApiParameter(
+        IDEMPOTENCY_HEADER, str, OpenApiParameter.HEADER,
+        description='Unique per request; retries with the same key and body get the first response back.',
+    ),
+])
 
 
 class TravelProjectViewSet(viewsets.ModelViewSet):
@@ -14,6 +60,56 @@ class TravelProjectViewSet(viewsets.ModelViewSet):
     queryset = TravelProject.objects.all()
     serializer_class = TravelProjectSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            queryset = queryset.with_places()
+        return queryset
+
+    @fields_parameter
+    def list(self, request, *args, **kwargs):
+        fields = representations.requested_fields(request, representations.PROJECT_KEYS)
+        # Page through light rows first: the cache key of the page is built
+        # from their versions, the places are only loaded on a cache miss
+        page = self.paginate_queryset(
+            self.filter_queryset(self.get_queryset()).only('id', 'created_at', 'version', 'updated_at')
+        )
+
+        def render():
+            if representations.enabled(request):
+                return representations.project_dicts([project.pk for project in page], fields)
+            projects = TravelProject.objects.with_places().in_bulk([project.pk for project in page])
+            return self.get_serializer(
+                [projects[project.pk] for project in page if project.pk in projects], many=True
+            ).data
+
+        key = response_cache.make_key(
+            'projects', request, [(project.pk, project.version, project.updated_at) for project in page]
+        )
+        return self.get_paginated_response(response_cache.get_or_render(key, render))
+
+    @fields_parameter
+    @conditional_project('pk')
+    def retrieve(self, request, *args, **kwargs):
+        fields = representations.requested_fields(request, representations.PROJECT_KEYS)
+        etag, updated_at = project_validators(request, kwargs['pk'])
+        if etag is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        def render():
+            if representations.enabled(request):
+                # The project exists, so its pk is an id by now
+                project_id = TravelProject._meta.pk.to_python(kwargs['pk'])
+                projects = representations.project_dicts([project_id], fields)
+                if projects:
+                    return projects[0]
+            return self.get_serializer(self.get_object()).data
+
+        key = response_cache.make_key('project', request, etag, updated_at)
+        return Response(response_cache.get_or_render(key, render))
+
+    @idempotency_parameter
+    @idempotent
     def create(self, request, *args, **kwargs):
         # Ensure at least one place is provided when creating a project
         if not request.data.get('place_ids'):
@@ -21,21 +117,146 @@ class TravelProjectViewSet(viewsets.ModelViewSet):
                 {"error": "A project must have at least one place"},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        if len(request.data.get('place_ids')) > 10:
+        if isinstance(request.data['place_ids'], list) and len(request.data['place_ids']) > MAX_PLACES:
             return Response(
                 {"error": "A project cannot have more than 10 places"},
+                status=status.HTTP_400_BAD_REQUEST
             )
         return super().create(request, *args, **kwargs)
 
+    @action(detail=False, methods=['post'], url_path='import')
+    def bulk_import(self, request):
+        """
+        Create many projects from an NDJSON body, one project per line.
+        Rejected lines are reported and skipped. Pass ?source= (returned
+        by every response) with the same body to resume an import that
+        was interrupted.
+        """
+        source = request.query_params.get('source') or f'api:{uuid.uuid4().hex}'
+        try:
+            state = get_state(source, fingerprint=None)
+        except ImportCompleted:
+            return Response(
+                {"error": "This import has already been completed"},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        errors = []
+        response_status = status.HTTP_200_OK
+        body = {}
+        try:
+            import_projects(
+                request.stream or [], state, chunk_size=BULK_IMPORT_CHUNK_SIZE,
+                on_error=lambda line, line_errors: errors.append({"line": line, "errors": line_errors}),
+                hash_lines=True,
+            )
+        except ImportSourceChanged:
+            return Response(
+                {"error": "The body differs from the one this import was reading; resend the same body"},
+                status=status.HTTP_409_CONFLICT,
+            )
+        except ArtworkAPIError:
+            response_status = status.HTTP_503_SERVICE_UNAVAILABLE
+            body["error"] = "Art Institute API is unavailable, resend the body with this source to resume"
+
+        body.update({
+            "source": state.source,
+            "position": state.position,
+            "created": state.created,
+            "failed": state.failed,
+            "completed": state.completed,
+            "errors": errors,
+        })
+        return Response(body, status=response_status)
+
+    @extend_schema(parameters=[
+        OpenApiParameter('start', int, description='external_id of the place to start from.'),
+    ])
+    @action(detail=True, methods=['get'])
+    def itinerary(self, request, pk=None):
+        """
+        Order in which to visit the project's places, shortest walk
+        first (see itinerary.py). Places without a known location are
+        listed apart under "unlocated".
+        """
+        project = self.get_object()
+        assignments = (
+            ProjectPlaceAssignment.objects.filter(project=project).select_related('place')
+            .only('id', 'visited', 'place__external_id', 'place__title', *[f'place__{f}' for f in LOCATION_FIELDS])
+            .order_by('place__external_id')
+        )
+        located = []
+        unlocated = []
+        for assignment in assignments:
+            place = assignment.place
+            if place.latitude is None or place.longitude is None:
+                unlocated.append(assignment)
+            else:
+                located.append(assignment)
+
+        start = request.query_params.get('start')
+        if start is not None:
+            if not start.isdigit() or int(start) not in {a.place.external_id for a in located}:
+                return Response(
+                    {"error": "start must be the external_id of a located place of this project"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            start = int(start)
+
+        route = itinerary.plan(
+            [
+                itinerary.Stop(a.place.external_id, a.place.gallery_id, a.place.latitude, a.place.longitude)
+                for a in located
+            ],
+            start,
+        )
+        stops = []
+        for index, leg in zip(route['order'], route['legs']):
+            assignment = located[index]
+            place = assignment.place
+            stops.append({
+                "id": assignment.pk,
+                "external_id": place.external_id,
+                "title": place.title,
+                "gallery_id": place.gallery_id,
+                "gallery_title": place.gallery_title,
+                "latitude": place.latitude,
+                "longitude": place.longitude,
+                "visited": assignment.visited,
+                "distance_m": round(leg, 1),
+            })
+        return Response({
+            "stops": stops,
+            "unlocated": [
+                {"id": a.pk, "external_id": a.place.external_id, "title": a.place.title, "visited": a.visited}
+                for a in unlocated
+            ],
+            "total_distance_m": round(sum(route['legs']), 1),
+            "method": route['method'],
+            "cached": route['cached'],
+            "timing_ms": route['timing_ms'],
+        })
+
     def destroy(self, request, *args, **kwargs):
         # Prevent deletion if any place in the project is marked as visited
         project = self.get_object()
-        if project.projectplaceassignment_set.filter(visited=True).exists():
+        if project.visited_count:
             return Response(
                 {"error": "Cannot delete project with visited places"},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        return super().destroy(request, *args, **kwargs)
+        self.perform_destroy(project)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            # Counted out of the statistics as it is now, not as loaded
+            instance.refresh_from_db(from_queryset=TravelProject.objects.select_for_update())
+            changes.record(changes.project_changes(ProjectChange.PROJECT_DELETED, [instance]))
+            StatsDelta().add_project(instance, -1).add_assignments(
+                instance.projectplaceassignment_set.only('place_id', 'visited'), -1
+            ).save()
+            instance.delete()
 
 
 class ProjectPlaceAssignmentViewSet(viewsets.ViewSet):
@@ -43,20 +264,52 @@ class ProjectPlaceAssignmentViewSet(viewsets.ViewSet):
     Nested ViewSet for managing places inside a specific travel project.
     """
 
+    @fields_parameter
+    @conditional_project('project_pk')
     def list(self, request, project_pk=None):
         """
         List all places for a given project
         """
-        queryset = ProjectPlaceAssignment.objects.filter(project_id=project_pk)
-        serializer = ProjectPlaceAssignmentSerializer(queryset, many=True)
-        return Response(serializer.data)
+        fields = representations.requested_fields(request, representations.PLACE_KEYS)
+        def render():
+            queryset = ProjectPlaceAssignment.objects.filter(project_id=project_pk)
+            paginator = ProjectPlacePagination()
+            if representations.enabled(request):
+                page = paginator.paginate_queryset(
+                    representations.places_queryset(queryset, fields), request, view=self
+                )
+                data = representations.place_dicts(page, fields)
+            else:
+                page = paginator.paginate_queryset(queryset.with_place(), request, view=self)
+                data = ProjectPlaceAssignmentSerializer(page, many=True).data
+            return paginator.get_paginated_response(data).data
 
+        etag, updated_at = project_validators(request, project_pk)
+        if etag is None:
+            return Response(render())
+        key = response_cache.make_key('places', request, etag, updated_at)
+        return Response(response_cache.get_or_render(key, render))
+
+    @fields_parameter
     def retrieve(self, request, pk=None, project_pk=None):
         """
         Retrieve a single place within a project
         """
+        fields = representations.requested_fields(request, representations.PLACE_KEYS)
+        if representations.enabled(request):
+            rows = representations.places_queryset(
+                ProjectPlaceAssignment.objects.filter(id=pk, project_id=project_pk), fields
+            )
+            places = representations.place_dicts(rows, fields)
+            if not places:
+                return Response(
+                    {"error": "Place not found in this project"},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            return Response(places[0])
+
         try:
-            assignment = ProjectPlaceAssignment.objects.get(
+            assignment = ProjectPlaceAssignment.objects.with_place().get(
                 id=pk, project_id=project_pk
             )
         except ProjectPlaceAssignment.DoesNotExist:
@@ -68,6 +321,8 @@ class ProjectPlaceAssignmentViewSet(viewsets.ViewSet):
         serializer = ProjectPlaceAssignmentSerializer(assignment)
         return Response(serializer.data)
 
+    @idempotency_parameter
+    @idempotent
     def create(self, request, project_pk=None):
         """
         Add a new place to a project using external_id
@@ -84,17 +339,21 @@ class ProjectPlaceAssignmentViewSet(viewsets.ViewSet):
         project = TravelProject.objects.get(pk=project_pk)
 
         # Enforce max 10 places per project
-        if project.projectplaceassignment_set.count() >= 10:
+        if project.place_count >= MAX_PLACES:
             return Response(
                 {"error": "A project cannot have more than 10 places"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
         try:
-            place, _ = ProjectPlace.objects.get_or_create(
-                external_id=external_id
-            )
+            # Concurrent requests for the same id share one lookup and insert
+            place = ProjectPlace.objects.resolve(external_id)
         except ValidationError as e:
             return Response(e.message_dict, status=status.HTTP_400_BAD_REQUEST)
+        except ArtworkAPIError:
+            return Response(
+                {"error": "Art Institute API is unavailable, try again later"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
 
         # Prevent duplicate place in the same project
         if ProjectPlaceAssignment.objects.filter(
@@ -105,20 +364,32 @@ class ProjectPlaceAssignmentViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        assignment = ProjectPlaceAssignment.objects.create(
-            project=project,
-            place=place,
-            notes=notes,
-        )
-
-        project.update_completion_status()
+        with transaction.atomic():
+            # Checked again here in case places were added concurrently
+            if not project.adjust_counters(places=1):
+                return Response(
+                    {"error": "A project cannot have more than 10 places"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            assignment = ProjectPlaceAssignment.objects.create(
+                project=project,
+                place=place,
+                notes=notes,
+            )
+            changes.record(
+                changes.place_changes(ProjectChange.PLACE_ADDED, [assignment])
+                + changes.completion_changes(project, project.was_completed)
+            )
+            StatsDelta().add_assignments([assignment]).update_project(
+                project, project.start_date, project.was_completed
+            ).save()
 
         serializer = ProjectPlaceAssignmentSerializer(assignment)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def update(self, request, pk=None, project_pk=None):
         try:
-            assignment = ProjectPlaceAssignment.objects.get(
+            assignment = ProjectPlaceAssignment.objects.select_related('place', 'project').get(
                 id=pk,
                 project_id=project_pk
             )
@@ -134,10 +405,28 @@ class ProjectPlaceAssignmentViewSet(viewsets.ViewSet):
             partial=True
         )
         serializer.is_valid(raise_exception=True)
-        serializer.save()
 
-        # Update project completion status
-        assignment.project.update_completion_status()
+        project = assignment.project
+        with transaction.atomic():
+            visited = 0
+            if 'visited' in serializer.validated_data:
+                new = serializer.validated_data['visited']
+                # Only the request that actually flips it counts the
+                # change, however many concurrent ones send the same value
+                if ProjectPlaceAssignment.objects.filter(pk=assignment.pk, visited=not new).update(visited=new):
+                    visited = 1 if new else -1
+            serializer.save()
+
+            # Update project completion status (and version)
+            project.adjust_counters(visited=visited)
+            changes.record(
+                changes.place_changes(ProjectChange.PLACE_UPDATED, [assignment])
+                + changes.completion_changes(project, project.was_completed)
+            )
+            if visited:
+                StatsDelta().visit(assignment.place_id, assignment.visited).update_project(
+                    project, project.start_date, project.was_completed
+                ).save()
 
         return Response(serializer.data)
 
@@ -147,7 +436,7 @@ class ProjectPlaceAssignmentViewSet(viewsets.ViewSet):
         A project must always have at least one place.
         """
         try:
-            assignment = ProjectPlaceAssignment.objects.get(
+            assignment = ProjectPlaceAssignment.objects.select_related('project').get(
                 id=pk, project_id=project_pk
             )
         except ProjectPlaceAssignment.DoesNotExist:
@@ -157,15 +446,234 @@ class ProjectPlaceAssignmentViewSet(viewsets.ViewSet):
             )
 
         project = assignment.project
+        with transaction.atomic():
+            # The counters follow what the DELETEs removed, not what was
+            # read above: a concurrent request may have changed or
+            # removed the assignment since
+            assignments = ProjectPlaceAssignment.objects.filter(pk=assignment.pk)
+            assignment.visited = bool(assignments.filter(visited=True).delete()[0])
+            if not assignment.visited and not assignments.delete()[0]:
+                return Response(
+                    {"error": "Place not found in this project"},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            # Ensure project has at least one place (checked atomically
+            # by adjust_counters)
+            if not project.adjust_counters(places=-1, visited=-1 if assignment.visited else 0):
+                transaction.set_rollback(True)
+                return Response(
+                    {"error": "A project must have at least one place"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            changes.record(
+                changes.place_changes(ProjectChange.PLACE_REMOVED, [assignment])
+                + changes.completion_changes(project, project.was_completed)
+            )
+            StatsDelta().add_assignments([assignment], -1).update_project(
+                project, project.start_date, project.was_completed
+            ).save()
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 
-        # Ensure project has at least one place
-        if project.projectplaceassignment_set.count() <= 1:
+class AssignmentBulkUpdateView(APIView):
+    """
+    Update notes and visited status of many assignments, across projects,
+    in one request: [{"assignment_id": 1, "visited": true, "notes": "..."}].
+
+    Valid changes are saved with one bulk UPDATE in a single transaction
+    and project completion is updated once per affected project. The
+    response has one result per item, in request order.
+    """
+
+    def patch(self, request):
+        if not isinstance(request.data, list):
             return Response(
-                {"error": "A project must have at least one place"},
+                {"error": "Expected a list of changes"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(request.data) > BULK_UPDATE_MAX_ITEMS:
+            return Response(
+                {"error": f"At most {BULK_UPDATE_MAX_ITEMS} changes per request"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        assignment.delete()
-        project.update_completion_status()
+        # Validate every item on its own so one bad item does not fail the batch
+        items = []
+        for data in request.data:
+            serializer = AssignmentChangeSerializer(data=data)
+            items.append((serializer.validated_data if serializer.is_valid() else None, serializer))
 
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        assignment_ids = [change['assignment_id'] for change, _ in items if change]
+        with transaction.atomic():
+            # Locked until the end of the transaction, so the visited
+            # deltas below are computed from values no concurrent update
+            # can change (and count a second time) meanwhile
+            assignments = (
+                ProjectPlaceAssignment.objects.select_for_update(of=('self',))
+                .select_related('place', 'project').in_bulk(assignment_ids)
+            )
+
+            # Apply in memory, later items win
+            original = {pk: (assignment.visited, assignment.notes) for pk, assignment in assignments.items()}
+            for change, _ in items:
+                assignment = change and assignments.get(change['assignment_id'])
+                if assignment:
+                    for attr in ('visited', 'notes'):
+                        if attr in change:
+                            setattr(assignment, attr, change[attr])
+
+            changed = []
+            projects = {}
+            visited_delta = {}
+            for pk, assignment in assignments.items():
+                was_visited, notes = original[pk]
+                if (assignment.visited, assignment.notes) == (was_visited, notes):
+                    continue
+                changed.append(assignment)
+                projects.setdefault(assignment.project_id, assignment.project)
+                visited_delta.setdefault(assignment.project_id, 0)
+                if assignment.visited != was_visited:
+                    visited_delta[assignment.project_id] += 1 if assignment.visited else -1
+
+            ProjectPlaceAssignment.objects.bulk_update(changed, ['visited', 'notes'])
+            entries = changes.place_changes(ProjectChange.PLACE_UPDATED, changed)
+            stats = StatsDelta()
+            for assignment in changed:
+                if assignment.visited != original[assignment.pk][0]:
+                    stats.visit(assignment.place_id, assignment.visited)
+            # Update project completion status (and version), once per project
+            for project_id, delta in visited_delta.items():
+                project = projects[project_id]
+                project.adjust_counters(visited=delta)
+                entries += changes.completion_changes(project, project.was_completed)
+                stats.update_project(project, project.start_date, project.was_completed)
+            changes.record(entries)
+            stats.save()
+
+        results = []
+        for change, serializer in items:
+            if change is None:
+                results.append({"status": "invalid", "errors": serializer.errors})
+            elif change['assignment_id'] not in assignments:
+                results.append({
+                    "assignment_id": change['assignment_id'],
+                    "status": "not_found",
+                    "errors": {"assignment_id": ["Place assignment not found"]},
+                })
+            else:
+                assignment = assignments[change['assignment_id']]
+                results.append({
+                    "assignment_id": assignment.pk,
+                    "project_id": assignment.project_id,
+                    "status": "updated",
+                    "place": ProjectPlaceAssignmentSerializer(assignment).data,
+                })
+        return Response(results)
+
+
+class PlaceSearchView(APIView):
+    """
+    Full-text search over place titles and notes, best matches first.
+    ?q= words are matched as prefixes; ?project= limits the search to
+    one project.
+    """
+
+    def get(self, request):
+        match = build_match(request.query_params.get('q', ''))
+        if not match:
+            return Response(
+                {"error": "q is required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        project_id = request.query_params.get('project')
+        if project_id is not None and not project_id.isdigit():
+            return Response(
+                {"error": "project must be a project id"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        paginator = SearchPagination()
+        try:
+            rows = paginator.paginate_rows(
+                lambda after, limit: search_places(match, project_id, after, limit),
+                request,
+            )
+        except SearchUnavailable:
+            return Response(
+                {"error": "Search is not available on this database"},
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+        return paginator.get_paginated_response(rows)
+
+
+class UsageStatsView(APIView):
+    """
+    Most added and most visited places (?limit= of each) and the
+    completion rate of projects by start_date month, read from the
+    statistics tables (see stats.py).
+    """
+
+    def get(self, request):
+        limit = request.query_params.get('limit', str(STATS_LIMIT))
+        if not limit.isdigit() or not 1 <= int(limit) <= STATS_MAX_LIMIT:
+            return Response(
+                {"error": f"limit must be between 1 and {STATS_MAX_LIMIT}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        limit = int(limit)
+        return Response({
+            "most_added": [
+                {"external_id": external_id, "title": title, "projects": count}
+                for external_id, title, count in stats.top_places('added_count', limit)
+            ],
+            "most_visited": [
+                {"external_id": external_id, "title": title, "visits": count}
+                for external_id, title, count in stats.top_places('visited_count', limit)
+            ],
+            "completion_by_month": stats.completion_by_month(),
+        })
+
+
+class ArtworkCacheStatsView(APIView):
+    """
+    Hit/miss/eviction counters of the artwork cache in this worker process.
+    """
+
+    def get(self, request):
+        return Response(get_artwork_cache().stats())
+
+
+def metrics_view(request):
+    """
+    Request metrics of this worker process in the Prometheus text format.
+    """
+    return HttpResponse(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@require_GET
+def export_view(request):
+    """
+    Stream all projects with their places as NDJSON (default) or CSV:
+    ?format=ndjson|csv, ?since=<ISO date or datetime> for projects
+    changed since then. See export.py.
+    """
+    format = request.GET.get('format', 'ndjson')
+    if format not in export.FORMATS:
+        return JsonResponse(
+            {"error": f"format must be one of {', '.join(export.FORMATS)}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    since = request.GET.get('since')
+    if since is not None:
+        try:
+            since = export.parse_since(since)
+        except ValueError:
+            return JsonResponse(
+                {"error": "since must be an ISO 8601 date or datetime"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+    response = StreamingHttpResponse(export.export(format, since), content_type=export.FORMATS[format])
+    response['Content-Disposition'] = f'attachment; filename="projects.{format}"'
+    return response
@@ -14,16 +14,20 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.urls import path, include
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView,
-    SpectacularRedocView,
-)
+from main import docs
+from main.travels.views import metrics_view
 
 urlpatterns = [
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
-    path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
-    path('api/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
+    path('api/schema/', docs.schema_view, name='schema'),
     path('api/', include('main.travels.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
+
+# Swagger UI and ReDoc need drf_spectacular's templates
+if getattr(settings, 'API_DOCS_UI', True):
+    urlpatterns += [
+        path('api/docs/', docs.swagger_view, name='swagger-ui'),
+        path('api/redoc/', docs.redoc_view, name='redoc'),
+    ]